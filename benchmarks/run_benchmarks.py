@@ -0,0 +1,323 @@
+# benchmarks/run_benchmarks.py
+#
+# Times the editor's hot paths on generated documents, headless:
+#
+#   python benchmarks/run_benchmarks.py --output results.json
+#   python benchmarks/run_benchmarks.py --sizes 1KB,100MB --only open_file,find_text
+#   python benchmarks/run_benchmarks.py --output new.json --compare baseline.json
+#   python benchmarks/run_benchmarks.py --results new.json --compare baseline.json
+#
+# With --compare the exit status is 1 if any benchmark is slower than the
+# baseline by more than --threshold.
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.abspath(ROOT))
+
+DEFAULT_SIZES = "1KB,100KB,1MB,10MB"
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2
+WAIT_TIMEOUT = 600
+TYPED_TEXT = "The quick brown fox jumps over the lazy dog. "
+NEEDLE = "needle"
+NEEDLE_INTERVAL = 50
+WORDS = (
+    "the of and to in is was that for it with as on be at by this had not are but from or have an they "
+    "which one you were her all she there would their we him been has when who will more no if out so said "
+    "what up its about into than them can only other new some could time these two may then do first any my "
+    "now such like our over man me even most made after also did many before must through back years where "
+    "much your way well down should because each just those people how too little state good very make world "
+    "still own see men work long get here between both life being under never day same another know while "
+    "recieve teh definately seperate occured"
+).split()
+UNITS = {'KB': 1024, 'MB': 1024 * 1024, 'GB': 1024 * 1024 * 1024}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def generate_document(file_path, size, seed=0):
+    # Lines of 8-16 random words with NEEDLE every NEEDLE_INTERVAL lines
+    # (starting with the first), so every size has something to find.
+    rng = random.Random(seed)
+    written = 0
+    number = 0
+    with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
+        while written < size:
+            words = rng.choices(WORDS, k=rng.randint(8, 16))
+            if number % NEEDLE_INTERVAL == 0:
+                words.insert(rng.randint(0, len(words)), NEEDLE)
+            line = ' '.join(words).capitalize() + '.\n'
+            f.write(line)
+            written += len(line)
+            number += 1
+
+
+class Bench:
+    def __init__(self, app, window):
+        self.app = app
+        self.window = window
+
+    def wait_until(self, predicate, timeout=WAIT_TIMEOUT):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("timed out waiting for the editor")
+            self.app.processEvents()
+            time.sleep(0.001)
+
+    def timed(self, run, setup=None, teardown=None):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        if teardown is not None:
+            teardown()
+        return elapsed
+
+    def undo_since_now(self, editor):
+        # A teardown that undoes what a run did through the editor's own
+        # undo history; the document keeps no undo stack of its own.
+        serial = editor.history.top_serial()
+
+        def teardown():
+            while editor.history.top_serial() != serial and editor.history.can_undo():
+                editor.undo()
+            self.app.processEvents()
+        return teardown
+
+    def in_editor(self):
+        return self.window.large_file_view is None
+
+    def open_file(self, file_path):
+        window = self.window
+
+        def run():
+            # Reloads into the current tab; load_file would just switch to it.
+            window.load_into(window.current_tab, file_path)
+            self.wait_until(lambda: not window.current_tab.is_busy())
+            self.app.processEvents()
+        return self.timed(run)
+
+    def save(self, file_path):
+        window = self.window
+        if not self.in_editor():
+            return None
+
+        def run():
+            window.write_document(file_path)
+            window.file_saver.wait()
+        return self.timed(run)
+
+    def typing(self, file_path):
+        # Per keystroke: the edit, the events it queues, and one flush of the
+        # change bus as its debounce timer would.
+        from PySide6.QtTest import QTest
+        editor = self.window.editor
+        if not self.in_editor():
+            return None
+        cursor = editor.textCursor()
+        cursor.setPosition(editor.document().characterCount() // 2)
+        editor.setTextCursor(cursor)
+        editor.setFocus()
+
+        def run():
+            for character in TYPED_TEXT:
+                QTest.keyClick(editor, character)
+                self.app.processEvents()
+            editor.changes.flush()
+            self.app.processEvents()
+        return self.timed(run, teardown=self.undo_since_now(editor)) / len(TYPED_TEXT)
+
+    def rehighlight(self, file_path):
+        highlighter = self.window.editor.highlighter
+        if not self.in_editor():
+            return None
+        highlighter.checker.load()
+        self.wait_until(lambda: highlighter.checker.loaded)
+        if highlighter.checker.dictionary is None:
+            return None
+
+        def run():
+            highlighter.rehighlight()
+            self.app.processEvents()
+        return self.timed(run)
+
+    def find_text(self, file_path):
+        # The first search of a document.
+        window = self.window
+        window.show_find_replace()
+
+        def setup():
+            from PySide6.QtGui import QTextCursor
+            window.editor.moveCursor(QTextCursor.Start)
+            window.match_key = None
+
+        def run():
+            window.find_text(NEEDLE)
+            self.app.processEvents()
+        return self.timed(run, setup)
+
+    def find_next(self, file_path):
+        window = self.window
+        window.show_find_replace()
+        window.find_text(NEEDLE)
+
+        def run():
+            window.find_text(NEEDLE)
+            self.app.processEvents()
+        return self.timed(run)
+
+    def replace_all_text(self, file_path):
+        window = self.window
+        if not self.in_editor():
+            return None
+        window.show_find_replace()
+
+        def run():
+            window.replace_all_text(NEEDLE, "haystack")
+            self.wait_until(lambda: window.replace_worker is None)
+            self.app.processEvents()
+        return self.timed(run, teardown=self.undo_since_now(window.editor))
+
+
+BENCHMARKS = ['open_file', 'rehighlight', 'typing', 'find_text', 'find_next', 'replace_all_text', 'save']
+
+
+def run_benchmarks(sizes, names, repeat, directory):
+    from PySide6.QtWidgets import QApplication
+    from main_window import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    bench = Bench(app, window)
+    bench.wait_until(lambda: window.first_painted)
+    results = []
+    try:
+        for size_text in sizes:
+            size = parse_size(size_text)
+            file_path = os.path.join(directory, f"document-{size_text}.txt")
+            generate_document(file_path, size)
+            save_path = os.path.join(directory, f"saved-{size_text}.txt")
+            # open_file always runs, so every other benchmark sees the document.
+            for name in ['open_file'] + [name for name in names if name != 'open_file']:
+                times = []
+                for _ in range(repeat):
+                    elapsed = getattr(bench, name)(save_path if name == 'save' else file_path)
+                    if elapsed is None:
+                        break
+                    times.append(elapsed)
+                if name not in names:
+                    continue
+                result = {'benchmark': name, 'size': size_text, 'bytes': size, 'times': times}
+                if times:
+                    result['median'] = statistics.median(times)
+                else:
+                    result['skipped'] = True
+                results.append(result)
+                report_line(result)
+    finally:
+        window.editor.document().setModified(False)
+        window.close()
+        # Deleted while the application still exists, not at interpreter exit.
+        from PySide6.QtCore import QEvent
+        window.deleteLater()
+        app.sendPostedEvents(None, QEvent.DeferredDelete)
+    return results
+
+
+def report_line(result):
+    if result.get('skipped'):
+        print(f"{result['benchmark']:<18} {result['size']:>7}  skipped", flush=True)
+    else:
+        print(f"{result['benchmark']:<18} {result['size']:>7}  {result['median'] * 1000:10.2f} ms", flush=True)
+
+
+def environment():
+    from PySide6 import __version__ as pyside_version
+    return {
+        'python': platform.python_version(),
+        'pyside': pyside_version,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, baseline, threshold):
+    # Returns the number of benchmarks slower than the baseline by more than
+    # threshold (a fraction of the baseline median).
+    previous = {(r['benchmark'], r['size']): r for r in baseline['results'] if 'median' in r}
+    regressions = 0
+    print(f"\n{'benchmark':<18} {'size':>7}  {'baseline':>10}  {'current':>10}  {'change':>8}")
+    for result in results:
+        old = previous.get((result['benchmark'], result['size']))
+        if old is None or 'median' not in result:
+            continue
+        change = result['median'] / old['median'] - 1 if old['median'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  SLOWER'
+            regressions += 1
+        print(f"{result['benchmark']:<18} {result['size']:>7}  {old['median'] * 1000:8.2f}ms  "
+              f"{result['median'] * 1000:8.2f}ms  {change:+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the editor's hot paths.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="comma-separated document sizes, e.g. 1KB,10MB,100MB")
+    parser.add_argument('--only', help="comma-separated benchmarks to run: " + ', '.join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--results', help="compare an existing results file instead of running")
+    parser.add_argument('--compare', help="baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    else:
+        names = args.only.split(',') if args.only else BENCHMARKS
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+        with tempfile.TemporaryDirectory() as directory:
+            # Keeps journals and caches away from the user's own.
+            os.environ['XDG_STATE_HOME'] = os.path.join(directory, 'state')
+            os.environ['XDG_CACHE_HOME'] = os.path.join(directory, 'cache')
+            data = {'environment': environment(), 'results': run_benchmarks(sizes, names, args.repeat, directory)}
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(data['results'], baseline, args.threshold)
+        if regressions:
+            print(f"\n{regressions} benchmark(s) slower than the baseline by more than {args.threshold:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,25 @@
 import sys
+import time
+
+STARTED = time.perf_counter()
+
+from utils import startup_profile
+
+if '--startup-profile' in sys.argv:
+    sys.argv.remove('--startup-profile')
+    startup_profile.enable(STARTED)
+
 from PySide6.QtWidgets import QApplication
+startup_profile.mark("import Qt")
 from main_window import MainWindow
+startup_profile.mark("import main window")
 
 def main():
     app = QApplication(sys.argv)
+    startup_profile.mark("QApplication")
     window = MainWindow()
     window.show()
+    startup_profile.mark("show")
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -1,5 +1,9 @@
 import sys
 import os
+import re
+import time
+import threading
+from bisect import bisect_left
 from PySide6.QtWidgets import (
     QMainWindow,
     QMessageBox,
@@ -7,102 +11,750 @@ from PySide6.QtWidgets import (
     QFontDialog,
     QInputDialog,
     QStyle,
+    QTabWidget,
+    QDockWidget,
 )
-from PySide6.QtGui import QIcon, QTextListFormat, QFont
-from PySide6.QtCore import Qt
+from PySide6.QtGui import QTextListFormat, QFont, QTextCursor
+from PySide6.QtCore import Qt, QThreadPool, QTimer, QEvent, QPoint
 
-from widgets.editor import Editor
+from widgets.document_tab import DocumentTab, MAX_LOADED_DOCUMENTS
 from widgets.menu_bar import MenuBar
 from widgets.tool_bar import ToolBar
 from widgets.status_bar import StatusBar
 from widgets.find_replace_dialog import FindReplaceDialog
-from utils.file_operations import open_file_dialog, save_file_dialog
-from utils.helpers import count_words
+from widgets.find_in_files_dialog import FindInFilesDialog
+from widgets.large_file_view import LargeFileView
+from widgets.markdown_preview import MarkdownPreview
+from widgets.thesaurus_panel import ThesaurusPanel
+from widgets.undo_limits_dialog import UndoLimitsDialog
+from utils.file_operations import (
+    open_file_dialog,
+    save_file_dialog,
+    open_files_dialog,
+    directory_dialog,
+    read_file_chunks,
+    CHUNKS_IN_FLIGHT,
+)
+from utils.helpers import count_words, utf16_length, format_size
+from utils.search import (
+    SearchProcess,
+    compile_pattern,
+    find_all_lines,
+    find_match_positions,
+    find_matches,
+    replace_all,
+    replace_all_in_process,
+    FIND_ALL_TIME_BUDGET,
+    LIVE_SEARCH_TIME_BUDGET
+)
+from utils.large_file import LargeFile, is_large_file
+from utils.find_in_files import create_pool, search_directory
+from utils.resources import get_resource_manager, DEFAULT_THEME
+from utils.workers import Worker
+from utils import startup_profile, instrumentation
+from utils.file_saver import FileSaver
+from utils.session import SessionStore
+from utils.markdown_preview import split_chunks, render_chunks
+from utils.pdf_export import export_pdf
+from utils.spelling import get_spell_checker, add_to_user_dictionary, save_spell_checkers, DEFAULT_LANGUAGE
+from utils.dictionaries import language_name
+from utils.thesaurus import load_compiled_thesaurus, compile_thesaurus, find_thesaurus_file, thesaurus_directory
+from utils.undo_history import DEFAULT_MAX_STEPS, DEFAULT_MAX_BYTES
+from utils.journal import (
+    DocumentJournal,
+    find_recoverable_journals,
+    read_journal_header,
+    replay_journal,
+    discard_journal
+)
+
+AUTOSAVE_INTERVAL = 2000
+SESSION_SAVE_DELAY = 500
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Note Editor")
-        icon_path = os.path.join(os.path.dirname(__file__), 'resources', 'icons', 'save.png')
-        if os.path.exists(icon_path):
-            self.setWindowIcon(QIcon(icon_path))
+        icon = get_resource_manager().icon('save.png')
+        if not icon.isNull():
+            self.setWindowIcon(icon)
         else:
             self.setWindowIcon(self.style().standardIcon(QStyle.SP_FileIcon))
         self.resize(800, 600)
 
-        self.current_file = None
+        self.file_saver = FileSaver(self)
+        self.file_saver.saved.connect(self.on_file_saved)
+        self.file_saver.failed.connect(self.on_file_save_failed)
+        # Journals of tabs closed while their save was still running, by
+        # file path; discarded once the save is confirmed.
+        self.saving_journals = {}
 
-        self.init_ui()
+        self.language = DEFAULT_LANGUAGE
+        # (max steps, max bytes in memory, spill to disk) for every editor.
+        self.undo_limits = (DEFAULT_MAX_STEPS, DEFAULT_MAX_BYTES, False)
 
-    def init_ui(self):
+        # The open tabs are saved shortly after they change and at exit.
+        self.session = SessionStore()
+        self.session_timer = QTimer(self)
+        self.session_timer.setSingleShot(True)
+        self.session_timer.setInterval(SESSION_SAVE_DELAY)
+        self.session_timer.timeout.connect(self.save_session)
 
-        self.editor = Editor(self)
-        self.setCentralWidget(self.editor)
+        self.init_ui()
 
+    def init_ui(self):
         self.status_bar = StatusBar(self)
         self.setStatusBar(self.status_bar)
 
-        self.find_replace_dialog = FindReplaceDialog(self)
+        # Dialogs are built the first time they are shown.
+        self.find_replace_dialog = None
+        self.match_key = None
+        self.match_revision = None
+        self.matches = []
+        self.matches_complete = True
+        self.find_all_worker = None
+        self.match_worker = None
+        self.replace_worker = None
+        self.search_process = SearchProcess()
+        self.live_search_process = SearchProcess()
+        # Live regex scans run one at a time; only the newest waits its turn.
+        self.match_pool = QThreadPool(self)
+        self.match_pool.setMaxThreadCount(1)
+        self.find_when_matched = False
+
+        self.find_in_files_dialog = None
+        self.find_in_files_pool = None
+        self.files_worker = None
+
+        # The preview dock is built the first time it is shown.
+        self.preview_dock = None
+        self.preview = None
+        self.preview_worker = None
+        self.preview_pending = False
+
+        self.export_worker = None
+
+        # Thesauri by language (None if not installed), opened on first use.
+        self.thesaurus_dock = None
+        self.thesaurus_panel = None
+        self.thesauri = {}
+        self.thesaurus_worker = None
+        self.pending_synonyms_word = None
+
+        # Documents are tabs; the editor, file path, journal and load state
+        # below are those of the current tab.
+        self.tabs = QTabWidget(self)
+        self.tabs.setDocumentMode(True)
+        self.tabs.setTabsClosable(True)
+        self.tabs.setMovable(True)
+        self.tabs.tabCloseRequested.connect(lambda index: self.close_tab(self.tabs.widget(index)))
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.setCentralWidget(self.tabs)
+        self.active_tab = None
+        # Most recently used last.
+        self.recent_tabs = []
+        self.key_pressed_at = None
+        if not self.restore_session():
+            self.add_tab()
+        startup_profile.mark("editor and status bar")
 
         self.menu_bar = MenuBar(self)
         self.setMenuBar(self.menu_bar)
 
         self.tool_bar = ToolBar(self)
         self.addToolBar(self.tool_bar)
+        startup_profile.mark("menus and toolbar")
 
-        self.apply_theme("light") # DEFAULT THEME HERE
+        self.apply_theme(DEFAULT_THEME)
+        startup_profile.mark("theme")
 
         self.init_autosave()
+        startup_profile.mark("autosave")
+
+        # Work that is not needed for the first frame runs right after it.
+        self.first_painted = False
+        self.editor.viewport().installEventFilter(self)
+
+        # Keystroke-to-paint latency, measured only when instrumented.
+        if instrumentation.enabled:
+            self.status_bar.set_latency_visible(True)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and obj is self.editor.viewport():
+            if not self.first_painted:
+                self.first_painted = True
+                if not instrumentation.enabled:
+                    obj.removeEventFilter(self)
+                startup_profile.mark("first paint")
+                QTimer.singleShot(0, self.load_deferred_resources)
+            elif self.key_pressed_at is not None:
+                # Runs once the paint event has been handled.
+                QTimer.singleShot(0, self.record_keystroke_latency)
+        elif event.type() == QEvent.KeyPress and obj is self.editor and self.key_pressed_at is None:
+            self.key_pressed_at = time.perf_counter()
+        return super().eventFilter(obj, event)
+
+    def record_keystroke_latency(self):
+        if self.key_pressed_at is None:
+            return
+        instrumentation.record(instrumentation.KEYSTROKE_TO_PAINT, self.key_pressed_at)
+        self.key_pressed_at = None
+        summary = instrumentation.histograms[instrumentation.KEYSTROKE_TO_PAINT].summary()
+        self.status_bar.update_latency(summary['p50_ms'], summary['p95_ms'])
+
+    def export_performance_trace(self):
+        file_path = save_file_dialog(self, "Chrome Trace Files (*.json);;All Files (*.*)")
+        if not file_path:
+            return
+        try:
+            count = instrumentation.export_trace(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not export the trace: {e}")
+            return
+        self.status_bar.show_message(f"Exported {count} trace events to '{os.path.basename(file_path)}'.")
+
+    def load_deferred_resources(self):
+        self.tool_bar.load_icons()
+        startup_profile.mark("deferred toolbar icons")
+        startup_profile.report()
+
+    # Tabs
+    @property
+    def current_tab(self):
+        return self.tabs.currentWidget()
+
+    @property
+    def editor(self):
+        return self.tabs.currentWidget().editor
+
+    @property
+    def current_file(self):
+        return self.tabs.currentWidget().file_path
+
+    @current_file.setter
+    def current_file(self, file_path):
+        self.tabs.currentWidget().file_path = file_path
+        self.update_tab_title(self.tabs.currentWidget())
+
+    @property
+    def large_file_view(self):
+        return self.tabs.currentWidget().large_file_view
+
+    def add_tab(self, file_path=None):
+        tab = DocumentTab(self, file_path)
+        self.create_editor(tab)
+        self.start_journal(tab)
+        self.tabs.setCurrentIndex(self.tabs.addTab(tab, tab.title()))
+        return tab
+
+    def create_editor(self, tab):
+        editor = tab.create_editor()
+        editor.highlighter.progress.connect(self.status_bar.update_progress)
+        editor.highlighter.finished.connect(self.on_spell_check_finished)
+        editor.highlighter.set_checker(get_spell_checker(self.language))
+        editor.history.set_limits(*self.undo_limits)
+        editor.fix_all_requested.connect(self.fix_all_occurrences)
+        editor.add_word_requested.connect(self.add_to_dictionary)
+        editor.changes.dirty.connect(lambda ranges: self.refresh_matches(ranges, editor))
+        editor.changes.dirty.connect(lambda ranges: self.update_preview(editor))
+        editor.verticalScrollBar().valueChanged.connect(lambda value: self.sync_preview_scroll(editor))
+        editor.cursorPositionChanged.connect(lambda: self.update_thesaurus(editor))
+        editor.document().modificationChanged.connect(lambda modified: self.update_tab_title(tab))
+        if instrumentation.enabled:
+            editor.installEventFilter(self)
+            editor.viewport().installEventFilter(self)
+        return editor
+
+    def find_tab(self, file_path):
+        file_path = os.path.abspath(file_path)
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            if tab.file_path and os.path.abspath(tab.file_path) == file_path:
+                return tab
+        return None
+
+    def update_tab_title(self, tab):
+        index = self.tabs.indexOf(tab)
+        if index >= 0:
+            self.tabs.setTabText(index, tab.title())
+            self.tabs.setTabToolTip(index, tab.file_path or "")
+            self.session_timer.start()
+
+    def on_tab_changed(self, index):
+        tab = self.tabs.widget(index)
+        if tab is None or tab is self.active_tab:
+            return
+        previous = self.active_tab
+        if previous is not None and self.tabs.indexOf(previous) >= 0:
+            self.cancel_match_worker()
+            self.find_when_matched = False
+            self.match_key = None
+            self.matches = []
+            previous.suspend()
+        self.active_tab = tab
+        if tab in self.recent_tabs:
+            self.recent_tabs.remove(tab)
+        self.recent_tabs.append(tab)
+
+        if tab.editor is None:
+            self.restore_tab(tab)
+        else:
+            tab.resume()
+        self.unload_inactive_tabs()
+        self.session_timer.start()
+        self.status_bar.update_word_count(tab.editor.word_count)
+        tab.editor.show_undo_usage()
+        if self.find_replace_dialog is not None and self.find_replace_dialog.isVisible():
+            self.find_replace_dialog.update_matches()
+        self.update_preview()
+        self.update_thesaurus()
+
+    def unload_inactive_tabs(self):
+        # Large files are memory-mapped and cost little, and tabs still
+        # loading are left alone. Modified documents stay loaded too: their
+        # journal holds only the text, not the undo history or formatting.
+        loaded = [tab for tab in self.recent_tabs
+                  if tab.editor is not None and tab.large_file_view is None and not tab.is_busy()]
+        excess = len(loaded) - MAX_LOADED_DOCUMENTS
+        for tab in loaded:
+            if excess <= 0:
+                break
+            if tab is not self.active_tab and not tab.editor.document().isModified():
+                self.unload_tab(tab)
+                excess -= 1
+
+    def unload_tab(self, tab):
+        # The document is unmodified, so restore_tab reads it again.
+        self.stop_journal(tab)
+        tab.release_editor()
+
+    def restore_tab(self, tab):
+        editor = self.create_editor(tab)
+        if tab.unloaded_journal is not None:
+            journal_path = tab.unloaded_journal
+            tab.unloaded_journal = None
+            try:
+                text = replay_journal(journal_path, read_journal_header(journal_path))
+            except Exception as e:
+                # The journal cannot be replayed, e.g. because its base file
+                # changed on disk; fall back to the file itself.
+                discard_journal(journal_path)
+                QMessageBox.warning(self, "Error", f"Could not restore unsaved changes to '{tab.title()}': {e}")
+                if tab.file_path and os.path.exists(tab.file_path):
+                    self.load_into(tab, tab.file_path)
+                else:
+                    self.start_journal(tab)
+                return
+            discard_journal(journal_path)
+            editor.setPlainText(text)
+            self.start_journal(tab)
+            tab.journal.compact()
+            editor.document().setModified(True)
+            tab.restore_position()
+        elif tab.file_path:
+            self.load_into(tab, tab.file_path)
+        else:
+            self.start_journal(tab)
+
+    def close_tab(self, tab=None):
+        tab = tab or self.current_tab
+        if tab.is_modified():
+            self.tabs.setCurrentWidget(tab)
+            if not self.maybe_save():
+                return False
+        if tab.journal is not None and tab.file_path and self.file_saver.is_saving(tab.file_path):
+            # Kept until the save is confirmed, for recovery if it fails; as
+            # a snapshot, since a failed save can leave the file changed.
+            tab.journal.compact()
+            tab.journal.close(discard=False)
+            self.saving_journals[os.path.abspath(tab.file_path)] = tab.journal
+            tab.journal = None
+        self.discard_tab(tab)
+        if self.tabs.count() == 0:
+            self.add_tab()
+        return True
+
+    def discard_tab(self, tab):
+        for worker in (tab.load_worker, tab.index_worker):
+            if worker is not None:
+                worker.cancel()
+        tab.load_worker = tab.index_worker = None
+        self.close_large_file(tab)
+        self.stop_journal(tab)
+        if tab.unloaded_journal is not None:
+            discard_journal(tab.unloaded_journal)
+            tab.unloaded_journal = None
+        if tab in self.recent_tabs:
+            self.recent_tabs.remove(tab)
+        if tab is self.active_tab:
+            self.cancel_match_worker()
+            self.match_key = None
+            self.matches = []
+            self.active_tab = None
+        self.tabs.removeTab(self.tabs.indexOf(tab))
+        tab.deleteLater()
+        self.session_timer.start()
+
+    # Session
+    def session_entry(self, tab):
+        entry = {
+            'path': tab.file_path,
+            'cursor': tab.cursor_position or 0,
+            'scroll': tab.scroll_value,
+            'encoding': tab.encoding,
+            'line_ending': tab.line_ending,
+            'journal': tab.unloaded_journal,
+        }
+        editor = tab.editor
+        if editor is not None and tab.large_file_view is None and not tab.is_busy():
+            entry['cursor'] = editor.textCursor().position()
+            entry['scroll'] = editor.verticalScrollBar().value()
+            entry['encoding'] = editor.encoding
+            entry['line_ending'] = editor.line_ending
+            if editor.document().isModified() and tab.journal is not None:
+                entry['journal'] = tab.journal.journal_path
+        return entry
+
+    def save_session(self):
+        entries = []
+        active = 0
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            if tab.is_blank():
+                continue
+            if tab is self.current_tab:
+                active = len(entries)
+            entries.append(self.session_entry(tab))
+        try:
+            self.session.save(entries, active)
+        except OSError as e:
+            self.status_bar.show_message(f"Could not save the session: {e}")
+
+    def restore_session(self):
+        # Tabs come back unloaded; only the active one is read now, the
+        # others when they are first shown. Returns False if nothing was
+        # restored.
+        session = self.session.load()
+        if session is None:
+            return False
+        entries, active = session
+        restored = []
+        active_tab = None
+        for index, entry in enumerate(entries):
+            file_path = entry.get('path')
+            journal_path = entry.get('journal')
+            if journal_path and not os.path.exists(journal_path):
+                journal_path = None
+            if journal_path is None and not (file_path and os.path.exists(file_path)):
+                continue
+            tab = DocumentTab(self, file_path)
+            tab.unloaded_journal = journal_path
+            tab.cursor_position = entry.get('cursor')
+            tab.scroll_value = entry.get('scroll', 0)
+            tab.encoding = entry.get('encoding', 'utf-8')
+            tab.line_ending = entry.get('line_ending', '\n')
+            restored.append(tab)
+            if index <= active:
+                active_tab = tab
+        if not restored:
+            return False
+
+        self.tabs.blockSignals(True)
+        for tab in restored:
+            self.tabs.addTab(tab, tab.title())
+            self.update_tab_title(tab)
+        self.tabs.setCurrentWidget(active_tab or restored[0])
+        self.tabs.blockSignals(False)
+        self.on_tab_changed(self.tabs.currentIndex())
+        return True
 
     def new_file(self):
-        if self.maybe_save():
-            self.editor.clear()
-            self.current_file = None
-            self.status_bar.show_message("New file created.")
+        self.add_tab()
+        self.status_bar.show_message("New file created.")
 
     def open_file(self):
-        if self.maybe_save():
-            file_path = open_file_dialog(
-                self,
-                "Text Files (*.txt);;Markdown Files (*.md);;Rich Text Files (*.rtf);;All Files (*.*)"
-            )
-            if file_path:
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        self.editor.setPlainText(content)
-                    self.current_file = file_path
-                    self.status_bar.show_message(f"Opened '{os.path.basename(file_path)}'")
-                except Exception as e:
-                    QMessageBox.warning(self, "Error", f"Could not open file: {e}")
+        file_path = open_file_dialog(
+            self,
+            "Text Files (*.txt);;Markdown Files (*.md);;Rich Text Files (*.rtf);;All Files (*.*)"
+        )
+        if file_path:
+            self.load_file(file_path)
+
+    def load_file(self, file_path, location=None):
+        # Switches to the file's tab if it is already open; otherwise opens it
+        # in a new tab, or in the current one if that is a blank document.
+        tab = self.find_tab(file_path)
+        if tab is not None:
+            self.tabs.setCurrentWidget(tab)
+            if location is not None:
+                tab.pending_location = location
+                if not tab.is_busy():
+                    self.go_to_pending_location(tab)
+            return
+        tab = self.current_tab
+        if not tab.is_blank():
+            tab = self.add_tab()
+        self.load_into(tab, file_path, location)
+
+    def load_into(self, tab, file_path, location=None):
+        self.cancel_load(tab)
+        self.close_large_file(tab)
+        self.stop_journal(tab)
+        tab.pending_location = location
+        if is_large_file(file_path):
+            self.open_large_file(tab, file_path)
+            return
+
+        # The file is streamed in by a worker; the editor stays read-only and
+        # without undo history until the last chunk has been appended.
+        editor = tab.editor
+        editor.clear()
+        editor.setReadOnly(True)
+        editor.set_undo_enabled(False)
+        tab.file_path = file_path
+        self.update_tab_title(tab)
+
+        credits = threading.Semaphore(CHUNKS_IN_FLIGHT)
+        worker = Worker(read_file_chunks, file_path, credits)
+        worker.signals.partial.connect(lambda text: self.on_file_chunk(tab, worker, credits, text))
+        worker.signals.progress.connect(self.status_bar.update_progress)
+        worker.signals.result.connect(lambda result: self.on_file_loaded(tab, worker, result))
+        worker.signals.error.connect(lambda error: self.on_file_load_failed(tab, worker, error))
+        tab.load_worker = worker
+        self.status_bar.start_progress(f"Opening '{os.path.basename(file_path)}'...", lambda: self.cancel_load(tab))
+        QThreadPool.globalInstance().start(worker)
+
+    def on_file_chunk(self, tab, worker, credits, text):
+        if worker is tab.load_worker:
+            tab.editor.append_text(text)
+            tab.editor.document().setModified(False)
+        credits.release()
+
+    def on_file_loaded(self, tab, worker, result):
+        if worker is not tab.load_worker:
+            return
+        tab.load_worker = None
+        tab.editor.encoding, tab.editor.line_ending = result
+        self.finish_load(tab)
+        self.start_journal(tab)
+        tab.restore_position()
+        self.status_bar.finish_progress(f"Opened '{os.path.basename(tab.file_path)}'")
+        self.go_to_pending_location(tab)
+        self.unload_inactive_tabs()
+
+    def on_file_load_failed(self, tab, worker, error):
+        if worker is not tab.load_worker:
+            return
+        tab.load_worker = None
+        tab.editor.clear()
+        tab.file_path = None
+        self.finish_load(tab)
+        self.start_journal(tab)
+        self.status_bar.finish_progress()
+        QMessageBox.warning(self, "Error", f"Could not open file: {error}")
+
+    def cancel_load(self, tab=None):
+        tab = tab or self.current_tab
+        if tab.index_worker is not None:
+            tab.index_worker.cancel()
+        if tab.load_worker is None:
+            return
+        tab.load_worker.cancel()
+        tab.load_worker = None
+        tab.editor.clear()
+        tab.file_path = None
+        self.finish_load(tab)
+        self.start_journal(tab)
+        self.status_bar.finish_progress("Opening cancelled.")
+
+    def finish_load(self, tab):
+        tab.editor.set_undo_enabled(True)
+        tab.editor.document().setModified(False)
+        tab.editor.setReadOnly(False)
+        tab.editor.moveCursor(QTextCursor.Start)
+        self.update_tab_title(tab)
+        self.update_preview(tab.editor)
+
+    # Large-file mode
+    def open_large_file(self, tab, file_path):
+        try:
+            large_file = LargeFile(file_path)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not open file: {e}")
+            return
+        worker = Worker(large_file.build_index)
+        worker.signals.progress.connect(self.status_bar.update_progress)
+        worker.signals.result.connect(lambda completed: self.on_large_file_indexed(tab, large_file, completed))
+        worker.signals.error.connect(lambda error: self.on_large_file_failed(tab, large_file, error))
+        tab.index_worker = worker
+        self.status_bar.start_progress(f"Indexing '{os.path.basename(file_path)}'...", worker.cancel)
+        QThreadPool.globalInstance().start(worker)
+
+    def on_large_file_indexed(self, tab, large_file, completed):
+        tab.index_worker = None
+        if not completed or self.tabs.indexOf(tab) < 0:
+            large_file.close()
+            self.status_bar.finish_progress("Opening cancelled.")
+            return
+        self.close_large_file(tab)
+        tab.editor.clear()
+        tab.editor.document().setModified(False)
+        tab.large_file_view = LargeFileView(large_file, self)
+        tab.addWidget(tab.large_file_view)
+        tab.setCurrentWidget(tab.large_file_view)
+        tab.file_path = large_file.path
+        self.update_tab_title(tab)
+        self.status_bar.finish_progress(
+            f"Opened '{os.path.basename(large_file.path)}' in large-file mode "
+            f"({large_file.line_count} lines, read-only)."
+        )
+        self.go_to_pending_location(tab)
+
+    def on_large_file_failed(self, tab, large_file, error):
+        tab.index_worker = None
+        large_file.close()
+        self.status_bar.finish_progress()
+        QMessageBox.warning(self, "Error", f"Could not open file: {error}")
+
+    def close_large_file(self, tab=None):
+        tab = tab or self.current_tab
+        if tab.large_file_view is None:
+            return
+        tab.removeWidget(tab.large_file_view)
+        tab.large_file_view.large_file.close()
+        tab.large_file_view.deleteLater()
+        tab.large_file_view = None
+        tab.setCurrentWidget(tab.editor)
+
+    def check_editable(self):
+        if self.large_file_view is not None:
+            self.status_bar.show_message("Large files are opened read-only.")
+            return False
+        return True
 
     def save_file(self):
+        # Returns whether a save was started.
+        if not self.check_editable():
+            return False
         if self.current_file:
-            try:
-                with open(self.current_file, 'w', encoding='utf-8') as f:
-                    f.write(self.editor.toPlainText())
-                self.status_bar.show_message("File saved successfully.")
-            except Exception as e:
-                QMessageBox.warning(self, "Error", f"Could not save file: {e}")
-        else:
-            self.save_file_as()
+            self.write_document(self.current_file)
+            return True
+        return self.save_file_as()
 
     def save_file_as(self):
+        if not self.check_editable():
+            return False
         file_path = save_file_dialog(
             self,
             "Text Files (*.txt);;Markdown Files (*.md);;Rich Text Files (*.rtf);;All Files (*.*)"
         )
-        if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.editor.toPlainText())
-                self.current_file = file_path
-                self.status_bar.show_message("File saved successfully.")
-            except Exception as e:
-                QMessageBox.warning(self, "Error", f"Could not save file: {e}")
+        if not file_path:
+            return False
+        self.current_file = file_path
+        self.write_document(file_path)
+        return True
+
+    def write_document(self, file_path):
+        # Only the snapshot is taken here; encoding and writing happen on
+        # the saver's worker thread.
+        self.file_saver.save(
+            file_path,
+            self.editor.toPlainText(),
+            self.editor.encoding,
+            self.editor.line_ending,
+            self.editor.edit_revision,
+        )
+        self.status_bar.show_message(f"Saving '{os.path.basename(file_path)}'...")
+
+    def on_file_saved(self, file_path, encoding, revision):
+        journal = self.saving_journals.pop(os.path.abspath(file_path), None)
+        tab = self.find_tab(file_path)
+        if journal is not None and tab is None:
+            # Unless the file was opened again, whose journal has the same path.
+            journal.discard()
+        if tab is not None and tab.editor is not None:
+            tab.editor.encoding = encoding
+            if tab.editor.edit_revision == revision:
+                tab.editor.document().setModified(False)
+                if tab.journal is not None:
+                    tab.journal.mark_saved(file_path)
+            elif tab.journal is not None:
+                # The file on disk no longer is the journal's base.
+                tab.journal.compact()
+        self.status_bar.show_message("File saved successfully.")
+
+    def on_file_save_failed(self, file_path, error):
+        message = f"Could not save file: {error}"
+        if self.saving_journals.pop(os.path.abspath(file_path), None) is not None:
+            message += "\nThe unsaved changes will be offered for recovery the next time the editor starts."
+        QMessageBox.warning(self, "Error", message)
 
     def export_as_pdf(self):
-        QMessageBox.information(self, "Export", "Export as PDF is not implemented yet.") # FIND LIBRARY FOR TEXT TO PDF
+        tab = self.current_tab
+        if tab.is_busy():
+            self.status_bar.show_message("Wait for the document to finish opening.")
+            return
+        file_path = save_file_dialog(self, "PDF Files (*.pdf)")
+        if not file_path:
+            return
+        if not file_path.lower().endswith('.pdf'):
+            file_path += '.pdf'
+        title = os.path.basename(tab.file_path) if tab.file_path else "Untitled"
+        # Large files are exported from disk; otherwise from a copy of the
+        # document, so editing can go on while the export runs.
+        source = tab.file_path if tab.large_file_view is not None else self.editor.document().clone()
+        self.start_pdf_export([(source, file_path, title)])
+
+    def export_files_as_pdf(self):
+        file_paths = open_files_dialog(self, "Export Files as PDF", "Text Files (*.txt *.md);;All Files (*.*)")
+        if not file_paths:
+            return
+        directory = directory_dialog(self, "Export To", os.path.dirname(file_paths[0]))
+        if not directory:
+            return
+        jobs = []
+        for file_path in file_paths:
+            name = os.path.splitext(os.path.basename(file_path))[0] + '.pdf'
+            jobs.append((file_path, os.path.join(directory, name), os.path.basename(file_path)))
+        self.start_pdf_export(jobs)
+
+    def start_pdf_export(self, jobs):
+        if self.export_worker is not None:
+            self.status_bar.show_message("An export is already running.")
+            return
+        worker = Worker(export_pdf, jobs, QFont(self.editor.font()))
+        worker.signals.progress.connect(self.status_bar.update_progress)
+        worker.signals.partial.connect(lambda page: self.on_pdf_page(jobs, page))
+        worker.signals.result.connect(lambda exported: self.on_pdf_exported(worker, jobs, exported))
+        worker.signals.error.connect(self.on_pdf_export_failed)
+        worker.signals.finished.connect(lambda: self.on_pdf_export_finished(jobs))
+        self.export_worker = worker
+        self.status_bar.start_progress(f"Exporting '{jobs[0][2]}'...", worker.cancel)
+        QThreadPool.globalInstance().start(worker)
+
+    def on_pdf_page(self, jobs, page):
+        index, number = page
+        prefix = f"({index + 1}/{len(jobs)}) " if len(jobs) > 1 else ""
+        self.status_bar.set_progress_label(f"{prefix}Exporting '{jobs[index][2]}': page {number}...")
+
+    def on_pdf_exported(self, worker, jobs, exported):
+        if worker.cancelled:
+            self.status_bar.finish_progress("Export cancelled.")
+        elif len(jobs) == 1:
+            file_path, pages = exported[0]
+            self.status_bar.finish_progress(f"Exported {pages} pages to '{os.path.basename(file_path)}'.")
+        else:
+            self.status_bar.finish_progress(f"Exported {len(exported)} files.")
+
+    def on_pdf_export_failed(self, error):
+        self.status_bar.finish_progress()
+        QMessageBox.warning(self, "Error", f"Could not export PDF: {error}")
+
+    def on_pdf_export_finished(self, jobs):
+        self.export_worker = None
+        for source, _, _ in jobs:
+            if not isinstance(source, str):
+                source.deleteLater()
 
     def maybe_save(self):
         if self.editor.document().isModified():
@@ -113,20 +765,129 @@ class MainWindow(QMainWindow):
                 QMessageBox.StandardButton.Save | QMessageBox.StandardButton.Discard | QMessageBox.StandardButton.Cancel
             )
             if ret == QMessageBox.StandardButton.Save:
-                self.save_file()
-                return True
+                return self.save_file()
             elif ret == QMessageBox.StandardButton.Discard:
                 return True
             else:
                 return False
         return True
 
+    def closeEvent(self, event):
+        # Unsaved documents are not prompted for: they are kept in their
+        # journals and reopened with the session.
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            for worker in (tab.load_worker, tab.index_worker):
+                if worker is not None:
+                    worker.cancel()
+            if tab.editor is not None:
+                tab.editor.highlighter.cancel_check()
+        self.cancel_find_all()
+        self.cancel_replace_all()
+        self.cancel_find_in_files()
+        if self.preview_worker is not None:
+            self.preview_worker.cancel()
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+        if self.thesaurus_worker is not None:
+            self.thesaurus_worker.cancel()
+        if self.find_in_files_pool is not None:
+            self.find_in_files_pool.shutdown(wait=False, cancel_futures=True)
+        self.clear_matches()
+        self.search_process.close()
+        self.live_search_process.close()
+        self.match_pool.waitForDone()
+        QThreadPool.globalInstance().waitForDone()
+        self.file_saver.wait()
+        save_spell_checkers(wait=True)
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            if tab.editor is not None and tab.editor.document().isModified() and not tab.is_busy():
+                tab.journal.compact()
+        self.save_session()
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            self.stop_journal(tab, discard=not tab.is_modified() or tab.is_busy())
+        event.accept()
+
     def toggle_toolbar(self, state):
         self.tool_bar.setVisible(state)
 
     def toggle_statusbar(self, state):
         self.status_bar.setVisible(state)
 
+    # Markdown preview
+    def toggle_markdown_preview(self, checked):
+        if self.preview_dock is None:
+            if not checked:
+                return
+            self.preview = MarkdownPreview(self)
+            self.preview_dock = QDockWidget("Markdown Preview", self)
+            self.preview_dock.setObjectName("markdown_preview")
+            self.preview_dock.setWidget(self.preview)
+            self.preview_dock.visibilityChanged.connect(self.on_preview_visibility_changed)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.preview_dock)
+        self.preview_dock.setVisible(checked)
+
+    def on_preview_visibility_changed(self, visible):
+        self.menu_bar.markdown_preview_action.setChecked(visible)
+        if visible:
+            self.update_preview()
+
+    def preview_visible(self):
+        return self.preview_dock is not None and self.preview_dock.isVisible()
+
+    def update_preview(self, editor=None):
+        # Only chunks not rendered before go to the worker. Edits made while
+        # it runs are picked up once it finishes.
+        if not self.preview_visible() or (editor is not None and editor is not self.editor):
+            return
+        if self.preview_worker is not None:
+            self.preview_pending = True
+            return
+        tab = self.current_tab
+        if tab.is_busy() or tab.large_file_view is not None:
+            self.preview.clear_chunks()
+            return
+        editor = tab.editor
+        chunks = split_chunks(editor.snapshot_text())
+        missing = self.preview.missing(chunks)
+        if not missing:
+            self.show_preview(chunks)
+            return
+        revision = editor.edit_revision
+        worker = Worker(render_chunks, missing)
+        worker.signals.result.connect(lambda results: self.on_preview_rendered(editor, revision, chunks, results))
+        worker.signals.finished.connect(self.on_preview_worker_finished)
+        self.preview_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def on_preview_rendered(self, editor, revision, chunks, results):
+        self.preview.add_rendered(results)
+        if editor is self.editor and editor.edit_revision == revision and self.preview_visible():
+            self.show_preview(chunks)
+
+    def on_preview_worker_finished(self):
+        self.preview_worker = None
+        if self.preview_pending:
+            self.preview_pending = False
+            self.update_preview()
+
+    def show_preview(self, chunks):
+        self.preview.show_chunks(chunks)
+        self.sync_preview_scroll()
+
+    def sync_preview_scroll(self, editor=None):
+        # Keeps the preview at the source line shown at the top of the editor.
+        if not self.preview_visible() or (editor is not None and editor is not self.editor):
+            return
+        editor = self.editor
+        block = editor.cursorForPosition(QPoint(0, 0)).block()
+        rect = editor.document().documentLayout().blockBoundingRect(block)
+        offset = editor.verticalScrollBar().value() - rect.top()
+        fraction = min(1.0, max(0.0, offset / rect.height())) if rect.height() else 0.0
+        self.preview.scroll_to_line(block.blockNumber(), fraction)
+
     def zoom_in(self):
         current_font = self.editor.font()
         current_size = current_font.pointSize()
@@ -147,68 +908,412 @@ class MainWindow(QMainWindow):
         self.editor.setFont(default_font)
         self.status_bar.show_message("Zoom reset to default (12pt).")
 
+    def show_find_replace(self):
+        if self.find_replace_dialog is None:
+            self.find_replace_dialog = FindReplaceDialog(self)
+        self.find_replace_dialog.show()
+
+    @instrumentation.timed("find_text")
     def find_text(self, text):
         if not text:
             QMessageBox.warning(self, "Input Required", "Please enter text to find.")
             return
 
-        cursor = self.editor.textCursor()
-        document = self.editor.document()
+        options = self.find_replace_dialog.search_options()
+        if self.large_file_view is not None:
+            if self.large_file_view.find_next(text, options['case_sensitive']):
+                self.status_bar.show_message(f"Found '{text}'.")
+            else:
+                QMessageBox.information(self, "Find", f"'{text}' not found.")
+                self.status_bar.show_message(f"'{text}' not found.")
+            return
 
-        if cursor.hasSelection():
-            search_start = cursor.selectionEnd()
+        key = (text, tuple(sorted(options.items())))
+        if (key != self.match_key or self.match_revision != self.editor.edit_revision
+                or not self.matches_complete):
+            if not self.update_matches(text, time_budget=None):
+                QMessageBox.warning(self, "Find", "The search pattern is not a valid regular expression.")
+                return
+        if self.match_worker is not None:
+            # Regex matches are still being collected; step once they arrive.
+            self.find_when_matched = True
+            return
+
+        if self.matches:
+            cursor = self.editor.textCursor()
+            search_start = cursor.selectionEnd() if cursor.hasSelection() else cursor.position()
+            index = bisect_left(self.matches, (search_start, 0))
+            if index == len(self.matches):
+                index = 0
+            position, length = self.matches[index]
+            cursor.setPosition(position)
+            cursor.setPosition(position + length, QTextCursor.KeepAnchor)
+            self.editor.setTextCursor(cursor)
+            self.editor.highlight_matches(self.matches, index)
+            self.find_replace_dialog.set_match_status(index + 1, len(self.matches), self.matches_complete)
+            self.status_bar.show_message(f"Found '{text}' ({index + 1} of {len(self.matches)}).")
         else:
-            search_start = cursor.position()
+            QMessageBox.information(self, "Find", f"'{text}' not found.")
+            self.status_bar.show_message(f"'{text}' not found.")
 
-        found_cursor = document.find(text, search_start)
+    @instrumentation.timed("update_matches")
+    def update_matches(self, text, time_budget=LIVE_SEARCH_TIME_BUDGET):
+        # Recomputes every match of `text` and highlights them all. Literal
+        # searches scan a snapshot of the text within time_budget; regular
+        # expressions run on a worker so a pathological pattern cannot
+        # freeze the editor.
+        # Returns False if the pattern is invalid.
+        if self.large_file_view is not None:
+            self.find_replace_dialog.set_match_status(None, None)
+            return True
+        # A scan still running for older input is left to finish (or hit its
+        # time budget) rather than killed, so the search process survives
+        # typing; its result is ignored. Scans queued behind it never start.
+        self.match_pool.clear()
+        self.match_worker = None
+        options = self.find_replace_dialog.search_options()
+        key = (text, tuple(sorted(options.items())))
+        revision = self.editor.edit_revision
+        try:
+            if options['regex'] and text:
+                pattern = compile_pattern(text, **options)
+            elif not text or '\n' in text:
+                matches, complete = [], True
+            else:
+                matches, complete = find_matches(compile_pattern(text, **options), self.editor.snapshot_text(), time_budget)
+        except re.error as e:
+            self.clear_matches()
+            self.find_replace_dialog.show_pattern_error(e)
+            return False
 
-        if found_cursor.isNull():
-            found_cursor = document.find(text, 0)
+        if options['regex'] and text:
+            self.match_key = key
+            self.match_revision = revision
+            worker = Worker(find_match_positions, self.live_search_process, pattern,
+                            self.editor.snapshot_text().split('\n'))
+            worker.signals.result.connect(lambda result: self.on_matches_found(worker, key, revision, result))
+            self.match_worker = worker
+            self.find_replace_dialog.show_searching()
+            self.match_pool.start(worker)
+        else:
+            self.set_matches(key, revision, matches, complete)
+        return True
 
-        if not found_cursor.isNull():
-            self.editor.setTextCursor(found_cursor)
-            self.editor.setFocus()
-            self.status_bar.show_message(f"Found '{text}'.")
+    def on_matches_found(self, worker, key, revision, result):
+        if worker is not self.match_worker or result is None:
+            return
+        self.match_worker = None
+        self.set_matches(key, revision, *result)
+        if self.find_when_matched:
+            self.find_when_matched = False
+            self.find_text(key[0])
+
+    def set_matches(self, key, revision, matches, complete):
+        self.match_key = key
+        self.match_revision = revision
+        self.matches = matches
+        self.matches_complete = complete
+        self.editor.highlight_matches(self.matches)
+        self.find_replace_dialog.set_match_status(0 if key[0] else None, len(self.matches), complete)
+
+    def cancel_match_worker(self):
+        self.match_pool.clear()
+        if self.match_worker is not None:
+            self.match_worker.cancel()
+            self.match_worker = None
+
+    def refresh_matches(self, ranges=None, editor=None):
+        if editor is not None and editor is not self.editor:
+            return
+        if self.match_key and self.find_replace_dialog is not None and self.find_replace_dialog.isVisible():
+            self.update_matches(self.match_key[0])
+
+    def clear_matches(self):
+        self.cancel_match_worker()
+        self.find_when_matched = False
+        self.match_key = None
+        self.matches = []
+        self.editor.highlight_matches([])
+
+    def find_all_text(self, text):
+        self.cancel_find_all()
+        options = self.find_replace_dialog.search_options()
+        try:
+            pattern = compile_pattern(text, **options)
+        except re.error as e:
+            self.find_replace_dialog.show_pattern_error(e)
+            return
+
+        # The scan runs on a snapshot in the search process, so the editor
+        # stays usable and a runaway pattern can be stopped.
+        if self.large_file_view is not None:
+            large_file = self.large_file_view.large_file
+            worker = Worker(find_all_lines, self.search_process, pattern,
+                            source=(large_file.path, large_file.encoding), total=large_file.line_count)
         else:
-            QMessageBox.information(self, "Find", f"'{text}' not found.")
-            self.status_bar.show_message(f"'{text}' not found.")
+            lines = self.editor.snapshot_text().split('\n')
+            worker = Worker(find_all_lines, self.search_process, pattern, lines=lines, total=len(lines))
+
+        self.find_replace_dialog.clear_results()
+        worker.signals.partial.connect(lambda results: self.on_find_all_results(worker, results))
+        worker.signals.progress.connect(self.status_bar.update_progress)
+        worker.signals.result.connect(lambda result: self.on_find_all_done(worker, result))
+        worker.signals.error.connect(lambda error: self.on_find_all_failed(worker, error))
+        self.find_all_worker = worker
+        self.status_bar.start_progress(f"Finding all '{text}'...", self.cancel_find_all)
+        QThreadPool.globalInstance().start(worker)
 
+    def on_find_all_results(self, worker, results):
+        if worker is self.find_all_worker:
+            self.find_replace_dialog.add_results(results)
+
+    def on_find_all_done(self, worker, result):
+        if worker is not self.find_all_worker:
+            return
+        self.find_all_worker = None
+        status, found = result
+        messages = {
+            'done': f"Found {found} matches.",
+            'limit': f"Stopped after the first {found} matches.",
+            'timeout': f"Search stopped after {FIND_ALL_TIME_BUDGET:.0f}s; showing {found} matches.",
+        }
+        self.status_bar.finish_progress(messages[status])
+
+    def on_find_all_failed(self, worker, error):
+        if worker is not self.find_all_worker:
+            return
+        self.find_all_worker = None
+        self.status_bar.finish_progress()
+        QMessageBox.warning(self, "Find All", f"Search failed: {error}")
+
+    def cancel_find_all(self):
+        if self.find_all_worker is None:
+            return
+        self.find_all_worker.cancel()
+        self.find_all_worker = None
+        self.status_bar.finish_progress("Search cancelled.")
+
+    def go_to_result(self, line, start, end, text):
+        if self.large_file_view is not None:
+            self.large_file_view.go_to_line(line, start, end - start)
+            return
+        block = self.editor.document().findBlockByNumber(line)
+        if not block.isValid():
+            return
+        position = block.position() + utf16_length(text[:start])
+        cursor = self.editor.textCursor()
+        cursor.setPosition(min(position, block.position() + block.length() - 1))
+        cursor.setPosition(min(position + utf16_length(text[start:end]), block.position() + block.length() - 1),
+                           QTextCursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.editor.ensureCursorVisible()
 
     def replace_text(self, find_text, replace_text):
-        if not find_text:
+        if not find_text or not self.check_editable():
             return
-        
+
+        options = self.find_replace_dialog.search_options()
         cursor = self.editor.textCursor()
 
-        if cursor.hasSelection() and cursor.selectedText() == find_text:
-            cursor.insertText(replace_text)
-            self.status_bar.show_message(f"Replaced '{find_text}' with '{replace_text}'.")
-            self.find_text(find_text)
-        else:
-            self.find_text(find_text)
+        if cursor.hasSelection():
+            try:
+                match = compile_pattern(find_text, **options).fullmatch(cursor.selectedText())
+                replacement = match.expand(replace_text) if match and options['regex'] else replace_text
+            except re.error as e:
+                QMessageBox.warning(self, "Replace", f"Invalid pattern: {e}")
+                return
+            if match:
+                cursor.insertText(replacement)
+                self.status_bar.show_message(f"Replaced '{find_text}' with '{replacement}'.")
+        self.find_text(find_text)
 
+    @instrumentation.timed("replace_all_text")
     def replace_all_text(self, find_text, replace_text):
-        if not find_text:
+        if not find_text or not self.check_editable():
             return
 
-        document = self.editor.document()
-        cursor = self.editor.textCursor()
-        cursor.beginEditBlock() 
+        options = self.find_replace_dialog.search_options()
+        try:
+            pattern = compile_pattern(find_text, **options)
+        except re.error as e:
+            QMessageBox.warning(self, "Replace All", f"Invalid pattern: {e}")
+            return
+
+        # All matches are found in one pass over a snapshot and replaced one
+        # by one inside a single edit block.
+        started = time.perf_counter()
+        text = self.editor.snapshot_text()
+        revision = self.editor.edit_revision
+        if not options['regex']:
+            self.apply_replacements(find_text, replace_text, replace_all(pattern, replace_text, text), started)
+            return
 
-        found_cursor = document.find(find_text, 0) 
-        occurrences = 0
+        self.cancel_replace_all()
+        worker = Worker(replace_all_in_process, self.search_process, pattern, replace_text, text)
+        worker.signals.result.connect(
+            lambda result: self.on_replacements_ready(worker, find_text, replace_text, revision, started, result))
+        worker.signals.error.connect(lambda error: self.on_replace_all_failed(worker, error))
+        self.replace_worker = worker
+        self.status_bar.start_progress(f"Replacing '{find_text}'...", self.cancel_replace_all)
+        QThreadPool.globalInstance().start(worker)
 
-        while not found_cursor.isNull():
-            occurrences += 1
-            found_cursor.insertText(replace_text)
-            found_cursor = document.find(find_text, found_cursor)
+    def on_replacements_ready(self, worker, find_text, replace_text, revision, started, result):
+        if worker is not self.replace_worker:
+            return
+        self.replace_worker = None
+        status, replacements = result
+        if status == 'timeout':
+            self.status_bar.finish_progress(f"Replace All stopped after {FIND_ALL_TIME_BUDGET:.0f}s.")
+            return
+        if revision != self.editor.edit_revision:
+            self.status_bar.finish_progress("The document changed; Replace All was not applied.")
+            return
+        self.status_bar.finish_progress()
+        self.apply_replacements(find_text, replace_text, replacements, started)
 
-        cursor.endEditBlock()
+    def on_replace_all_failed(self, worker, error):
+        if worker is not self.replace_worker:
+            return
+        self.replace_worker = None
+        self.status_bar.finish_progress()
+        QMessageBox.warning(self, "Replace All", f"Replace All failed: {error}")
 
-        if occurrences > 0:
-            self.status_bar.show_message(f"Replaced all {occurrences} occurrences of '{find_text}' with '{replace_text}'.")
-        else:
+    def cancel_replace_all(self):
+        if self.replace_worker is None:
+            return
+        self.replace_worker.cancel()
+        self.replace_worker = None
+        self.status_bar.finish_progress("Replace All cancelled.")
+
+    @instrumentation.timed("apply_replacements")
+    def apply_replacements(self, find_text, replace_text, replacements, started):
+        if replacements is None:
             self.status_bar.show_message(f"No occurrences of '{find_text}' found.")
+            return
+        edits, changed_lines = replacements
+        count = len(edits)
+        # Last match first, so the positions of the others stay valid.
+        with self.editor.bulk_edit(changed_lines) as cursor:
+            for start, end, new_text in reversed(edits):
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.KeepAnchor)
+                cursor.insertText(new_text)
+        elapsed = time.perf_counter() - started
+        self.status_bar.show_message(
+            f"Replaced all {count} occurrences of '{find_text}' with '{replace_text}' in {elapsed:.2f}s.")
+
+    def fix_all_occurrences(self, word, replacement):
+        # Replaces the misspelled word wherever it appears as a whole word, in
+        # its exact case, as one edit.
+        if not self.check_editable():
+            return
+        started = time.perf_counter()
+        pattern = compile_pattern(word, case_sensitive=True, whole_word=True)
+        text = self.editor.snapshot_text()
+        self.apply_replacements(word, replacement, replace_all(pattern, replacement, text), started)
+
+    def change_undo_limits(self):
+        dialog = UndoLimitsDialog(*self.undo_limits, self)
+        if not dialog.exec():
+            return
+        self.undo_limits = dialog.limits()
+        for index in range(self.tabs.count()):
+            editor = self.tabs.widget(index).editor
+            if editor is not None:
+                editor.history.set_limits(*self.undo_limits)
+        self.editor.show_undo_usage()
+        max_steps, max_bytes, spill = self.undo_limits
+        where = "older steps are kept on disk" if spill else "older steps are dropped"
+        self.status_bar.show_message(f"Undo history limited to {max_steps} steps and {format_size(max_bytes)}; {where}.")
+
+    # Find in Files
+    def show_find_in_files(self):
+        if self.find_in_files_dialog is None:
+            self.find_in_files_dialog = FindInFilesDialog(self)
+        self.find_in_files_dialog.show()
+        self.find_in_files_dialog.raise_()
+        self.find_in_files_dialog.activateWindow()
+
+    def find_in_files(self, text, folder, include, exclude):
+        self.cancel_find_in_files()
+        dialog = self.find_in_files_dialog
+        try:
+            pattern = compile_pattern(text, **dialog.search_options())
+        except re.error as e:
+            QMessageBox.warning(dialog, "Find in Files", f"Invalid pattern: {e}")
+            return
+        if self.find_in_files_pool is None:
+            self.find_in_files_pool = create_pool()
+
+        started = time.perf_counter()
+        worker = Worker(search_directory, self.find_in_files_pool, folder, include, exclude, pattern)
+        worker.signals.partial.connect(lambda results: self.on_files_results(worker, results))
+        worker.signals.progress.connect(self.status_bar.update_progress)
+        worker.signals.result.connect(lambda result: self.on_files_searched(worker, started, result))
+        worker.signals.error.connect(lambda error: self.on_files_search_failed(worker, error))
+        self.files_worker = worker
+        dialog.clear_results()
+        dialog.set_running(True)
+        self.status_bar.start_progress(f"Searching '{folder}'...", self.cancel_find_in_files)
+        QThreadPool.globalInstance().start(worker)
+
+    def on_files_results(self, worker, results):
+        if worker is self.files_worker:
+            self.find_in_files_dialog.add_results(results)
+
+    def on_files_searched(self, worker, started, result):
+        if worker is not self.files_worker:
+            return
+        self.files_worker = None
+        status, searched, cached, found = result
+        summary = (f"{found} matches; searched {searched} files, {cached} unchanged "
+                   f"files from cache, in {time.perf_counter() - started:.2f}s.")
+        self.find_in_files_dialog.set_running(False)
+        self.find_in_files_dialog.set_summary(summary)
+        self.status_bar.finish_progress(summary)
+
+    def on_files_search_failed(self, worker, error):
+        if worker is not self.files_worker:
+            return
+        self.files_worker = None
+        self.find_in_files_dialog.set_running(False)
+        self.find_in_files_dialog.set_summary("")
+        self.status_bar.finish_progress()
+        QMessageBox.warning(self, "Find in Files", f"Search failed: {error}")
+
+    def cancel_find_in_files(self):
+        if self.files_worker is None:
+            return
+        self.files_worker.cancel()
+        self.files_worker = None
+        self.find_in_files_dialog.set_running(False)
+        self.find_in_files_dialog.set_summary("Search cancelled.")
+        self.status_bar.finish_progress("Search cancelled.")
+
+    def open_file_at(self, file_path, line, start, end, text):
+        self.load_file(file_path, (line, start, end, text))
+
+    def go_to_pending_location(self, tab):
+        if tab.pending_location is not None and tab is self.current_tab:
+            location = tab.pending_location
+            tab.pending_location = None
+            self.go_to_result(*location)
+
+    def go_to_line(self):
+        if self.large_file_view is not None:
+            line_count = self.large_file_view.large_file.line_count
+        else:
+            line_count = self.editor.document().blockCount()
+        line, ok = QInputDialog.getInt(self, "Go to Line", f"Line (1-{line_count}):", 1, 1, line_count)
+        if not ok:
+            return
+        if self.large_file_view is not None:
+            self.large_file_view.go_to_line(line - 1)
+        else:
+            block = self.editor.document().findBlockByNumber(line - 1)
+            self.editor.setTextCursor(QTextCursor(block))
+            self.editor.setFocus()
+        self.status_bar.show_message(f"Moved to line {line}.")
 
     def change_font(self):
         font, ok = QFontDialog.getFont(self.editor.font(), self, "Select Font")
@@ -236,12 +1341,17 @@ class MainWindow(QMainWindow):
 
     def add_bullets(self):
         cursor = self.editor.textCursor()
+        # One undo step for the new block and its list.
+        cursor.beginEditBlock()
         cursor.insertList(QTextListFormat.ListDisc)
+        cursor.endEditBlock()
         self.status_bar.show_message("Bulleted list added.")
 
     def add_numbering(self):
         cursor = self.editor.textCursor()
+        cursor.beginEditBlock()
         cursor.insertList(QTextListFormat.ListDecimal)
+        cursor.endEditBlock()
         self.status_bar.show_message("Numbered list added.")
 
     # Tools
@@ -250,17 +1360,165 @@ class MainWindow(QMainWindow):
         QMessageBox.information(self, "Word Count", f"Total Words: {count}")
 
     def spell_check(self):
-        self.editor.highlighter.rehighlight()
-        self.status_bar.show_message("Spell check completed.")
+        highlighter = self.editor.highlighter
+        if not highlighter.checker.loaded:
+            self.status_bar.show_message("Loading spelling dictionary...")
+            highlighter.checker.ready.connect(self.spell_check, Qt.SingleShotConnection)
+            highlighter.checker.load()
+            return
+        if not highlighter.checker.dictionary:
+            self.status_bar.show_message("No spelling dictionary available.")
+            return
+        self.status_bar.start_progress("Checking spelling...", highlighter.cancel_check)
+        highlighter.check_document()
+
+    def on_spell_check_finished(self, completed, misspelled):
+        if completed:
+            cache = self.editor.highlighter.checker.cache
+            self.status_bar.finish_progress(
+                f"Spell check completed: {misspelled} misspelled words "
+                f"({cache.hits} cache hits, {cache.misses} misses)."
+            )
+        else:
+            self.status_bar.finish_progress("Spell check cancelled.")
 
     def open_thesaurus(self):
-        QMessageBox.information(self, "Thesaurus", "Thesaurus is not implemented yet.")
+        if self.thesaurus_dock is None:
+            self.thesaurus_panel = ThesaurusPanel(self)
+            self.thesaurus_panel.lookup_requested.connect(self.look_up_synonyms)
+            self.thesaurus_panel.replace_requested.connect(self.replace_with_synonym)
+            self.thesaurus_dock = QDockWidget("Thesaurus", self)
+            self.thesaurus_dock.setObjectName("thesaurus")
+            self.thesaurus_dock.setWidget(self.thesaurus_panel)
+            self.addDockWidget(Qt.RightDockWidgetArea, self.thesaurus_dock)
+        self.thesaurus_dock.show()
+        self.thesaurus_dock.raise_()
+        self.thesaurus_panel.word = None
+        self.update_thesaurus()
+
+    def update_thesaurus(self, editor=None):
+        # Follows the word at the cursor while the panel is open.
+        if self.thesaurus_dock is None or not self.thesaurus_dock.isVisible():
+            return
+        if (editor is not None and editor is not self.editor) or self.large_file_view is not None:
+            return
+        found = self.editor.word_at(self.editor.textCursor())
+        if found is not None and found[2] != self.thesaurus_panel.word:
+            self.look_up_synonyms(found[2])
+
+    def look_up_synonyms(self, word):
+        if not word:
+            return
+        thesaurus = self.current_thesaurus()
+        if thesaurus is not None:
+            self.thesaurus_panel.show_entry(word, thesaurus.lookup(word))
+        elif self.thesaurus_worker is not None:
+            self.pending_synonyms_word = word
+            self.thesaurus_panel.clear_entry("Preparing the thesaurus...")
+        else:
+            self.thesaurus_panel.clear_entry(
+                f"No thesaurus is installed for {language_name(self.language)}. "
+                f"Add th_{self.language}_v2.dat to '{thesaurus_directory()}'.")
+
+    def current_thesaurus(self):
+        # The thesaurus of the spelling language. A compiled one opens at
+        # once; otherwise its data file is compiled on a worker and None is
+        # returned meanwhile.
+        language = self.language
+        if language in self.thesauri:
+            return self.thesauri[language]
+        thesaurus = load_compiled_thesaurus(language)
+        if thesaurus is not None or find_thesaurus_file(language) is None:
+            self.thesauri[language] = thesaurus
+            return thesaurus
+        if self.thesaurus_worker is None:
+            worker = Worker(compile_thesaurus, language)
+            worker.signals.result.connect(lambda thesaurus: self.on_thesaurus_compiled(language, thesaurus))
+            worker.signals.error.connect(lambda error: self.on_thesaurus_compiled(language, None, error))
+            self.thesaurus_worker = worker
+            QThreadPool.globalInstance().start(worker)
+        return None
+
+    def on_thesaurus_compiled(self, language, thesaurus, error=None):
+        self.thesaurus_worker = None
+        self.thesauri[language] = thesaurus
+        if error:
+            self.status_bar.show_message(f"Could not load the thesaurus: {error}")
+        word, self.pending_synonyms_word = self.pending_synonyms_word, None
+        if word and self.thesaurus_dock.isVisible():
+            self.look_up_synonyms(word)
+
+    def replace_with_synonym(self, synonym):
+        # Replaces the looked-up word at the cursor, keeping its capitalization.
+        if not self.check_editable():
+            return
+        found = self.editor.word_at(self.editor.textCursor())
+        word = self.thesaurus_panel.word
+        if found is None or word is None or found[2].lower() != word.lower():
+            self.status_bar.show_message("Place the cursor on the word to replace.")
+            return
+        start, end, word = found
+        if len(word) > 1 and word.isupper():
+            synonym = synonym.upper()
+        elif word[:1].isupper():
+            synonym = synonym[:1].upper() + synonym[1:]
+        self.editor.replace_range(start, end, synonym)
 
     def select_language(self):
-        languages = ["English", "Spanish", "French", "German", "Chinese"]
-        language, ok = QInputDialog.getItem(self, "Select Language", "Language:", languages, 0, False)
-        if ok and language:
-            QMessageBox.information(self, "Language Selection", f"Language set to {language}.")
+        try:
+            import enchant
+            installed = set(enchant.list_languages())
+        except ImportError:
+            installed = set()
+            QMessageBox.warning(self, "Select Language",
+                                "Spell checking is unavailable because the enchant library is not installed.")
+        languages = sorted(installed | {self.language})
+        names = [f"{language_name(language)} [{language}]" for language in languages]
+        name, ok = QInputDialog.getItem(self, "Select Language", "Language:", names,
+                                        languages.index(self.language), False)
+        if ok and name:
+            self.set_language(languages[names.index(name)])
+
+    def set_language(self, language):
+        # Dictionaries are loaded on first use and kept, so switching back
+        # is immediate.
+        if language == self.language:
+            return
+        self.language = language
+        checker = get_spell_checker(language)
+        for index in range(self.tabs.count()):
+            editor = self.tabs.widget(index).editor
+            if editor is not None:
+                editor.highlighter.set_checker(checker)
+        if self.thesaurus_panel is not None:
+            self.thesaurus_panel.word = None
+            self.update_thesaurus()
+        if checker.loaded:
+            self.status_bar.show_message(f"Spelling language set to {language_name(language)}.")
+        else:
+            self.status_bar.show_message(f"Loading the {language_name(language)} dictionary...")
+
+    def add_word_to_dictionary(self):
+        cursor = self.editor.textCursor()
+        if cursor.hasSelection():
+            word = cursor.selectedText().strip()
+        else:
+            found = self.editor.word_at(cursor)
+            word = found[2] if found is not None else ''
+        if not word or any(character.isspace() for character in word):
+            self.status_bar.show_message("Place the cursor on a word to add it to the dictionary.")
+            return
+        self.add_to_dictionary(word)
+
+    def add_to_dictionary(self, word):
+        if not add_to_user_dictionary(word):
+            self.status_bar.show_message(f"'{word}' is already in the dictionary.")
+            return
+        for index in range(self.tabs.count()):
+            editor = self.tabs.widget(index).editor
+            if editor is not None:
+                editor.highlighter.recheck()
+        self.status_bar.show_message(f"Added '{word}' to the dictionary.")
 
     # Help
     def open_documentation(self):
@@ -277,35 +1535,107 @@ class MainWindow(QMainWindow):
         QMessageBox.information(self, "Check for Updates", "No updates available.")
 
     def apply_theme(self, theme_name):
-        styles_path = os.path.join(os.path.dirname(__file__), 'resources', 'styles', f"{theme_name}.qss")
-        if os.path.exists(styles_path):
-            with open(styles_path, 'r') as f:
-                self.setStyleSheet(f.read())
-            self.status_bar.show_message(f"{theme_name.capitalize()} theme applied.")
-        else:
+        resources = get_resource_manager()
+        stylesheet = resources.stylesheet(theme_name)
+        if stylesheet is None:
             self.status_bar.show_message("Theme file not found.")
+            return
+        # Re-applying the same stylesheet would still repolish every widget.
+        if theme_name != resources.active_theme:
+            self.setStyleSheet(stylesheet)
+            resources.active_theme = theme_name
+        self.menu_bar.toggle_theme_action.setChecked(theme_name == "dark")
+        self.status_bar.show_message(f"{theme_name.capitalize()} theme applied.")
 
     def toggle_theme(self):
-        current_style = self.styleSheet()
-        if "background-color: #2b2b2b;" in current_style or "background-color: #1e1e1e;" in current_style:
-            self.apply_theme("light")
-        else:
-            self.apply_theme("dark")
+        theme_name = get_resource_manager().next_theme()
+        if theme_name is not None:
+            self.apply_theme(theme_name)
 
     # Autosave
     def init_autosave(self):
         from PySide6.QtCore import QTimer 
         self.autosave_timer = QTimer(self)
         self.autosave_timer.timeout.connect(self.autosave)
-        self.autosave_timer.start(300000) 
+        self.autosave_timer.start(AUTOSAVE_INTERVAL)
+        QTimer.singleShot(0, self.offer_recovery)
+
+    def start_journal(self, tab):
+        self.stop_journal(tab)
+        tab.journal = DocumentJournal(tab.editor.document(), tab.file_path)
+
+    def stop_journal(self, tab, discard=True):
+        if tab.journal is not None:
+            tab.journal.close(discard)
+            tab.journal = None
 
     def autosave(self):
-        temp_dir = os.path.join(os.getenv('APPDATA'), 'NoteEditor2')
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, 'autosave.txt')
+        flushed = False
         try:
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(self.editor.toPlainText())
-            self.status_bar.show_message("Autosaved.")
+            for index in range(self.tabs.count()):
+                journal = self.tabs.widget(index).journal
+                if journal is not None and journal.flush():
+                    flushed = True
         except Exception as e:
             self.status_bar.show_message(f"Autosave failed: {e}")
+            return
+        # Also picks up cursor and scroll changes.
+        self.save_session()
+        save_spell_checkers()
+        if flushed:
+            self.status_bar.show_message("Autosaved.")
+
+    def offer_recovery(self):
+        # Journals of session tabs are reopened with their tabs.
+        session_journals = set()
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            session_journals.add(tab.unloaded_journal)
+            if tab.journal is not None:
+                session_journals.add(tab.journal.journal_path)
+        for journal_path, header in find_recoverable_journals():
+            if journal_path in session_journals:
+                continue
+            name = os.path.basename(header.get('path') or "Untitled")
+            ret = QMessageBox.question(
+                self,
+                "Recover Unsaved Changes",
+                f"Unsaved changes to '{name}' from a previous session were found.\nDo you want to recover them?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if ret != QMessageBox.StandardButton.Yes:
+                discard_journal(journal_path)
+                continue
+            try:
+                text = replay_journal(journal_path, header)
+            except Exception as e:
+                QMessageBox.warning(self, "Recovery Failed", f"Could not recover changes: {e}")
+                continue
+            discard_journal(journal_path)
+            # Each recovered document gets its own tab.
+            file_path = header.get('path')
+            tab = self.find_tab(file_path) if file_path else None
+            if tab is not None and (tab.is_busy() or tab.is_modified()):
+                # A tab still loading or with unsaved changes of its own is
+                # kept as it is; the recovered text goes into a new, untitled
+                # tab, as two journals for one path would overwrite each
+                # other.
+                file_path = None
+                tab = None
+            elif tab is not None:
+                # The recovered text replaces what the tab would read from
+                # the file, so an unloaded tab just gets its editor back and
+                # a large-file tab leaves large-file mode.
+                if tab.editor is None:
+                    self.create_editor(tab)
+                self.close_large_file(tab)
+            if tab is None:
+                tab = self.current_tab if self.current_tab.is_blank() else self.add_tab()
+            self.tabs.setCurrentWidget(tab)
+            tab.file_path = file_path
+            tab.editor.setPlainText(text)
+            self.start_journal(tab)
+            tab.journal.compact()
+            tab.editor.document().setModified(True)
+            self.update_tab_title(tab)
+            self.status_bar.show_message(f"Recovered unsaved changes to '{name}'.")
@@ -0,0 +1,37 @@
+from utils.search import compile_pattern, replace_all, scan_positions
+
+TEXT = "abc\nfoo abc\nabc"
+
+
+def found(pattern, text):
+    matches, complete = scan_positions(pattern, text.split('\n'))
+    return [(start, start + length) for start, length in matches]
+
+
+def replaced(pattern, text, replacement='X'):
+    edits, changed_lines = replace_all(pattern, replacement, text, regex=True)
+    return [(start, end) for start, end, new in edits]
+
+
+def test_start_anchor_replaces_what_find_shows():
+    pattern = compile_pattern('^abc', regex=True)
+    assert found(pattern, TEXT) == [(0, 3), (12, 15)]
+    assert replaced(pattern, TEXT) == found(pattern, TEXT)
+
+
+def test_end_anchor_replaces_what_find_shows():
+    pattern = compile_pattern('abc$', regex=True)
+    assert found(pattern, TEXT) == [(0, 3), (8, 11), (12, 15)]
+    assert replaced(pattern, TEXT) == found(pattern, TEXT)
+
+
+def test_matches_stay_within_a_line():
+    pattern = compile_pattern(r'c\s+f', regex=True)
+    assert replace_all(pattern, 'X', TEXT, regex=True) is None
+
+
+def test_positions_count_utf16_units():
+    pattern = compile_pattern('é')
+    edits, changed_lines = replace_all(pattern, 'e', "a\U0001F600é\né")
+    assert edits == [(3, 4, 'e'), (5, 6, 'e')]
+    assert changed_lines == {0, 1}
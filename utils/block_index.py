@@ -0,0 +1,102 @@
+# utils/block_index.py
+
+from PySide6.QtCore import QObject
+from utils import instrumentation
+
+
+class BlockIndex(QObject):
+    # Keeps one computed value per QTextBlock and only recomputes the blocks
+    # touched by QTextDocument.contentsChange. Subclasses implement compute()
+    # and may override reset() and replaced() to maintain aggregates.
+    def __init__(self, document, parent=None, enabled=True):
+        super().__init__(parent)
+        self.document = document
+        self.values = []
+        self.enabled = enabled
+        self.suspended = False
+        if enabled:
+            self.rebuild()
+        self.document.contentsChange.connect(self.on_contents_change)
+
+    def compute(self, text):
+        raise NotImplementedError
+
+    def reset(self):
+        pass
+
+    def replaced(self, first_number, old_values, new_values):
+        pass
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            self.rebuild()
+
+    def disable(self):
+        # Frees the values; enable() rebuilds them.
+        self.enabled = False
+        self.values = []
+        self.reset()
+
+    def suspend(self):
+        # Ignores changes until resume(), for one large edit.
+        self.suspended = True
+
+    def resume(self, changed_blocks=None):
+        # Catches up after suspend(). If the edit kept the block structure the
+        # caller can pass the numbers of the blocks it changed; otherwise the
+        # whole index is rebuilt.
+        self.suspended = False
+        if not self.enabled:
+            return
+        if changed_blocks is None or len(self.values) != self.document.blockCount():
+            self.rebuild()
+            return
+        block = None
+        for number in sorted(changed_blocks):
+            if block is None or block.blockNumber() + 1 != number:
+                block = self.document.findBlockByNumber(number)
+            else:
+                block = block.next()
+            self.values[number] = self.compute(block.text())
+        self.reset()
+
+    def rebuild(self):
+        self.values = []
+        block = self.document.begin()
+        while block.isValid():
+            self.values.append(self.compute(block.text()))
+            block = block.next()
+        self.reset()
+
+    @instrumentation.timed("block index update")
+    def on_contents_change(self, position, chars_removed, chars_added):
+        if not self.enabled or self.suspended:
+            return
+        document = self.document
+        first = document.findBlock(position)
+        last = document.findBlock(position + chars_added)
+        if not last.isValid():
+            last = document.lastBlock()
+        if not first.isValid():
+            self.rebuild()
+            return
+
+        first_number = first.blockNumber()
+        last_number = last.blockNumber()
+        # Blocks after `last` are untouched, so the old range ends where the
+        # unchanged suffix of the old block list starts.
+        old_last = last_number - (document.blockCount() - len(self.values))
+        if old_last < first_number or old_last >= len(self.values):
+            self.rebuild()
+            return
+
+        new_values = []
+        block = first
+        for _ in range(last_number - first_number + 1):
+            new_values.append(self.compute(block.text()))
+            block = block.next()
+
+        old_values = self.values[first_number:old_last + 1]
+        self.values[first_number:old_last + 1] = new_values
+        self.replaced(first_number, old_values, new_values)
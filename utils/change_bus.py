@@ -0,0 +1,58 @@
+# utils/change_bus.py
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+DEFAULT_INTERVAL = 100
+MAX_RANGES = 64
+
+
+class ChangeBus(QObject):
+    # Collects QTextDocument.contentsChange notifications and emits them as
+    # one sorted list of merged (start, end) dirty ranges, in current document
+    # positions, at most once per interval. Expensive consumers subscribe to
+    # `dirty` instead of textChanged.
+    dirty = Signal(list)
+
+    def __init__(self, document, interval=DEFAULT_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.ranges = []
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+        document.contentsChange.connect(self.on_contents_change)
+
+    def set_interval(self, interval):
+        self.timer.setInterval(interval)
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        delta = chars_added - chars_removed
+        old_end = position + chars_removed
+        new_start, new_end = position, position + chars_added
+        ranges = []
+        for start, end in self.ranges:
+            if start > old_end:
+                ranges.append((start + delta, end + delta))
+            elif end < position:
+                ranges.append((start, end))
+            else:
+                # Touches the edited region: fold it into the new range.
+                new_start = min(new_start, start)
+                new_end = max(new_end, end + delta if end > old_end else new_end)
+        ranges.append((new_start, new_end))
+        ranges.sort()
+        if len(ranges) > MAX_RANGES:
+            ranges = [(ranges[0][0], max(end for _, end in ranges))]
+        self.ranges = ranges
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        if not self.ranges:
+            return
+        limit = self.document.characterCount()
+        ranges = [(min(start, limit), min(end, limit)) for start, end in self.ranges]
+        self.ranges = []
+        self.dirty.emit(ranges)
@@ -0,0 +1,259 @@
+# utils/dictionaries.py
+
+import os
+import sys
+import threading
+from PySide6.QtCore import QLocale
+from utils.paths import cache_directory, data_directory
+from utils.sorted_index import SortedIndex, write_sorted_index
+
+CORRECT = '1'
+MISSPELLED = '0'
+USER_DICTIONARY_FILE = 'dictionary.txt'
+
+# Where Hunspell dictionaries (<language>.dic and .aff) are installed.
+HUNSPELL_DIRECTORIES = [
+    '/usr/share/hunspell',
+    '/usr/share/myspell',
+    '/usr/share/myspell/dicts',
+    '/usr/local/share/hunspell',
+    '/Library/Spelling',
+    os.path.expanduser('~/Library/Spelling'),
+    os.path.expanduser('~/.local/share/hunspell'),
+]
+if sys.platform == 'win32':
+    HUNSPELL_DIRECTORIES.append(os.path.join(os.getenv('APPDATA', ''), 'enchant', 'hunspell'))
+
+
+def signature(file_path):
+    # Identifies a source file's version; compiled indexes record it and are
+    # rebuilt when it changes.
+    if file_path is None or not os.path.exists(file_path):
+        return ''
+    status = os.stat(file_path)
+    return f"{os.path.abspath(file_path)}|{status.st_mtime_ns}|{status.st_size}"
+
+
+def open_index(file_path, source_signature):
+    # Returns the index at file_path if it was compiled from this source.
+    try:
+        index = SortedIndex(file_path)
+    except (OSError, ValueError):
+        return None
+    if index.metadata != source_signature:
+        index.close()
+        return None
+    return index
+
+
+def language_name(language):
+    locale = QLocale(language)
+    if locale.language() == QLocale.C:
+        return language
+    name = QLocale.languageToString(locale.language())
+    if '_' in language:
+        name += f" ({QLocale.territoryToString(locale.territory())})"
+    return name
+
+
+def find_hunspell_dictionary(language):
+    for directory in [os.getenv('DICPATH', '')] + HUNSPELL_DIRECTORIES:
+        file_path = os.path.join(directory, f"{language}.dic")
+        if directory and os.path.exists(file_path):
+            return file_path
+    return None
+
+
+def hunspell_encoding(dic_path):
+    aff_path = os.path.splitext(dic_path)[0] + '.aff'
+    try:
+        with open(aff_path, 'r', encoding='latin-1') as f:
+            for line in f:
+                if line.startswith('SET '):
+                    return line.split()[1].strip()
+    except OSError:
+        pass
+    return 'utf-8'
+
+
+def read_hunspell_words(dic_path):
+    # The stems of a Hunspell dictionary, without their affix flags. Forms
+    # made by the affix rules are not expanded; enchant decides those.
+    with open(dic_path, 'r', encoding=hunspell_encoding(dic_path), errors='replace') as f:
+        next(f, None)  # the word count
+        for line in f:
+            word = line.split('/', 1)[0].split('\t', 1)[0].strip()
+            if word and ' ' not in word:
+                yield word
+
+
+def compiled_dictionary_path(language):
+    return os.path.join(cache_directory('dictionaries'), f"{language}.idx")
+
+
+def compile_language(language):
+    # Opens the compiled dictionary of a language, compiling it from the
+    # installed Hunspell stems first if it is missing or out of date. Its
+    # values are CORRECT or MISSPELLED; verdicts learned from enchant are
+    # kept in LearnedVerdicts and merged in by merge_verdicts. Returns None if nothing can be written.
+    file_path = compiled_dictionary_path(language)
+    dic_path = find_hunspell_dictionary(language)
+    source_signature = signature(dic_path)
+    index = open_index(file_path, source_signature)
+    if index is not None:
+        return index
+    words = read_hunspell_words(dic_path) if dic_path else []
+    try:
+        write_sorted_index(file_path, ((word, CORRECT) for word in words), source_signature)
+    except OSError:
+        return None
+    return open_index(file_path, source_signature)
+
+
+def learned_verdicts_path(language):
+    return os.path.join(cache_directory('dictionaries'), f"{language}.learned")
+
+
+def merge_verdicts(index, verdicts):
+    # Rewrites a compiled dictionary with more verdicts and returns it
+    # reopened, and whether the verdicts went in; the old index is closed
+    # first so the file can be replaced.
+    file_path = index.file_path
+    metadata = index.metadata
+    items = dict(index.items())
+    items.update((word, CORRECT if verdict else MISSPELLED) for word, verdict in verdicts.items())
+    index.close()
+    try:
+        write_sorted_index(file_path, items.items(), metadata)
+        merged = True
+    except OSError:
+        merged = False
+    return open_index(file_path, metadata), merged
+
+
+class LearnedVerdicts:
+    # Verdicts learned from enchant that are not merged into the compiled
+    # dictionary yet. They are appended to a small text file, one verdict
+    # and word per line after a first line with the signature of the
+    # dictionary they belong to, so keeping them never rewrites the
+    # dictionary itself.
+    def __init__(self, file_path, source_signature):
+        self.file_path = file_path
+        self.source_signature = source_signature
+        self.verdicts = {}
+        self.file = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.file_path, 'r', encoding='utf-8', errors='replace') as f:
+                if f.readline().rstrip('\n') != self.source_signature:
+                    # Learned for a dictionary that has since been compiled again.
+                    f.close()
+                    os.remove(self.file_path)
+                    return
+                for line in f:
+                    line = line.rstrip('\n')
+                    if len(line) > 1:
+                        self.verdicts[line[1:]] = line[0] == CORRECT
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self.verdicts)
+
+    def get(self, word):
+        return self.verdicts.get(word)
+
+    def add(self, word, verdict):
+        self.verdicts[word] = verdict
+        try:
+            if self.file is None:
+                self.file = open(self.file_path, 'a', encoding='utf-8')
+                if self.file.tell() == 0:
+                    self.file.write(self.source_signature + '\n')
+            self.file.write((CORRECT if verdict else MISSPELLED) + word + '\n')
+        except OSError:
+            # Kept in memory only.
+            pass
+
+    def flush(self):
+        if self.file is not None:
+            try:
+                self.file.flush()
+            except OSError:
+                pass
+
+    def clear(self):
+        # Once merged into the compiled dictionary.
+        self.close()
+        self.verdicts = {}
+        try:
+            os.remove(self.file_path)
+        except OSError:
+            pass
+
+    def close(self):
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+
+
+class UserDictionary:
+    # Words the user added, kept one per line in a text file they can also
+    # edit by hand. The file is compiled into a SortedIndex when it changed;
+    # words added since are looked up in a set.
+    def __init__(self, file_path=None, index_path=None):
+        self.file_path = file_path or os.path.join(data_directory(), USER_DICTIONARY_FILE)
+        self.index_path = index_path or os.path.join(cache_directory('dictionaries'), 'user.idx')
+        self.index = None
+        self.added = set()
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        source_signature = signature(self.file_path)
+        if not source_signature:
+            return
+        self.index = open_index(self.index_path, source_signature)
+        if self.index is not None:
+            return
+        with open(self.file_path, 'r', encoding='utf-8', errors='replace') as f:
+            words = [line.strip() for line in f if line.strip()]
+        try:
+            write_sorted_index(self.index_path, ((word, CORRECT) for word in words), source_signature)
+            self.index = open_index(self.index_path, source_signature)
+        except OSError:
+            self.added.update(words)
+
+    def __contains__(self, word):
+        return word in self.added or (self.index is not None and word in self.index)
+
+    def words(self):
+        words = [word for word, _ in self.index.items()] if self.index is not None else []
+        return words + sorted(self.added)
+
+    def add(self, word):
+        with self.lock:
+            if word in self:
+                return False
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.write(word + '\n')
+            self.added.add(word)
+            return True
+
+
+_user_dictionary = None
+_user_dictionary_lock = threading.Lock()
+
+
+def get_user_dictionary():
+    # Shared by every language; loaded by the first checker that needs it.
+    global _user_dictionary
+    with _user_dictionary_lock:
+        if _user_dictionary is None:
+            _user_dictionary = UserDictionary()
+        return _user_dictionary
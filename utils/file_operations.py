@@ -1,7 +1,21 @@
 # utils/file_operations.py
 
+import codecs
 import os
+import tempfile
 from PySide6.QtWidgets import QFileDialog
+from utils import instrumentation
+
+LOAD_CHUNK_SIZE = 64 * 1024
+CHUNKS_IN_FLIGHT = 2
+
+BYTE_ORDER_MARKS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
 
 def open_file_dialog(parent, file_filter="All Files (*.*)"):
     file_path, _ = QFileDialog.getOpenFileName(parent, "Open File", os.getenv('HOME'), file_filter)
@@ -10,3 +24,129 @@ def open_file_dialog(parent, file_filter="All Files (*.*)"):
 def save_file_dialog(parent, file_filter="All Files (*.*)"):
     file_path, _ = QFileDialog.getSaveFileName(parent, "Save File", os.getenv('HOME'), file_filter)
     return file_path
+
+def open_files_dialog(parent, title, file_filter="All Files (*.*)"):
+    file_paths, _ = QFileDialog.getOpenFileNames(parent, title, os.getenv('HOME'), file_filter)
+    return file_paths
+
+def directory_dialog(parent, title, directory=None):
+    return QFileDialog.getExistingDirectory(parent, title, directory or os.getenv('HOME'))
+
+def detect_encoding(data):
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if data.startswith(bom):
+            return encoding
+    try:
+        data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte sequence cut off by the end of the chunk is still UTF-8.
+        if e.start < len(data) - 3:
+            return 'latin-1'
+    return 'utf-8'
+
+def detect_line_ending(text):
+    # The style of the first line break, or None if there is none yet or the
+    # text ends in a '\r' that may be the first half of '\r\n'.
+    cr = text.find('\r')
+    lf = text.find('\n')
+    if cr == -1:
+        return '\n' if lf != -1 else None
+    if lf == cr + 1:
+        return '\r\n'
+    if lf == -1 and cr == len(text) - 1:
+        return None
+    if lf == -1 or cr < lf:
+        return '\r'
+    return '\n'
+
+def normalize_line_endings(text):
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def read_text_file(file_path):
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return normalize_line_endings(data.decode(detect_encoding(data), errors='replace'))
+
+def wait_for_credit(worker, credits):
+    # Keeps the reader at most CHUNKS_IN_FLIGHT chunks ahead of the GUI, so
+    # paint events are not queued behind the whole file.
+    while not credits.acquire(timeout=0.1):
+        if worker.cancelled:
+            return False
+    return not worker.cancelled
+
+@instrumentation.timed("read file")
+def read_file_chunks(worker, file_path, credits, chunk_size=LOAD_CHUNK_SIZE):
+    # Streams normalized ('\n') text through worker.signals.partial and
+    # returns (encoding, line_ending) detected from the first line break, or None
+    # if the worker was cancelled. The receiver releases `credits` once per
+    # chunk it has consumed.
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        data = f.read(chunk_size)
+        encoding = detect_encoding(data)
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        line_ending = None
+        pending_cr = False
+        done = 0
+        while data:
+            if not wait_for_credit(worker, credits):
+                return None
+            done += len(data)
+            text = decoder.decode(data)
+            if pending_cr:
+                text = '\r' + text
+            if line_ending is None:
+                line_ending = detect_line_ending(text)
+            # A '\r' at the end of a chunk may be the first half of '\r\n'.
+            pending_cr = text.endswith('\r')
+            if pending_cr:
+                text = text[:-1]
+            worker.signals.partial.emit(normalize_line_endings(text))
+            worker.signals.progress.emit(done, size)
+            data = f.read(chunk_size)
+
+        text = ('\r' if pending_cr else '') + decoder.decode(b'', final=True)
+        if line_ending is None and text:
+            # At the end of the file a trailing '\r' is a line break itself.
+            line_ending = detect_line_ending(text) or ('\r' if text.endswith('\r') else None)
+        if text and wait_for_credit(worker, credits):
+            worker.signals.partial.emit(normalize_line_endings(text))
+    return encoding, line_ending or '\n'
+
+def write_file_atomic(worker, file_path, text, encoding='utf-8', line_ending='\n'):
+    # Writes to a temporary file next to the target, fsyncs it and renames it
+    # over the original, so a crash never leaves a truncated file behind.
+    # Returns (file_path, encoding) with the encoding actually used.
+    if line_ending != '\n':
+        text = text.replace('\n', line_ending)
+    try:
+        data = text.encode(encoding)
+    except UnicodeEncodeError:
+        encoding = 'utf-8'
+        data = text.encode(encoding)
+
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            os.chmod(temp_path, os.stat(file_path).st_mode & 0o7777)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return file_path, encoding
@@ -0,0 +1,60 @@
+# utils/file_saver.py
+
+from PySide6.QtCore import QObject, QThreadPool, QCoreApplication, Signal
+from utils.file_operations import write_file_atomic
+from utils.workers import Worker
+from utils import instrumentation
+
+# Timed separately from the journal's and caches' atomic writes.
+save_file = instrumentation.timed("save file")(write_file_atomic)
+
+
+class FileSaver(QObject):
+    # Writes document snapshots on a single worker thread. A save requested
+    # while another one is running replaces any older pending save for the
+    # same path, so only the latest snapshot is written.
+    saved = Signal(str, str, int)
+    failed = Signal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.current = None
+        self.current_path = None
+        self.pending = {}
+
+    def save(self, file_path, text, encoding, line_ending, revision):
+        job = (file_path, text, encoding, line_ending, revision)
+        if self.current is not None:
+            self.pending[file_path] = job
+        else:
+            self.start(job)
+
+    def start(self, job):
+        file_path, text, encoding, line_ending, revision = job
+        worker = Worker(save_file, file_path, text, encoding, line_ending)
+        worker.signals.result.connect(lambda result: self.saved.emit(result[0], result[1], revision))
+        worker.signals.error.connect(lambda error: self.failed.emit(file_path, error))
+        worker.signals.finished.connect(self.on_finished)
+        self.current = worker
+        self.current_path = file_path
+        self.pool.start(worker)
+
+    def on_finished(self):
+        self.current = None
+        self.current_path = None
+        if self.pending:
+            file_path = next(iter(self.pending))
+            self.start(self.pending.pop(file_path))
+
+    def is_busy(self):
+        return self.current is not None or bool(self.pending)
+
+    def is_saving(self, file_path):
+        return file_path == self.current_path or file_path in self.pending
+
+    def wait(self):
+        while self.is_busy():
+            self.pool.waitForDone()
+            QCoreApplication.processEvents()
@@ -0,0 +1,223 @@
+# utils/find_in_files.py
+
+import fnmatch
+import json
+import mmap
+import os
+from utils.file_operations import BYTE_ORDER_MARKS, detect_encoding, normalize_line_endings, write_file_atomic
+from utils.paths import cache_directory
+
+MMAP_THRESHOLD = 1024 * 1024
+BINARY_SNIFF_SIZE = 8192
+MAX_MATCHES_PER_FILE = 1000
+FILES_PER_TASK = 32
+RESULT_BATCH_SIZE = 500
+MAX_CACHED_QUERIES = 20
+POLL_INTERVAL = 0.05
+
+DEFAULT_INCLUDE = "*.txt;*.md"
+DEFAULT_EXCLUDE = ".git;.hg;.svn;__pycache__;node_modules"
+
+
+def split_globs(text):
+    return [glob.strip() for glob in text.replace(',', ';').split(';') if glob.strip()]
+
+
+def matches_any(name, globs):
+    return any(fnmatch.fnmatch(name, glob) for glob in globs)
+
+
+def walk_files(root, include, exclude):
+    # Yields (path, mtime_ns, size) in a stable order. Exclude globs apply
+    # to both directory and file names, include globs to file names.
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirectories = []
+        for entry in entries:
+            if matches_any(entry.name, exclude):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_file() and (not include or matches_any(entry.name, include)):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime_ns, stat.st_size
+            except OSError:
+                continue
+        stack.extend(reversed(subdirectories))
+
+
+def bom_encoding(data):
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if data.startswith(bom):
+            return encoding
+    return None
+
+
+def match_lines(pattern, lines):
+    matches = []
+    for number, line in enumerate(lines):
+        for match in pattern.finditer(line):
+            if match.start() == match.end():
+                continue
+            matches.append((number, match.start(), match.end(), line))
+            if len(matches) >= MAX_MATCHES_PER_FILE:
+                return matches
+    return matches
+
+
+def search_file(file_path, size, pattern):
+    # Returns the matches of one file, or None if it looks binary. Large
+    # files are memory-mapped and decoded a line at a time.
+    with open(file_path, 'rb') as f:
+        head = f.read(BINARY_SNIFF_SIZE)
+        if not head:
+            return []
+        encoding = bom_encoding(head)
+        if encoding is None and b'\0' in head:
+            return None
+        if size < MMAP_THRESHOLD or encoding in ('utf-16', 'utf-32'):
+            f.seek(0)
+            data = f.read()
+            text = data.decode(encoding or detect_encoding(data), errors='replace')
+            return match_lines(pattern, normalize_line_endings(text).split('\n'))
+        encoding = encoding or detect_encoding(head)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            lines = (line.decode(encoding, errors='replace').rstrip('\r\n') for line in iter(data.readline, b''))
+            return match_lines(pattern, lines)
+
+
+def search_files(files, pattern):
+    # Runs in a pool process. Returns (path, mtime_ns, size, status, matches)
+    # for each file, with status 'ok', 'binary' or 'error'.
+    results = []
+    for file_path, mtime, size in files:
+        try:
+            matches = search_file(file_path, size, pattern)
+        except (OSError, ValueError):
+            results.append((file_path, mtime, size, 'error', []))
+            continue
+        if matches is None:
+            results.append((file_path, mtime, size, 'binary', []))
+        else:
+            results.append((file_path, mtime, size, 'ok', matches))
+    return results
+
+
+def create_pool():
+    # Spawned rather than forked: the GUI process has threads running.
+    # Imported here to keep multiprocessing out of startup.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+
+
+class SearchCache:
+    # Per-file results of recent queries and the list of binary files, keyed
+    # by path and validated by (mtime_ns, size), so re-runs only read files
+    # that changed.
+    def __init__(self, cache_path=None):
+        self.path = cache_path or os.path.join(cache_directory(), 'find_in_files.json')
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+        self.data.setdefault('binary', {})
+        self.data.setdefault('queries', {})
+
+    def query(self, key):
+        # Most recently used queries are kept last.
+        queries = self.data['queries']
+        entries = queries.pop(key, {})
+        queries[key] = entries
+        while len(queries) > MAX_CACHED_QUERIES:
+            del queries[next(iter(queries))]
+        return entries
+
+    def is_binary(self, file_path, mtime, size):
+        return self.data['binary'].get(file_path) == [mtime, size]
+
+    def set_binary(self, file_path, mtime, size):
+        self.data['binary'][file_path] = [mtime, size]
+
+    def save(self):
+        try:
+            write_file_atomic(None, self.path, json.dumps(self.data, ensure_ascii=False))
+        except OSError:
+            pass
+
+
+def query_key(pattern):
+    return json.dumps([pattern.pattern, pattern.flags])
+
+
+def search_directory(worker, pool, root, include, exclude, pattern, cache_path=None):
+    # Streams (path, line, start, end, line_text) batches through
+    # worker.signals.partial. Returns (status, files_searched, files_cached,
+    # matches) where status is 'done' or 'cancelled'.
+    from concurrent.futures import FIRST_COMPLETED, wait
+    cache = SearchCache(cache_path)
+    entries = cache.query(query_key(pattern))
+    files = list(walk_files(root, split_globs(include), split_globs(exclude)))
+    total = len(files)
+    done = 0
+    found = 0
+    cached_results = []
+    to_search = []
+    for file_path, mtime, size in files:
+        cached = entries.get(file_path)
+        if cached is not None and cached[0] == mtime and cached[1] == size:
+            cached_results.extend((file_path, *match) for match in cached[2])
+            done += 1
+        elif cache.is_binary(file_path, mtime, size):
+            done += 1
+        else:
+            to_search.append((file_path, mtime, size))
+    files_cached = done
+
+    # Forget files that were deleted or no longer match the globs.
+    seen = {file_path for file_path, _, _ in files}
+    prefix = os.path.join(root, '')
+    for file_path in [path for path in entries if path.startswith(prefix) and path not in seen]:
+        del entries[file_path]
+
+    found += len(cached_results)
+    for i in range(0, len(cached_results), RESULT_BATCH_SIZE):
+        worker.signals.partial.emit(cached_results[i:i + RESULT_BATCH_SIZE])
+    worker.signals.progress.emit(done, total)
+
+    futures = {
+        pool.submit(search_files, to_search[i:i + FILES_PER_TASK], pattern)
+        for i in range(0, len(to_search), FILES_PER_TASK)
+    }
+    status = 'done'
+    while futures:
+        if worker.cancelled:
+            for future in futures:
+                future.cancel()
+            status = 'cancelled'
+            break
+        finished, futures = wait(futures, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        batch = []
+        for future in finished:
+            for file_path, mtime, size, file_status, matches in future.result():
+                done += 1
+                if file_status == 'binary':
+                    cache.set_binary(file_path, mtime, size)
+                elif file_status == 'ok':
+                    entries[file_path] = [mtime, size, matches]
+                    batch.extend((file_path, *match) for match in matches)
+        if batch:
+            found += len(batch)
+            worker.signals.partial.emit(batch)
+        if finished:
+            worker.signals.progress.emit(done, total)
+
+    cache.save()
+    return status, done - files_cached, files_cached, found
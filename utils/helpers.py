@@ -3,3 +3,14 @@
 def count_words(text):
     words = text.split()
     return len(words)
+
+def utf16_length(text):
+    # Qt positions and lengths are counted in UTF-16 code units.
+    return len(text.encode('utf-16-le')) // 2
+
+def format_size(size):
+    for unit in ('bytes', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'bytes' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
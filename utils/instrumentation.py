@@ -0,0 +1,109 @@
+# utils/instrumentation.py
+#
+# Hot-path timings, enabled by setting NOTE_EDITOR_INSTRUMENT=1. When it is
+# not set, timed() returns functions unchanged and nothing else is installed,
+# so instrumented code runs exactly as before.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+ENVIRONMENT_VARIABLE = 'NOTE_EDITOR_INSTRUMENT'
+HISTOGRAM_SIZE = 1000
+MAX_TRACE_EVENTS = 200000
+KEYSTROKE_TO_PAINT = "keystroke to paint"
+
+enabled = os.getenv(ENVIRONMENT_VARIABLE, '') not in ('', '0')
+started = time.perf_counter()
+histograms = {}
+events = deque(maxlen=MAX_TRACE_EVENTS)
+_lock = threading.Lock()
+
+
+class Histogram:
+    # The last HISTOGRAM_SIZE durations of one operation, in seconds.
+    def __init__(self, size=HISTOGRAM_SIZE):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, duration):
+        self.samples.append(duration)
+        self.count += 1
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        samples = list(self.samples)
+        return {
+            'count': self.count,
+            'mean_ms': sum(samples) / len(samples) * 1000 if samples else 0.0,
+            'p50_ms': self.percentile(0.5) * 1000,
+            'p95_ms': self.percentile(0.95) * 1000,
+            'p99_ms': self.percentile(0.99) * 1000,
+            'max_ms': max(samples) * 1000 if samples else 0.0,
+        }
+
+
+def record(name, start, end=None):
+    # Records an operation that ran from start to end (perf_counter values),
+    # on the calling thread.
+    if end is None:
+        end = time.perf_counter()
+    with _lock:
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram()
+        histogram.add(end - start)
+        events.append((name, start, end, threading.get_ident()))
+
+
+def timed(name):
+    # Decorator; a no-op unless instrumentation is enabled.
+    def decorator(fn):
+        if not enabled:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, start)
+        return wrapper
+    return decorator
+
+
+def summaries():
+    with _lock:
+        return {name: histogram.summary() for name, histogram in sorted(histograms.items())}
+
+
+def export_trace(file_path):
+    # Writes the Chrome trace event format (chrome://tracing, Perfetto), with
+    # the histogram summaries alongside.
+    with _lock:
+        recorded = list(events)
+    pid = os.getpid()
+    trace_events = [
+        {
+            'name': name,
+            'ph': 'X',
+            'ts': (start - started) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': pid,
+            'tid': tid,
+        }
+        for name, start, end, tid in recorded
+    ]
+    data = {'traceEvents': trace_events, 'displayTimeUnit': 'ms', 'histograms': summaries()}
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return len(trace_events)
@@ -0,0 +1,196 @@
+# utils/journal.py
+
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from PySide6.QtGui import QTextCursor
+from utils.file_operations import read_text_file, write_file_atomic
+from utils.paths import state_directory
+
+COMPACT_ENTRIES = 5000
+COMPACT_BYTES = 1024 * 1024
+
+
+def journal_directory():
+    return state_directory('journal')
+
+
+def journal_id(file_path):
+    if file_path:
+        return hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    return f"untitled-{uuid.uuid4().hex[:12]}"
+
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def process_alive(pid):
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+class DocumentJournal:
+    # Append-only log of edits for one document, relative to a base (the
+    # file on disk, an empty document or a compacted snapshot). Positions are
+    # Qt positions, i.e. UTF-16 code units with one unit per block separator.
+    def __init__(self, document, file_path=None):
+        self.document = document
+        self.file_path = file_path
+        self.id = journal_id(file_path)
+        directory = journal_directory()
+        self.journal_path = os.path.join(directory, f"{self.id}.journal")
+        self.snapshot_path = os.path.join(directory, f"{self.id}.snapshot")
+        self.buffer = []
+        self.entries = 0
+        self.size = 0
+        self.started = False
+        self.set_file_base()
+        document.contentsChange.connect(self.on_contents_change)
+
+    def set_file_base(self):
+        if self.file_path and os.path.exists(self.file_path):
+            self.base = {'base': 'file', 'signature': file_signature(self.file_path)}
+        else:
+            self.base = {'base': 'empty'}
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        end = min(position + chars_added, self.document.characterCount() - 1)
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(position)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        text = cursor.selectedText().replace('\u2029', '\n')
+        self.buffer.append(json.dumps({'p': position, 'r': chars_removed, 't': text}, ensure_ascii=False))
+
+    def header(self):
+        header = dict(self.base)
+        header.update({'path': self.file_path, 'pid': os.getpid(), 'time': time.time()})
+        return json.dumps(header)
+
+    def flush(self):
+        if not self.buffer:
+            return False
+        if not self.started:
+            with open(self.journal_path, 'w', encoding='utf-8') as f:
+                f.write(self.header() + '\n')
+            self.started = True
+        data = '\n'.join(self.buffer) + '\n'
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(data)
+        self.entries += len(self.buffer)
+        self.size += len(data)
+        self.buffer = []
+        if self.entries >= COMPACT_ENTRIES or self.size >= COMPACT_BYTES:
+            self.compact()
+        return True
+
+    def compact(self):
+        # Folds the log into a snapshot of the current text and starts a new,
+        # empty log on top of it.
+        write_file_atomic(None, self.snapshot_path, self.document.toPlainText())
+        self.base = {'base': 'snapshot'}
+        self.buffer = []
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            f.write(self.header() + '\n')
+        self.started = True
+        self.entries = 0
+        self.size = 0
+
+    def mark_saved(self, file_path):
+        # The document now matches the file on disk again.
+        self.discard()
+        if file_path != self.file_path:
+            self.file_path = file_path
+            self.id = journal_id(file_path)
+            directory = journal_directory()
+            self.journal_path = os.path.join(directory, f"{self.id}.journal")
+            self.snapshot_path = os.path.join(directory, f"{self.id}.snapshot")
+        self.set_file_base()
+
+    def discard(self):
+        self.buffer = []
+        self.started = False
+        self.entries = 0
+        self.size = 0
+        for path in (self.journal_path, self.snapshot_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self, discard=True):
+        self.document.contentsChange.disconnect(self.on_contents_change)
+        if discard:
+            self.discard()
+        else:
+            self.flush()
+
+
+def read_journal_header(journal_path):
+    # Raises OSError or ValueError if the journal is missing or unreadable.
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        return json.loads(f.readline())
+
+
+def find_recoverable_journals():
+    # Returns (journal_path, header) for journals left behind by editors that
+    # are no longer running.
+    journals = []
+    directory = journal_directory()
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.journal'):
+            continue
+        journal_path = os.path.join(directory, name)
+        try:
+            header = read_journal_header(journal_path)
+        except (OSError, ValueError):
+            continue
+        if not process_alive(header.get('pid', 0)):
+            journals.append((journal_path, header))
+    return journals
+
+
+def replay_journal(journal_path, header):
+    # Rebuilds the document text from the journal's base and its edits.
+    # Raises ValueError if the base file changed since the journal started.
+    base = header.get('base')
+    if base == 'file':
+        path = header['path']
+        if not os.path.exists(path) or list(file_signature(path)) != list(header['signature']):
+            raise ValueError(f"'{path}' changed on disk after the journal was written.")
+        text = read_text_file(path)
+    elif base == 'snapshot':
+        text = read_text_file(journal_path[:-len('.journal')] + '.snapshot')
+    else:
+        text = ''
+
+    data = bytearray(text.encode('utf-16-le'))
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        f.readline()
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn final line from the crash; everything before it is intact.
+                break
+            start = min(entry['p'] * 2, len(data))
+            end = min(start + entry['r'] * 2, len(data))
+            data[start:end] = entry['t'].encode('utf-16-le')
+    return data.decode('utf-16-le', errors='replace')
+
+
+def discard_journal(journal_path):
+    for path in (journal_path, journal_path[:-len('.journal')] + '.snapshot'):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,88 @@
+# utils/large_file.py
+
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_right
+
+LARGE_FILE_THRESHOLD = 64 * 1024 * 1024
+INDEX_CHUNK_SIZE = 8 * 1024 * 1024
+
+NEWLINE = re.compile(b'\n')
+
+
+def is_large_file(file_path):
+    try:
+        return os.path.getsize(file_path) >= LARGE_FILE_THRESHOLD
+    except OSError:
+        return False
+
+
+class LargeFile:
+    # Read-only view of a file through mmap with an index of line start
+    # offsets, so only the lines that are displayed are ever decoded.
+    def __init__(self, file_path, encoding='utf-8'):
+        self.path = file_path
+        self.encoding = encoding
+        self.file = open(file_path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        if self.size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.map = b''
+        self.line_offsets = array('q', [0])
+
+    def build_index(self, worker=None):
+        offsets = array('q', [0])
+        for start in range(0, self.size, INDEX_CHUNK_SIZE):
+            if worker is not None and worker.cancelled:
+                return False
+            end = min(start + INDEX_CHUNK_SIZE, self.size)
+            offsets.extend(match.end() for match in NEWLINE.finditer(self.map, start, end))
+            if worker is not None:
+                worker.signals.progress.emit(end, self.size)
+        self.line_offsets = offsets
+        return True
+
+    @property
+    def line_count(self):
+        return len(self.line_offsets)
+
+    def line_start(self, line):
+        if line >= len(self.line_offsets):
+            return self.size
+        return self.line_offsets[line]
+
+    def line_of_offset(self, offset):
+        return bisect_right(self.line_offsets, offset) - 1
+
+    def decode(self, data):
+        return data.decode(self.encoding, errors='replace')
+
+    def lines(self, first, count):
+        first = max(0, min(first, self.line_count - 1))
+        data = self.map[self.line_start(first):self.line_start(first + count)]
+        return [line.rstrip('\r') for line in self.decode(data).split('\n')][:count]
+
+    def iter_lines(self, chunk_lines=10000):
+        for first in range(0, self.line_count, chunk_lines):
+            yield from self.lines(first, chunk_lines)
+
+    def find(self, text, start_offset=0, case_sensitive=False):
+        # Returns (line, column, length, end_offset) of the next match,
+        # wrapping around to the start of the file, or None.
+        needle = text.encode(self.encoding)
+        flags = 0 if case_sensitive else re.IGNORECASE
+        pattern = re.compile(re.escape(needle), flags)
+        match = pattern.search(self.map, start_offset) or pattern.search(self.map, 0, start_offset)
+        if match is None:
+            return None
+        line = self.line_of_offset(match.start())
+        prefix = self.map[self.line_start(line):match.start()]
+        return line, len(self.decode(prefix)), len(text), match.end()
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
@@ -0,0 +1,64 @@
+# utils/markdown_preview.py
+
+import re
+from PySide6.QtGui import QTextDocument
+
+FENCE = re.compile(r'^ {0,3}(```|~~~)')
+LIST_ITEM = re.compile(r'^ {0,3}([-+*]|\d+[.)])\s')
+
+
+def continues_list(line, chunk_text):
+    # A list item or an indented line after a blank line belongs to the
+    # list in the previous chunk (a "loose" list).
+    return bool(LIST_ITEM.match(chunk_text)) and (line.startswith((' ', '\t')) or bool(LIST_ITEM.match(line)))
+
+
+def split_chunks(text):
+    # Splits Markdown into chunks that render on their own: runs of lines
+    # between blank lines, with fenced code blocks and loose lists kept
+    # whole. Returns [(first_line, chunk_text), ...].
+    chunks = []
+    current = []
+    first = 0
+    fence = None
+    for number, line in enumerate(text.split('\n')):
+        match = FENCE.match(line)
+        if fence is not None:
+            current.append(line)
+            if match and match.group(1) == fence:
+                fence = None
+            continue
+        if not line.strip():
+            if current:
+                chunks.append((first, '\n'.join(current)))
+                current = []
+            continue
+        if not current:
+            if chunks and continues_list(line, chunks[-1][1]):
+                first, previous = chunks.pop()
+                current = previous.split('\n') + ['']
+            else:
+                first = number
+        current.append(line)
+        if match:
+            fence = match.group(1)
+    if current:
+        chunks.append((first, '\n'.join(current)))
+    return chunks
+
+
+def render_chunk(text):
+    document = QTextDocument()
+    document.setMarkdown(text)
+    return document.toHtml()
+
+
+def render_chunks(worker, texts):
+    # Runs on a worker thread. Returns [(chunk_text, html), ...] for the
+    # chunks rendered before the worker was cancelled.
+    results = []
+    for text in texts:
+        if worker.cancelled:
+            break
+        results.append((text, render_chunk(text)))
+    return results
@@ -0,0 +1,30 @@
+# utils/paths.py
+
+import os
+import sys
+
+APP_NAME = "NoteEditor2"
+
+def _base_directory(xdg_variable, xdg_default, windows_variable):
+    if sys.platform == 'win32':
+        base = os.getenv(windows_variable) or os.getenv('APPDATA') or os.path.expanduser('~')
+    else:
+        base = os.getenv(xdg_variable) or os.path.expanduser(xdg_default)
+    directory = os.path.join(base, APP_NAME)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def state_directory(*parts):
+    directory = os.path.join(_base_directory('XDG_STATE_HOME', '~/.local/state', 'LOCALAPPDATA'), *parts)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def cache_directory(*parts):
+    directory = os.path.join(_base_directory('XDG_CACHE_HOME', '~/.cache', 'LOCALAPPDATA'), *parts)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def data_directory(*parts):
+    directory = os.path.join(_base_directory('XDG_DATA_HOME', '~/.local/share', 'APPDATA'), *parts)
+    os.makedirs(directory, exist_ok=True)
+    return directory
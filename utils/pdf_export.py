@@ -0,0 +1,153 @@
+# utils/pdf_export.py
+
+import os
+from PySide6.QtCore import Qt, QPointF, QMarginsF
+from PySide6.QtGui import (
+    QPdfWriter,
+    QPainter,
+    QPageSize,
+    QPageLayout,
+    QTextLayout,
+    QTextListFormat,
+    QTextOption,
+    QFont,
+)
+from utils.file_operations import detect_encoding, LOAD_CHUNK_SIZE
+
+PDF_RESOLUTION = 300
+PAGE_MARGIN_MM = 20
+# QTextList.itemText gives only '.' for bulleted styles.
+BULLETS = {
+    QTextListFormat.ListDisc: '\u2022',
+    QTextListFormat.ListCircle: '\u25e6',
+    QTextListFormat.ListSquare: '\u25aa',
+}
+
+
+def document_blocks(document):
+    # Yields (text, formats, alignment, size) for each block of a
+    # QTextDocument, with its character formatting and list markers.
+    block = document.begin()
+    while block.isValid():
+        text = block.text()
+        formats = []
+        prefix = ''
+        text_list = block.textList()
+        if text_list is not None:
+            style = text_list.format().style()
+            if style in BULLETS:
+                prefix = BULLETS[style] + ' '
+            else:
+                prefix = text_list.itemText(block) + ' '
+        iterator = block.begin()
+        while not iterator.atEnd():
+            fragment = iterator.fragment()
+            if fragment.isValid():
+                format_range = QTextLayout.FormatRange()
+                format_range.start = fragment.position() - block.position() + len(prefix)
+                format_range.length = fragment.length()
+                format_range.format = fragment.charFormat()
+                formats.append(format_range)
+            iterator += 1
+        yield prefix + text, formats, block.blockFormat().alignment(), len(text) + 1
+        block = block.next()
+
+
+def file_blocks(file_path):
+    # Yields the lines of a text file as blocks, reading it a line at a time.
+    with open(file_path, 'rb') as f:
+        encoding = detect_encoding(f.read(LOAD_CHUNK_SIZE))
+    with open(file_path, 'r', encoding=encoding, errors='replace', newline=None) as f:
+        for line in f:
+            yield line.rstrip('\n'), [], Qt.AlignLeft, len(line)
+
+
+class PageWriter:
+    # Lays out one block at a time with QTextLayout and paints its lines
+    # onto the current page, starting a new page when the next line does
+    # not fit. Finished pages are written out, so memory does not grow with
+    # the page count.
+    def __init__(self, file_path, title, font):
+        self.writer = QPdfWriter(file_path)
+        self.writer.setResolution(PDF_RESOLUTION)
+        self.writer.setTitle(title)
+        self.writer.setPageLayout(QPageLayout(
+            QPageSize(QPageSize.A4), QPageLayout.Portrait,
+            QMarginsF(PAGE_MARGIN_MM, PAGE_MARGIN_MM, PAGE_MARGIN_MM, PAGE_MARGIN_MM), QPageLayout.Millimeter))
+        self.painter = QPainter(self.writer)
+        self.font = QFont(font)
+        area = self.writer.pageLayout().paintRectPixels(PDF_RESOLUTION)
+        self.width = area.width()
+        self.height = area.height()
+        self.y = 0.0
+        self.pages = 1
+
+    def add_block(self, text, formats, alignment):
+        layout = QTextLayout(text, self.font, self.writer)
+        option = QTextOption(alignment)
+        option.setWrapMode(QTextOption.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(option)
+        layout.setFormats(formats)
+        layout.beginLayout()
+        lines = []
+        top = 0.0
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(self.width)
+            line.setPosition(QPointF(0, top))
+            top += line.height()
+            lines.append(line)
+        layout.endLayout()
+        for line in lines:
+            if self.y + line.height() > self.height and self.y > 0:
+                self.new_page()
+            line.draw(self.painter, QPointF(0, self.y - line.y()))
+            self.y += line.height()
+
+    def new_page(self):
+        self.writer.newPage()
+        self.pages += 1
+        self.y = 0.0
+
+    def close(self):
+        self.painter.end()
+
+
+def export_pdf(worker, jobs, font):
+    # Runs on a worker thread. jobs is a list of (source, output_path,
+    # title), where source is a QTextDocument (a clone, not the editor's
+    # own) or the path of a text file. Reports progress in characters, and
+    # each new page through worker.signals.partial as (job_index, page).
+    # Returns [(output_path, pages)] for the files written; a cancelled
+    # export removes its unfinished file.
+    sizes = [source.characterCount() if not isinstance(source, str) else os.path.getsize(source)
+             for source, _, _ in jobs]
+    total = max(1, sum(sizes))
+    done = 0
+    exported = []
+    for index, (source, output_path, title) in enumerate(jobs):
+        blocks = file_blocks(source) if isinstance(source, str) else document_blocks(source)
+        pages = PageWriter(output_path, title, font)
+        page = 0
+        try:
+            for text, formats, alignment, size in blocks:
+                if worker.cancelled:
+                    break
+                pages.add_block(text, formats, alignment)
+                done += size
+                if pages.pages != page:
+                    page = pages.pages
+                    worker.signals.partial.emit((index, page))
+                    worker.signals.progress.emit(min(done, total), total)
+        finally:
+            pages.close()
+        if worker.cancelled:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            break
+        exported.append((output_path, pages.pages))
+        done = sum(sizes[:index + 1])
+        worker.signals.progress.emit(min(done, total), total)
+    return exported
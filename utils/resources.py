@@ -0,0 +1,73 @@
+# utils/resources.py
+
+import os
+from PySide6.QtGui import QIcon, QPixmap
+
+RESOURCES_PATH = os.path.join(os.path.dirname(__file__), '..', 'resources')
+STYLES_PATH = os.path.join(RESOURCES_PATH, 'styles')
+ICONS_PATH = os.path.join(RESOURCES_PATH, 'icons')
+DEFAULT_THEME = "light"
+
+_manager = None
+
+
+class ResourceManager:
+    # Themes and icons are read from disk once and kept for the lifetime of
+    # the process, so switching themes or creating toolbars costs no I/O.
+    def __init__(self, styles_path=STYLES_PATH, icons_path=ICONS_PATH):
+        self.styles_path = styles_path
+        self.icons_path = icons_path
+        self.themes = None
+        self.icons = {}
+        self.active_theme = None
+
+    def load_themes(self):
+        self.themes = {}
+        try:
+            names = sorted(os.listdir(self.styles_path))
+        except OSError:
+            names = []
+        for name in names:
+            if not name.endswith('.qss'):
+                continue
+            try:
+                with open(os.path.join(self.styles_path, name), 'r', encoding='utf-8') as f:
+                    self.themes[name[:-len('.qss')]] = f.read()
+            except OSError:
+                continue
+
+    def theme_names(self):
+        if self.themes is None:
+            self.load_themes()
+        return list(self.themes)
+
+    def stylesheet(self, theme_name):
+        # Returns None if there is no such theme.
+        if self.themes is None:
+            self.load_themes()
+        return self.themes.get(theme_name)
+
+    def next_theme(self):
+        names = self.theme_names()
+        if not names:
+            return None
+        if self.active_theme not in names:
+            return names[0]
+        return names[(names.index(self.active_theme) + 1) % len(names)]
+
+    def icon(self, filename):
+        # Returns a null QIcon if the file is missing; the result is cached
+        # either way so a missing icon is looked up only once.
+        icon = self.icons.get(filename)
+        if icon is None:
+            icon_path = os.path.join(self.icons_path, filename)
+            icon = QIcon(QPixmap(icon_path)) if os.path.exists(icon_path) else QIcon()
+            self.icons[filename] = icon
+        return icon
+
+
+def get_resource_manager():
+    global _manager
+    if _manager is None:
+        _manager = ResourceManager()
+    return _manager
@@ -0,0 +1,267 @@
+# utils/search.py
+
+import re
+import threading
+import time
+from functools import lru_cache
+from utils.helpers import utf16_length
+from utils import instrumentation
+
+LIVE_SEARCH_TIME_BUDGET = 0.25
+LIVE_REGEX_TIME_BUDGET = 5.0
+FIND_ALL_TIME_BUDGET = 30.0
+FIND_ALL_MAX_RESULTS = 10000
+FIND_ALL_BATCH_SIZE = 200
+FIND_ALL_BATCH_INTERVAL = 0.05
+MAX_MATCHES = 100000
+POLL_INTERVAL = 0.05
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(text, regex=False, case_sensitive=False, whole_word=False):
+    # Raises re.error for an invalid regular expression.
+    source = text if regex else re.escape(text)
+    if whole_word:
+        source = rf'(?<!\w)(?:{source})(?!\w)'
+    return re.compile(source, 0 if case_sensitive else re.IGNORECASE)
+
+
+def read_lines(file_path, encoding):
+    with open(file_path, 'rb') as f:
+        for line in f:
+            yield line.decode(encoding, errors='replace').rstrip('\r\n')
+
+
+def scan_lines(conn, pattern, lines):
+    # Sends batches of (line, start, end, line_text); offsets are Python
+    # string indices in the line.
+    last_emit = time.monotonic()
+    batch = []
+    found = 0
+    for number, line in enumerate(lines):
+        for match in pattern.finditer(line):
+            if match.start() == match.end():
+                continue
+            batch.append((number, match.start(), match.end(), line))
+            found += 1
+            if found >= FIND_ALL_MAX_RESULTS:
+                conn.send(('batch', (batch, number + 1)))
+                return 'limit', found
+        now = time.monotonic()
+        if batch and (len(batch) >= FIND_ALL_BATCH_SIZE or now - last_emit >= FIND_ALL_BATCH_INTERVAL):
+            conn.send(('batch', (batch, number + 1)))
+            batch = []
+            last_emit = now
+    if batch:
+        conn.send(('batch', (batch, number + 1)))
+    return 'done', found
+
+
+def scan_positions(pattern, lines):
+    # Returns ([(position, length), ...], complete) in Qt document positions,
+    # with lines joined by one block separator each.
+    matches = []
+    position = 0
+    for line in lines:
+        if len(matches) >= MAX_MATCHES:
+            return matches, False
+        for match in pattern.finditer(line):
+            if match.end() > match.start():
+                start = position + utf16_length(line[:match.start()])
+                matches.append((start, utf16_length(match.group())))
+        position += utf16_length(line) + 1
+    return matches, True
+
+
+@instrumentation.timed("find_matches")
+def find_matches(pattern, text, time_budget=None):
+    # Returns ([(position, length), ...], complete) in Qt document positions
+    # for a pattern that cannot match across lines, in a snapshot with '\n'
+    # between blocks. Scanning stops early once time_budget seconds have
+    # passed or MAX_MATCHES were found.
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    same_units = text.isascii() or utf16_length(text) == len(text)
+    matches = []
+    position = last = 0
+    for match in pattern.finditer(text):
+        start, end = match.span()
+        if start == end:
+            continue
+        if same_units:
+            matches.append((start, end - start))
+        else:
+            position += utf16_length(text[last:start])
+            last = start
+            matches.append((position, utf16_length(match.group())))
+        if len(matches) >= MAX_MATCHES:
+            return matches, False
+        if deadline is not None and len(matches) % 256 == 0 and time.monotonic() > deadline:
+            return matches, False
+    return matches, True
+
+
+@instrumentation.timed("replace_all")
+def replace_all(pattern, replacement, text, regex=False):
+    # Finds every non-empty match line by line, as find does, so anchors
+    # and the like match exactly where find shows them. Returns None if
+    # nothing matched, else (edits, changed_lines): edits are (start, end,
+    # new_text) in Qt document positions, in document order, so each match
+    # can be replaced on its own and the text between keeps its formatting.
+    # changed_lines is None when a replacement spans lines.
+    edits = []
+    changed_lines = set()
+    position = 0
+    for number, line in enumerate(text.split('\n')):
+        ascii_line = line.isascii()
+        end = 0
+        stop = position
+        for match in pattern.finditer(line):
+            if match.start() == match.end():
+                continue
+            new = match.expand(replacement) if regex else replacement
+            if ascii_line:
+                start = position + match.start()
+                stop = position + match.end()
+            else:
+                start = stop + utf16_length(line[end:match.start()])
+                stop = start + utf16_length(match.group())
+            end = match.end()
+            edits.append((start, stop, new))
+            if changed_lines is not None:
+                if '\n' in new:
+                    changed_lines = None
+                else:
+                    changed_lines.add(number)
+        position += (len(line) if ascii_line else utf16_length(line)) + 1
+    if not edits:
+        return None
+    return edits, changed_lines
+
+
+def serve(conn):
+    # Entry point of the search process: answers one request at a time.
+    # Requests are (kind, pattern, data, source); for scans, data is a list
+    # of lines unless source names a (file_path, encoding) to read instead.
+    while True:
+        try:
+            kind, pattern, data, source = conn.recv()
+        except EOFError:
+            return
+        if source is not None:
+            data = read_lines(*source)
+        try:
+            if kind == 'lines':
+                conn.send(('result', scan_lines(conn, pattern, data)))
+            elif kind == 'positions':
+                conn.send(('result', scan_positions(pattern, data)))
+            elif kind == 'replace':
+                replacement, text = data
+                conn.send(('result', replace_all(pattern, replacement, text, regex=True)))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+class SearchProcess:
+    # Runs regular expression scans in a child process. Python's re module
+    # holds the GIL for a whole match, so a catastrophic pattern run on a
+    # thread would freeze the editor; a process can simply be killed when
+    # the user cancels or the time budget runs out.
+    def __init__(self):
+        self.process = None
+        self.conn = None
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def start(self):
+        import multiprocessing
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=serve, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.conn.close()
+            self.process = None
+            self.conn = None
+
+    def run(self, worker, request, time_budget, on_batch=None):
+        # Returns ('result', value), ('error', message), ('cancelled', None)
+        # or ('timeout', None).
+        with self.lock:
+            if self.closed:
+                return 'cancelled', None
+            if self.process is None or not self.process.is_alive():
+                self.start()
+            self.conn.send(request)
+            deadline = time.monotonic() + time_budget
+            while True:
+                if worker.cancelled or self.closed:
+                    self.kill()
+                    return 'cancelled', None
+                if time.monotonic() > deadline:
+                    self.kill()
+                    return 'timeout', None
+                if not self.conn.poll(POLL_INTERVAL):
+                    continue
+                try:
+                    kind, payload = self.conn.recv()
+                except EOFError:
+                    self.kill()
+                    return 'error', "The search process stopped unexpectedly."
+                if kind == 'batch':
+                    on_batch(*payload)
+                else:
+                    return kind, payload
+
+    def close(self):
+        # A scan in progress notices the flag within POLL_INTERVAL.
+        self.closed = True
+        with self.lock:
+            self.kill()
+
+
+def find_all_lines(worker, process, pattern, lines=None, source=None, total=0, time_budget=FIND_ALL_TIME_BUDGET):
+    # Streams (line, start, end, line_text) batches through
+    # worker.signals.partial. Scans either a snapshot of lines or a
+    # (file_path, encoding) source. Returns (status, found) where status is
+    # 'done', 'limit', 'cancelled' or 'timeout'.
+    found = 0
+
+    def on_batch(batch, lines_done):
+        nonlocal found
+        found += len(batch)
+        worker.signals.partial.emit(batch)
+        worker.signals.progress.emit(lines_done, total)
+
+    kind, payload = process.run(worker, ('lines', pattern, lines, source), time_budget, on_batch)
+    if kind == 'error':
+        raise RuntimeError(payload)
+    if kind == 'result':
+        return payload
+    return kind, found
+
+
+def find_match_positions(worker, process, pattern, lines, time_budget=LIVE_REGEX_TIME_BUDGET):
+    # Returns ([(position, length), ...], complete), or None if cancelled.
+    kind, payload = process.run(worker, ('positions', pattern, lines, None), time_budget)
+    if kind == 'error':
+        raise RuntimeError(payload)
+    if kind == 'result':
+        return payload
+    if kind == 'timeout':
+        return [], False
+    return None
+
+
+def replace_all_in_process(worker, process, pattern, replacement, text, time_budget=FIND_ALL_TIME_BUDGET):
+    # replace_all() for regular expressions. Returns (status, result).
+    kind, payload = process.run(worker, ('replace', pattern, (replacement, text), None), time_budget)
+    if kind == 'error':
+        raise RuntimeError(payload)
+    if kind == 'result':
+        return 'done', payload
+    return kind, None
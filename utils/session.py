@@ -0,0 +1,41 @@
+# utils/session.py
+
+import json
+import os
+from utils.file_operations import write_file_atomic
+from utils.paths import state_directory
+
+SESSION_VERSION = 1
+
+
+def session_path():
+    return os.path.join(state_directory(), 'session.json')
+
+
+class SessionStore:
+    # The open tabs as a small JSON file: for each tab its path, cursor and
+    # scroll position, encoding and line ending, and the journal holding its
+    # unsaved text if any. Rewritten only when the snapshot changed.
+    def __init__(self, path=None):
+        self.path = path or session_path()
+        self.last_written = None
+
+    def load(self):
+        # Returns (tabs, active_index), or None if there is no usable session.
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                session = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(session, dict) or session.get('version') != SESSION_VERSION:
+            return None
+        return session.get('tabs', []), session.get('active', 0)
+
+    def save(self, tabs, active):
+        data = json.dumps({'version': SESSION_VERSION, 'active': active, 'tabs': tabs},
+                          ensure_ascii=False, separators=(',', ':'))
+        if data == self.last_written:
+            return False
+        write_file_atomic(None, self.path, data)
+        self.last_written = data
+        return True
@@ -0,0 +1,124 @@
+# utils/sorted_index.py
+
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b'NESIDX1\n'
+HEADER = struct.Struct('=8sII')
+OFFSET = struct.Struct('=I')
+
+
+class SortedIndex:
+    # A read-only table of string keys and values in a memory-mapped file,
+    # looked up by binary search, so opening it costs nothing up front and
+    # only the pages touched are read. The file is a header (magic, record
+    # count, metadata length), the metadata, the offset of every record and
+    # one past the last, then the records as "key\tvalue" in UTF-8, sorted by
+    # key bytes. Offsets are native-endian: the files are local caches.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, metadata_length = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.data.close()
+            raise ValueError(f"'{file_path}' is not a sorted index")
+        start = HEADER.size
+        self.metadata = self.data[start:start + metadata_length].decode('utf-8')
+        offsets_start = align(start + metadata_length)
+        self.records_start = offsets_start + (self.count + 1) * OFFSET.size
+        self.offsets = memoryview(self.data)[offsets_start:self.records_start].cast('I')
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self.find(key.encode('utf-8')) is not None
+
+    def record(self, index):
+        start = self.records_start + self.offsets[index]
+        end = self.records_start + self.offsets[index + 1]
+        separator = self.data.find(b'\t', start, end)
+        return self.data[start:separator], self.data[separator + 1:end]
+
+    def lower_bound(self, key):
+        # The index of the first record whose key is not less than key.
+        data = self.data
+        offsets = self.offsets
+        base = self.records_start
+        # Keys are compared on a slice as long as the key plus the tab.
+        width = len(key) + 1
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = base + offsets[middle]
+            candidate = data[start:start + width]
+            separator = candidate.find(b'\t')
+            if separator >= 0:
+                candidate = candidate[:separator]
+            if candidate < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, key):
+        index = self.lower_bound(key)
+        if index < self.count:
+            start = self.records_start + self.offsets[index]
+            if self.data[start:start + len(key) + 1] == key + b'\t':
+                return index
+        return None
+
+    def get(self, key, default=None):
+        index = self.find(key.encode('utf-8'))
+        if index is None:
+            return default
+        return self.record(index)[1].decode('utf-8')
+
+    def items(self):
+        for index in range(self.count):
+            key, value = self.record(index)
+            yield key.decode('utf-8'), value.decode('utf-8')
+
+    def close(self):
+        self.offsets.release()
+        self.data.close()
+
+
+def align(position):
+    return (position + OFFSET.size - 1) // OFFSET.size * OFFSET.size
+
+
+def write_sorted_index(file_path, items, metadata=''):
+    # Writes (key, value) pairs as a SortedIndex, replacing file_path
+    # atomically. Keys must not contain tabs; a repeated key keeps its last
+    # value.
+    records = {}
+    for key, value in items:
+        records[key.encode('utf-8')] = value.encode('utf-8')
+    keys = sorted(records)
+    metadata = metadata.encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.index-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(keys), len(metadata)))
+            f.write(metadata)
+            f.write(b'\0' * (align(HEADER.size + len(metadata)) - HEADER.size - len(metadata)))
+            offset = 0
+            offsets = bytearray()
+            for key in keys:
+                offsets += OFFSET.pack(offset)
+                offset += len(key) + 1 + len(records[key])
+            offsets += OFFSET.pack(offset)
+            f.write(offsets)
+            for key in keys:
+                f.write(key + b'\t' + records[key])
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,328 @@
+# utils/spelling.py
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, QThreadPool, Signal
+
+from utils.helpers import utf16_length
+from utils.workers import Worker
+from utils.dictionaries import (
+    compile_language,
+    get_user_dictionary,
+    learned_verdicts_path,
+    merge_verdicts,
+    signature,
+    CORRECT,
+    LearnedVerdicts,
+)
+from utils.sorted_index import SortedIndex
+from utils.suggestions import (
+    build_suggestion_index,
+    find_suggestions,
+    index_metadata,
+    is_current,
+    suggestion_index_path,
+)
+from utils import instrumentation
+
+DEFAULT_LANGUAGE = "en_US"
+VERDICT_CACHE_SIZE = 50000
+RESULT_BATCH_SIZE = 200
+LOAD_PRIORITY = 2
+# Below the highlighter's idle checks.
+SUGGESTIONS_PRIORITY = -1
+# Learned verdicts are written to their side file at most this often (in
+# seconds), and merged into the compiled dictionary at exit or once there
+# are this many.
+VERDICT_SAVE_INTERVAL = 60
+VERDICT_MERGE_COUNT = 20000
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+ASTRAL_PATTERN = re.compile('[\U00010000-\U0010FFFF]')
+
+
+def tokenize(text):
+    # Yields (start, length, word) with Qt (UTF-16) offsets in a single pass.
+    if not ASTRAL_PATTERN.search(text):
+        for match in WORD_PATTERN.finditer(text):
+            word = match.group()
+            yield match.start(), len(word), word
+        return
+
+    index = 0
+    offset = 0
+    for match in WORD_PATTERN.finditer(text):
+        start = match.start()
+        offset += utf16_length(text[index:start])
+        word = match.group()
+        length = utf16_length(word)
+        yield offset, length, word
+        offset += length
+        index = match.end()
+
+
+class VerdictCache:
+    def __init__(self, maxsize=VERDICT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.verdicts = OrderedDict()
+        # The GUI thread reads verdicts while the spell-check worker writes them.
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.verdicts)
+
+    def get(self, word):
+        with self.lock:
+            verdict = self.verdicts.get(word)
+            if verdict is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.verdicts.move_to_end(word)
+            return verdict
+
+    def put(self, word, verdict):
+        with self.lock:
+            self.verdicts[word] = verdict
+            self.verdicts.move_to_end(word)
+            if len(self.verdicts) > self.maxsize:
+                self.verdicts.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.verdicts.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class SpellChecker(QObject):
+    # Emitted on the GUI thread once the dictionary has been loaded (or
+    # found to be missing).
+    ready = Signal()
+
+    def __init__(self, language=DEFAULT_LANGUAGE):
+        super().__init__()
+        self.language = language
+        self.dictionary = None
+        # The compiled dictionary and user dictionary answer most lookups
+        # locally; enchant is asked only about words neither knows, and its
+        # verdicts are learned, then merged into the compiled dictionary by
+        # save().
+        self.index = None
+        self.user_dictionary = None
+        self.learned = None
+        self.saved_at = time.monotonic()
+        # The symmetric-delete index for suggestions, opened or built once the
+        # dictionary is loaded.
+        self.suggestions = None
+        self.suggestions_error = None
+        self.loaded = False
+        self.load_worker = None
+        self.cache = VerdictCache()
+        # enchant is not thread-safe, so each checker gets exactly one worker thread.
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+
+    def load(self):
+        # Imports enchant and opens the dictionary on the checker's thread,
+        # ahead of any queued checks. Safe to call repeatedly.
+        if self.load_worker is not None:
+            return
+        self.load_worker = Worker(self.load_dictionary)
+        self.load_worker.signals.finished.connect(self.on_loaded)
+        self.pool.start(self.load_worker, LOAD_PRIORITY)
+
+    def load_dictionary(self, worker):
+        import enchant
+        try:
+            self.dictionary = enchant.Dict(self.language)
+        except enchant.errors.DictNotFoundError:
+            self.dictionary = None
+            return
+        self.user_dictionary = get_user_dictionary()
+        self.index = compile_language(self.language)
+        if self.index is not None:
+            self.learned = LearnedVerdicts(learned_verdicts_path(self.language), self.index.metadata)
+
+    def on_loaded(self):
+        self.loaded = True
+        self.ready.emit()
+        if self.dictionary is not None:
+            self.pool.start(Worker(self.load_suggestions), SUGGESTIONS_PRIORITY)
+
+    def load_suggestions(self, worker):
+        # Opens the cached suggestion index, or builds it on the global pool
+        # from the correct words of the compiled and user dictionaries. A
+        # stale index is used until the new one is ready; the new one is
+        # written beside it, as a mapped file cannot be replaced on Windows.
+        file_path = suggestion_index_path(self.language)
+        source = self.index.metadata if self.index is not None else ''
+        user_source = signature(self.user_dictionary.file_path)
+        word_count = len(self.index) if self.index is not None else 0
+        try:
+            self.suggestions = SortedIndex(file_path)
+        except (OSError, ValueError):
+            self.suggestions = None
+        if self.suggestions is not None and is_current(self.suggestions, source, user_source, word_count):
+            return
+        words = []
+        if self.index is not None:
+            words = [word for word, verdict in self.index.items() if verdict == CORRECT]
+        words += self.user_dictionary.words()
+        builder = Worker(build_suggestion_index, file_path + '.new', words, index_metadata(source, user_source, word_count))
+        builder.signals.result.connect(self.set_suggestions)
+        builder.signals.error.connect(self.on_suggestions_failed)
+        QThreadPool.globalInstance().start(builder)
+
+    def set_suggestions(self, new_path):
+        # On the GUI thread, where suggestions are looked up, so the stale
+        # index can be closed before the new one takes its place.
+        if new_path is None:
+            return
+        if self.suggestions is not None:
+            self.suggestions.close()
+            self.suggestions = None
+        file_path = suggestion_index_path(self.language)
+        try:
+            os.replace(new_path, file_path)
+        except OSError:
+            # Still open elsewhere; the new index is used where it is.
+            file_path = new_path
+        try:
+            self.suggestions = SortedIndex(file_path)
+        except (OSError, ValueError) as e:
+            self.on_suggestions_failed(str(e))
+
+    def on_suggestions_failed(self, error):
+        # The stale index, if any, stays in use.
+        self.suggestions_error = error
+
+    def suggest(self, word):
+        # Suggestions in the case of the word: "Teh" gives "The".
+        extra_words = self.user_dictionary.added if self.user_dictionary is not None else ()
+        suggestions = find_suggestions(self.suggestions, word.lower(), extra_words)
+        if len(word) > 1 and word.isupper():
+            suggestions = [suggestion.upper() for suggestion in suggestions]
+        elif word[:1].isupper():
+            suggestions = [suggestion[:1].upper() + suggestion[1:] for suggestion in suggestions]
+        return list(dict.fromkeys(suggestion for suggestion in suggestions if suggestion != word))
+
+    def lookup(self, word):
+        # The verdict of the user and compiled dictionaries, or None if they
+        # do not know the word. A capitalized or upper-case word is correct
+        # if its lower-case form is.
+        lower = word.lower()
+        if word in self.user_dictionary or (lower != word and lower in self.user_dictionary):
+            return True
+        if self.index is None:
+            return None
+        verdict = self.index.get(word)
+        if verdict is None and lower != word and self.index.get(lower) == CORRECT:
+            return True
+        if verdict is None:
+            return self.learned.get(word)
+        return verdict == CORRECT
+
+    def check(self, word):
+        if self.dictionary is None:
+            return True
+        verdict = self.cache.get(word)
+        if verdict is None:
+            verdict = self.lookup(word)
+            if verdict is None:
+                verdict = self.dictionary.check(word)
+                if self.learned is not None:
+                    self.learned.add(word, verdict)
+            self.cache.put(word, verdict)
+        return verdict
+
+    def save(self, force=False):
+        # Writes out the verdicts learned from enchant, on the checker's
+        # thread; force, at exit, merges them into the compiled dictionary.
+        if self.index is None or not self.learned:
+            return
+        if not force and time.monotonic() - self.saved_at < VERDICT_SAVE_INTERVAL:
+            return
+        self.saved_at = time.monotonic()
+        self.pool.start(Worker(self.save_verdicts, force))
+
+    def save_verdicts(self, worker, merge):
+        if not merge and len(self.learned) < VERDICT_MERGE_COUNT:
+            self.learned.flush()
+            return
+        self.learned.close()
+        self.index, merged = merge_verdicts(self.index, self.learned.verdicts)
+        if merged:
+            self.learned.clear()
+
+    def misspelled(self, text):
+        for start, length, word in tokenize(text):
+            if not self.check(word):
+                yield start, length
+
+    def cached_misspelled(self, text):
+        # Returns the spans of known misspellings and whether any word still
+        # needs a trip through enchant. Never touches the dictionary itself.
+        spans = []
+        complete = True
+        for start, length, word in tokenize(text):
+            verdict = self.cache.get(word)
+            if verdict is None:
+                complete = False
+            elif not verdict:
+                spans.append((start, length))
+        return spans, complete
+
+    @instrumentation.timed("check_blocks")
+    def check_blocks(self, worker, jobs):
+        # jobs is a list of (block_number, text) snapshots; results are
+        # streamed back as lists of (block_number, text, spans).
+        total = len(jobs)
+        batch = []
+        for done, (block_number, text) in enumerate(jobs, 1):
+            if worker.cancelled:
+                break
+            batch.append((block_number, text, list(self.misspelled(text))))
+            if len(batch) >= RESULT_BATCH_SIZE or done == total:
+                worker.signals.partial.emit(batch)
+                worker.signals.progress.emit(done, total)
+                batch = []
+        return not worker.cancelled
+
+
+_checkers = {}
+
+
+def get_spell_checker(language=DEFAULT_LANGUAGE):
+    # Checkers (dictionary plus verdict cache) are shared by every highlighter
+    # and kept after switching to another language.
+    checker = _checkers.get(language)
+    if checker is None:
+        checker = _checkers[language] = SpellChecker(language)
+    return checker
+
+
+def add_to_user_dictionary(word):
+    # Returns False if the word was already there.
+    if not get_user_dictionary().add(word):
+        return False
+    variants = {word}
+    if word == word.lower():
+        variants.update((word.upper(), word[:1].upper() + word[1:]))
+    for checker in _checkers.values():
+        for variant in variants:
+            checker.cache.put(variant, True)
+    return True
+
+
+def save_spell_checkers(wait=False):
+    for checker in _checkers.values():
+        checker.save(force=wait)
+        if wait:
+            checker.pool.waitForDone()
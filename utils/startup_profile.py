@@ -0,0 +1,37 @@
+# utils/startup_profile.py
+
+import sys
+import time
+
+# Module-level so main.py can record phases before any window exists.
+# Everything is a no-op unless enable() was called (--startup-profile).
+started = time.perf_counter()
+enabled = False
+phases = []
+
+
+def enable(start=None):
+    global enabled, started
+    enabled = True
+    if start is not None:
+        started = start
+
+
+def mark(phase):
+    if enabled:
+        phases.append((phase, time.perf_counter()))
+
+
+def report(stream=None):
+    # Prints each phase with its own duration and the time since start,
+    # then disables profiling so it is reported once.
+    global enabled
+    if not enabled:
+        return
+    enabled = False
+    stream = stream or sys.stderr
+    print(f"{'Startup phase':<28}{'ms':>8}{'total':>10}", file=stream)
+    previous = started
+    for phase, at in phases:
+        print(f"{phase:<28}{(at - previous) * 1000:8.1f}{(at - started) * 1000:10.1f}", file=stream)
+        previous = at
@@ -0,0 +1,146 @@
+# utils/suggestions.py
+#
+# Spelling suggestions by symmetric delete (as in SymSpell): every correct
+# word is indexed under the strings made by deleting up to
+# MAX_EDIT_DISTANCE characters from its first PREFIX_LENGTH characters.
+# A misspelling is looked up under its own deletes, so finding the words
+# within two edits takes a few dozen index lookups instead of a scan of the
+# dictionary. Candidates are then checked with the real edit distance.
+
+import json
+import os
+from utils.paths import cache_directory
+from utils.sorted_index import write_sorted_index
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+MAX_SUGGESTIONS = 8
+# The index is rebuilt once the compiled dictionary has grown this much.
+REBUILD_GROWTH = 0.1
+
+
+def deletes(word, distance=MAX_EDIT_DISTANCE):
+    # The strings made by deleting 1 to distance characters from word.
+    results = set()
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {
+            text[:index] + text[index + 1:]
+            for text in frontier if len(text) > 1
+            for index in range(len(text))
+        }
+        results |= frontier
+    return results
+
+
+def edit_distance(a, b, limit=MAX_EDIT_DISTANCE):
+    # Optimal string alignment distance (Damerau-Levenshtein without
+    # repeated edits of a substring), or limit + 1 once it exceeds limit.
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # The common prefix and suffix cost nothing; only the rest is compared.
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b)
+    # Only cells within limit of the diagonal can stay within limit.
+    worst = limit + 1
+    length = len(b)
+    previous = [j if j <= limit else worst for j in range(length + 1)]
+    before = None
+    for i in range(1, len(a) + 1):
+        character = a[i - 1]
+        current = [worst] * (length + 1)
+        if i <= limit:
+            current[0] = i
+        lowest = current[0]
+        for j in range(max(1, i - limit), min(length, i + limit) + 1):
+            other = b[j - 1]
+            value = previous[j - 1] if character == other else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if (i > 1 and j > 1 and character == b[j - 2] and a[i - 2] == other
+                    and before[j - 2] + 1 < value):
+                value = before[j - 2] + 1
+            current[j] = value
+            if value < lowest:
+                lowest = value
+        if lowest > limit:
+            return worst
+        before, previous = previous, current
+    return min(previous[length], worst)
+
+
+def suggestion_index_path(language):
+    return os.path.join(cache_directory('dictionaries'), f"{language}.suggestions.idx")
+
+
+def index_metadata(source, user_source, word_count):
+    return json.dumps({'source': source, 'user': user_source, 'words': word_count}, sort_keys=True)
+
+
+def is_current(index, source, user_source, word_count):
+    try:
+        metadata = json.loads(index.metadata)
+    except ValueError:
+        return False
+    return (metadata.get('source') == source and metadata.get('user') == user_source
+            and word_count <= metadata.get('words', 0) * (1 + REBUILD_GROWTH))
+
+
+def build_suggestion_index(worker, file_path, words, metadata):
+    # Runs on a worker thread. Returns file_path once written, or None if
+    # the worker was cancelled.
+    table = {}
+    for word in words:
+        if worker is not None and worker.cancelled:
+            return None
+        key = word[:PREFIX_LENGTH]
+        for text in deletes(key) | {key}:
+            entry = table.get(text)
+            if entry is None:
+                table[text] = [word]
+            else:
+                entry.append(word)
+    write_sorted_index(file_path, ((text, ' '.join(entry)) for text, entry in table.items()), metadata)
+    return file_path
+
+
+def find_suggestions(index, word, extra_words=(), limit=MAX_SUGGESTIONS):
+    # The indexed words (and extra_words) within MAX_EDIT_DISTANCE of word,
+    # closest first.
+    key = word[:PREFIX_LENGTH]
+    found = {}
+    candidates = [key]
+    seen = {key}
+    for candidate in candidates:
+        entry = index.get(candidate) if index is not None else None
+        if entry:
+            for suggestion in entry.split(' '):
+                if suggestion not in found:
+                    found[suggestion] = edit_distance(word, suggestion) if abs(len(suggestion) - len(word)) <= MAX_EDIT_DISTANCE else MAX_EDIT_DISTANCE + 1
+        if len(key) - len(candidate) < MAX_EDIT_DISTANCE and len(candidate) > 1:
+            for position in range(len(candidate)):
+                text = candidate[:position] + candidate[position + 1:]
+                if text not in seen:
+                    seen.add(text)
+                    candidates.append(text)
+    for suggestion in extra_words:
+        if suggestion not in found:
+            found[suggestion] = edit_distance(word, suggestion)
+    found.pop(word, None)
+    # Without word frequencies, ties go to swapped letters ("teh": "the"),
+    # then to the same first letter and length.
+    letters = sorted(word)
+    matches = [suggestion for suggestion, distance in found.items() if distance <= MAX_EDIT_DISTANCE]
+    matches.sort(key=lambda suggestion: (found[suggestion], sorted(suggestion) != letters,
+                                         suggestion[:1] != word[:1], abs(len(suggestion) - len(word)), suggestion))
+    return matches[:limit]
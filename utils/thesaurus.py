@@ -0,0 +1,124 @@
+# utils/thesaurus.py
+
+import os
+import re
+from collections import OrderedDict
+from utils.paths import cache_directory, data_directory
+from utils.sorted_index import write_sorted_index
+from utils.dictionaries import open_index, signature
+
+ENTRY_CACHE_SIZE = 256
+
+# Where MyThes thesauri (th_<language>_v2.dat, as used by LibreOffice) are
+# installed; the user's own go in the data directory's thesaurus folder.
+THESAURUS_DIRECTORIES = [
+    '/usr/share/mythes',
+    '/usr/share/myspell/dicts',
+    '/usr/share/myspell',
+    '/usr/local/share/mythes',
+]
+
+ANNOTATION = re.compile(r'\s*\((?:generic|similar|related|antonym)[^)]*\)$')
+
+
+def thesaurus_directory():
+    return data_directory('thesaurus')
+
+
+def find_thesaurus_file(language):
+    names = [f"th_{language}_v2.dat", f"th_{language}.dat"]
+    for directory in [thesaurus_directory()] + THESAURUS_DIRECTORIES:
+        for name in names:
+            file_path = os.path.join(directory, name)
+            if os.path.exists(file_path):
+                return file_path
+    return None
+
+
+def read_mythes(file_path, worker=None):
+    # Yields (word, meanings) from a MyThes data file: an encoding line, then
+    # for each word a "word|count" line followed by count lines of
+    # "(part of speech)|synonym|synonym...". meanings keeps those lines
+    # as they are, joined by newlines.
+    with open(file_path, 'rb') as f:
+        encoding = f.readline().decode('ascii', errors='replace').strip() or 'utf-8'
+    with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+        f.readline()
+        for line in f:
+            if worker is not None and worker.cancelled:
+                return
+            word, _, count = line.rstrip('\n').rpartition('|')
+            if not word or not count.isdigit():
+                continue
+            meanings = [f.readline().rstrip('\n') for _ in range(int(count))]
+            yield word.replace('\t', ' '), '\n'.join(meanings)
+
+
+def compiled_thesaurus_path(language):
+    return os.path.join(cache_directory('dictionaries'), f"{language}.thesaurus.idx")
+
+
+def load_compiled_thesaurus(language):
+    # The compiled thesaurus if it is up to date, else None. Opening it maps
+    # the file and reads nothing else.
+    data_path = find_thesaurus_file(language)
+    if data_path is None:
+        return None
+    index = open_index(compiled_thesaurus_path(language), signature(data_path))
+    return Thesaurus(language, index) if index is not None else None
+
+
+def compile_thesaurus(worker, language):
+    # Returns the Thesaurus of a language, compiling its data file into a
+    # SortedIndex first if needed (keys are lower-case words), or None if
+    # no thesaurus is installed or the worker was cancelled.
+    data_path = find_thesaurus_file(language)
+    if data_path is None:
+        return None
+    file_path = compiled_thesaurus_path(language)
+    source_signature = signature(data_path)
+    index = open_index(file_path, source_signature)
+    if index is None:
+        entries = {}
+        for word, meanings in read_mythes(data_path, worker):
+            key = word.lower()
+            entries[key] = entries[key] + '\n' + meanings if key in entries else meanings
+        if worker is not None and worker.cancelled:
+            return None
+        write_sorted_index(file_path, entries.items(), source_signature)
+        index = open_index(file_path, source_signature)
+    return Thesaurus(language, index) if index is not None else None
+
+
+class Thesaurus:
+    # Lookups read the memory-mapped index; recently shown entries are kept
+    # parsed.
+    def __init__(self, language, index):
+        self.language = language
+        self.index = index
+        self.cache = OrderedDict()
+
+    def lookup(self, word):
+        # Returns [(part_of_speech, [synonym, ...])], empty if the word is
+        # not in the thesaurus.
+        key = word.lower()
+        meanings = self.cache.get(key)
+        if meanings is not None:
+            self.cache.move_to_end(key)
+            return meanings
+        meanings = parse_meanings(self.index.get(key, ''))
+        self.cache[key] = meanings
+        if len(self.cache) > ENTRY_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return meanings
+
+
+def parse_meanings(text):
+    meanings = []
+    for line in text.split('\n'):
+        fields = line.split('|')
+        if len(fields) < 2:
+            continue
+        synonyms = [ANNOTATION.sub('', synonym).strip() for synonym in fields[1:]]
+        meanings.append((fields[0].strip().strip('()'), [synonym for synonym in synonyms if synonym]))
+    return meanings
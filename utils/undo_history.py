@@ -0,0 +1,648 @@
+# utils/undo_history.py
+
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from PySide6.QtCore import QByteArray, QDataStream, QIODevice, QObject
+from PySide6.QtGui import QTextBlockFormat, QTextCursor, QTextDocument
+from utils.helpers import utf16_length
+from utils.paths import cache_directory
+
+DEFAULT_MAX_STEPS = 1000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# History spilled to disk beyond this is dropped, oldest first.
+MAX_SPILLED_BYTES = 512 * 1024 * 1024
+# Single characters typed or deleted in a row make one step, until a pause
+# this long, a line break or this many characters.
+MERGE_INTERVAL = 1.5
+MAX_MERGED_LENGTH = 100
+# Steps with more text than this are kept zlib-compressed and applied as
+# bulk edits.
+COMPRESS_THRESHOLD = 4096
+# Roughly what a step costs besides its texts, and what each of its format
+# runs and block entries adds.
+STEP_OVERHEAD = 120
+RUN_OVERHEAD = 150
+BLOCK_OVERHEAD = 400
+# Roughly what the shadow document costs per character (UTF-16) and per
+# block.
+SHADOW_CHARACTER_BYTES = 2
+SHADOW_BLOCK_OVERHEAD = 140
+# A spilled step: position, removed and added text lengths, formats
+# length, compressed flag.
+RECORD = struct.Struct('=qIIIB')
+
+
+def same_format(a, b):
+    return a is b or (a is not None and b is not None and a == b)
+
+
+def is_low_surrogate(character):
+    return '\udc00' <= character <= '\udfff'
+
+
+def block_tail(block, position):
+    # The text of block from position on, as UTF-16 if it is not ASCII.
+    text = block.text()
+    offset = position - block.position()
+    if text.isascii():
+        return text[offset:]
+    return text.encode('utf-16-le')[2 * offset:]
+
+
+def add_run(runs, length, char_format):
+    if runs and runs[-1][1] == char_format:
+        runs[-1][0] += length
+    else:
+        runs.append([length, char_format])
+
+
+class Content:
+    # A stretch of a document as an edit removed or added it: its text, with
+    # '\n' between blocks; its character formats as [length, format] runs in
+    # UTF-16 code units; and the blocks it touches, plus the one after them,
+    # as [count, block format, block character format, list format or None,
+    # previous, following] runs. A block in a list keeps the distance in
+    # blocks back to the list's previous item, or, for the first item, on to
+    # its next item past these blocks (0 if none).
+    __slots__ = ('text', 'runs', 'blocks')
+
+    def __init__(self, text, runs, blocks):
+        self.text = text
+        self.runs = runs
+        self.blocks = blocks
+
+    def extend(self, other):
+        # Appends text typed or deleted in the same block.
+        self.text += other.text
+        for length, char_format in other.runs:
+            add_run(self.runs, length, char_format)
+
+    def same_as(self, other):
+        return (self.text == other.text
+                and len(self.runs) == len(other.runs)
+                and all(a == b for a, b in zip(self.runs, other.runs))
+                and len(self.blocks) == len(other.blocks)
+                and all(same_block(a, b) for a, b in zip(self.blocks, other.blocks)))
+
+
+def same_block(a, b):
+    return a[1:3] == b[1:3] and same_format(a[3], b[3]) and a[4:] == b[4:]
+
+
+def add_block(blocks, block, last):
+    # last is the number of the last block captured.
+    block_format = block.blockFormat()
+    text_list = block.textList()
+    list_format = None
+    previous = following = 0
+    if text_list is not None:
+        list_format = text_list.format()
+        number = block.blockNumber()
+        index = text_list.itemNumber(block)
+        if index > 0:
+            previous = number - text_list.item(index - 1).blockNumber()
+        else:
+            for index in range(1, text_list.count()):
+                item = text_list.item(index).blockNumber()
+                if item > last:
+                    following = item - number
+                    break
+    # Lists belong to one document, so membership is kept apart.
+    block_format.setObjectIndex(-1)
+    entry = [1, block_format, block.charFormat(), list_format, previous, following]
+    if blocks and same_block(blocks[-1], entry):
+        blocks[-1][0] += 1
+    else:
+        blocks.append(entry)
+
+
+def make_shadow(document):
+    # A copy of document that keeps no undo stack of its own. Plain text,
+    # the usual case, is copied as such, which takes a fraction of the time
+    # of a clone.
+    plain = all(text_format.isFrameFormat() or not text_format.properties()
+                for text_format in document.allFormats())
+    if plain:
+        shadow = QTextDocument()
+        shadow.setUndoRedoEnabled(False)
+        shadow.setPlainText(document.toRawText())
+    else:
+        shadow = document.clone()
+        shadow.setUndoRedoEnabled(False)
+    return shadow
+
+
+def capture(document, start, end):
+    # The content of document between start and end. Formats are compared
+    # by their index in the document first, which is cheap: neighbouring
+    # fragments and blocks mostly share one.
+    runs = []
+    blocks = []
+    run_index = block_indexes = None
+    block = document.findBlock(start)
+    after = document.findBlock(end).next()
+    last = after.blockNumber() if after.isValid() else document.blockCount() - 1
+    while block.isValid():
+        for iterator in block:
+            fragment = iterator.fragment()
+            position = fragment.position()
+            if position >= end:
+                break
+            length = min(position + fragment.length(), end) - max(position, start)
+            if length <= 0:
+                continue
+            index = fragment.charFormatIndex()
+            if index == run_index:
+                runs[-1][0] += length
+            else:
+                add_run(runs, length, fragment.charFormat())
+                run_index = index
+        # A block separator takes the next block's format, set by paste.
+        if start <= block.position() + block.length() - 1 < end:
+            if runs:
+                runs[-1][0] += 1
+            else:
+                add_run(runs, 1, block.charFormat())
+        indexes = (block.blockFormatIndex(), block.charFormatIndex())
+        if indexes == block_indexes and blocks[-1][3] is None and block.textList() is None:
+            blocks[-1][0] += 1
+        else:
+            add_block(blocks, block, last)
+            block_indexes = indexes
+        if block == after:
+            break
+        block = block.next()
+    cursor = QTextCursor(document)
+    cursor.setPosition(start)
+    cursor.setPosition(end, QTextCursor.KeepAnchor)
+    return Content(cursor.selectedText().replace('\u2029', '\n'), runs, blocks)
+
+
+def link_list(block, list_format, previous, following, last):
+    # Puts block back in the list it was in. Blocks up to it and past last
+    # already are in theirs.
+    text_list = block.textList()
+    if list_format is None:
+        if text_list is not None:
+            text_list.remove(block)
+        return
+    document = block.document()
+    number = block.blockNumber()
+    target = None
+    if previous:
+        target = document.findBlockByNumber(number - previous).textList()
+    elif following:
+        target = document.findBlockByNumber(number + following).textList()
+    if target is not None:
+        if target.objectIndex() != block.blockFormat().objectIndex():
+            target.add(block)
+    elif (text_list is None or text_list.format() != list_format
+          or text_list.item(0).blockNumber() < number
+          or text_list.item(text_list.count() - 1).blockNumber() > last):
+        # The first item of a list that lies wholly within the content.
+        QTextCursor(block).createList(list_format)
+
+
+def paste(cursor, start, end, content):
+    # Replaces what is between start and end with content, formats and
+    # lists included.
+    cursor.setPosition(start)
+    cursor.setPosition(end, QTextCursor.KeepAnchor)
+    cursor.insertText(content.text)
+    position = start
+    for length, char_format in content.runs:
+        cursor.setPosition(position)
+        cursor.setPosition(position + length, QTextCursor.KeepAnchor)
+        cursor.setCharFormat(char_format)
+        position += length
+    block = cursor.document().findBlock(start)
+    last = block.blockNumber() + sum(entry[0] for entry in content.blocks) - 1
+    for count, block_format, char_format, list_format, previous, following in content.blocks:
+        # Blocks outside lists that share the formats of one already set
+        # are left alone.
+        done = None
+        for _ in range(count):
+            if not block.isValid():
+                return
+            indexes = (block.blockFormatIndex(), block.charFormatIndex())
+            if indexes == done and block.textList() is None:
+                block = block.next()
+                continue
+            link_list(block, list_format, previous, following, last)
+            cursor.setPosition(block.position())
+            current = block.blockFormat()
+            target = QTextBlockFormat(block_format)
+            target.setObjectIndex(current.objectIndex())
+            if current != target:
+                cursor.setBlockFormat(target)
+            if block.charFormat() != char_format:
+                cursor.setBlockCharFormat(char_format)
+            if list_format is None:
+                done = (block.blockFormatIndex(), block.charFormatIndex())
+            block = block.next()
+
+
+def write_content(stream, content):
+    stream.writeUInt32(len(content.runs))
+    for length, char_format in content.runs:
+        stream.writeUInt32(length)
+        stream.writeQVariant(char_format)
+    stream.writeUInt32(len(content.blocks))
+    for count, block_format, char_format, list_format, previous, following in content.blocks:
+        stream.writeUInt32(count)
+        stream.writeQVariant(block_format)
+        stream.writeQVariant(char_format)
+        stream.writeBool(list_format is not None)
+        if list_format is not None:
+            stream.writeQVariant(list_format)
+        stream.writeUInt32(previous)
+        stream.writeUInt32(following)
+
+
+def read_content(stream, text):
+    runs = [[stream.readUInt32(), stream.readQVariant()] for _ in range(stream.readUInt32())]
+    blocks = []
+    for _ in range(stream.readUInt32()):
+        count, block_format, char_format = stream.readUInt32(), stream.readQVariant(), stream.readQVariant()
+        list_format = stream.readQVariant() if stream.readBool() else None
+        blocks.append([count, block_format, char_format, list_format, stream.readUInt32(), stream.readUInt32()])
+    if stream.status() != QDataStream.Ok:
+        raise ValueError("Damaged undo step")
+    return Content(text, runs, blocks)
+
+
+class UndoStep:
+    # One edit: the removed content was replaced by the added one at
+    # position, in UTF-16 code units like every Qt position.
+    __slots__ = ('serial', 'position', 'removed', 'added', 'compressed', 'size')
+
+    def __init__(self, serial, position, removed, added, compressed=False):
+        if not compressed and len(removed.text) + len(added.text) > COMPRESS_THRESHOLD:
+            removed.text = zlib.compress(removed.text.encode('utf-8'), 1)
+            added.text = zlib.compress(added.text.encode('utf-8'), 1)
+            compressed = True
+        self.serial = serial
+        self.position = position
+        self.removed = removed
+        self.added = added
+        self.compressed = compressed
+        self.measure()
+
+    def measure(self):
+        self.size = STEP_OVERHEAD + sum(
+            sys.getsizeof(content.text) + len(content.runs) * RUN_OVERHEAD + len(content.blocks) * BLOCK_OVERHEAD
+            for content in (self.removed, self.added))
+
+    def contents(self):
+        # The removed and added contents with their texts uncompressed.
+        if self.compressed:
+            return tuple(Content(zlib.decompress(content.text).decode('utf-8'), content.runs, content.blocks)
+                         for content in (self.removed, self.added))
+        return self.removed, self.added
+
+    def merge(self, position, removed, added):
+        # Folds a typed or deleted character into this step if it continues
+        # it. Returns whether it did.
+        if self.compressed or len(self.removed.text) + len(self.added.text) >= MAX_MERGED_LENGTH:
+            return False
+        if not removed.text and len(added.text) == 1 and added.text != '\n':
+            if position == self.position + utf16_length(self.added.text) and '\n' not in self.added.text:
+                self.added.extend(added)
+                self.measure()
+                return True
+        elif not added.text and len(removed.text) == 1 and removed.text != '\n' and not self.added.text:
+            if position + utf16_length(removed.text) == self.position:
+                # Backspace
+                self.position = position
+                removed.extend(self.removed)
+                removed.blocks = self.removed.blocks
+                self.removed = removed
+                self.measure()
+                return True
+            if position == self.position:
+                # Delete
+                self.removed.extend(removed)
+                self.measure()
+                return True
+        return False
+
+    def to_bytes(self):
+        if self.compressed:
+            removed, added = self.removed.text, self.added.text
+        else:
+            removed, added = self.removed.text.encode('utf-8'), self.added.text.encode('utf-8')
+        formats = QByteArray()
+        stream = QDataStream(formats, QIODevice.WriteOnly)
+        write_content(stream, self.removed)
+        write_content(stream, self.added)
+        formats = formats.data()
+        return (RECORD.pack(self.position, len(removed), len(added), len(formats), self.compressed)
+                + removed + added + formats)
+
+
+def read_step(serial, data):
+    position, removed_length, added_length, formats_length, compressed = RECORD.unpack_from(data)
+    offset = RECORD.size
+    removed = data[offset:offset + removed_length]
+    offset += removed_length
+    added = data[offset:offset + added_length]
+    offset += added_length
+    stream = QDataStream(QByteArray(data[offset:offset + formats_length]))
+    if not compressed:
+        removed, added = removed.decode('utf-8'), added.decode('utf-8')
+    return UndoStep(serial, position, read_content(stream, removed), read_content(stream, added), bool(compressed))
+
+
+class SpilledStep:
+    # A step written to the spill file at offset.
+    __slots__ = ('serial', 'offset', 'length')
+
+    def __init__(self, serial, offset, length):
+        self.serial = serial
+        self.offset = offset
+        self.length = length
+
+
+class UndoHistory(QObject):
+    # The undo and redo stacks of a document, replacing QTextDocument's own,
+    # which can only grow or be cleared. Each edit is recorded as the
+    # content, text and formats, it removed and added; the removed content
+    # comes from a shadow copy of the document, kept up to date as it
+    # changes. At most max_steps steps are kept, and at most max_bytes in
+    # memory, the shadow included: beyond that the oldest are dropped or,
+    # with spill set, moved to a temporary file and read back when they are
+    # undone.
+    def __init__(self, document, bulk_edit=None, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.bulk_edit = bulk_edit
+        self.max_steps = DEFAULT_MAX_STEPS
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.spill = False
+        self.spill_file = None
+        self.enabled = True
+        self.applying = False
+        self.serial = 0
+        self.shadow = None
+        self.shadow_bytes = 0
+        self.undo_steps = []
+        self.redo_steps = []
+        document.setUndoRedoEnabled(False)
+        document.contentsChange.connect(self.on_contents_change)
+        document.modificationChanged.connect(self.on_modification_changed)
+        self.reset()
+
+    def reset(self):
+        self.close()
+        self.undo_steps = []
+        self.redo_steps = []
+        # Steps and the shadow in memory; spilled steps are at the bottom of
+        # the undo stack.
+        self.memory_bytes = 0
+        self.shadow_bytes = 0
+        self.spilled_count = 0
+        self.spilled_bytes = 0
+        self.merging = False
+        self.last_edit = 0
+        # The state below the oldest step, and the one last saved (None if
+        # it is no longer reachable).
+        self.serial += 1
+        self.base_serial = self.serial
+        self.clean_serial = None if self.document.isModified() else self.base_serial
+        self.shadow = None
+        if self.enabled:
+            self.shadow = make_shadow(self.document)
+            self.measure_shadow()
+
+    def set_enabled(self, enabled):
+        # While disabled, e.g. as a file is loaded, edits are not recorded;
+        # enabling starts a new history from the current text.
+        self.enabled = enabled
+        self.reset()
+
+    def set_limits(self, max_steps, max_bytes, spill):
+        self.max_steps = max_steps
+        self.max_bytes = max_bytes
+        self.spill = spill
+        if not spill:
+            while self.spilled_count:
+                self.drop_oldest()
+        self.trim()
+
+    def can_undo(self):
+        return self.enabled and bool(self.undo_steps)
+
+    def can_redo(self):
+        return self.enabled and bool(self.redo_steps)
+
+    def top_serial(self):
+        return self.undo_steps[-1].serial if self.undo_steps else self.base_serial
+
+    def on_modification_changed(self, modified):
+        if not self.enabled or self.applying:
+            return
+        if not modified:
+            self.clean_serial = self.top_serial()
+            self.merging = False
+        elif self.top_serial() == self.clean_serial:
+            # Marked modified without an edit, e.g. text restored from a
+            # journal; edits are recorded before this is signalled.
+            self.clean_serial = None
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        if not self.enabled or self.applying:
+            return
+        edit = self.update_shadow(position, chars_removed, chars_added)
+        self.measure_shadow()
+        if edit is not None:
+            self.record(*edit)
+
+    def measure_shadow(self):
+        shadow = self.shadow
+        size = 0
+        if shadow is not None:
+            size = SHADOW_CHARACTER_BYTES * shadow.characterCount() + SHADOW_BLOCK_OVERHEAD * shadow.blockCount()
+        self.memory_bytes += size - self.shadow_bytes
+        self.shadow_bytes = size
+
+    def update_shadow(self, position, chars_removed, chars_added):
+        # Brings the shadow up to date with a change and returns it as
+        # (position, removed, added) contents, or None if nothing changed.
+        document, shadow = self.document, self.shadow
+        old_end = min(position + chars_removed, shadow.characterCount() - 1)
+        new_end = min(position + chars_added, document.characterCount() - 1)
+        # Qt can report less than an edit block changed when lists are
+        # involved: what follows the change must read the same in both, so
+        # the change is extended block by block until it does.
+        old_block, new_block = shadow.findBlock(old_end), document.findBlock(new_end)
+        while block_tail(old_block, old_end) != block_tail(new_block, new_end):
+            old_block, new_block = old_block.next(), new_block.next()
+            if not (old_block.isValid() and new_block.isValid()):
+                old_end, new_end = shadow.characterCount() - 1, document.characterCount() - 1
+                break
+            old_end, new_end = old_block.position(), new_block.position()
+        if (position > min(old_end, new_end)
+                or shadow.characterCount() - old_end != document.characterCount() - new_end):
+            # Should Qt ever report a change that does not add up, the whole
+            # text is taken as changed.
+            position, old_end, new_end = 0, shadow.characterCount() - 1, document.characterCount() - 1
+        # Nor should a range split a surrogate pair, which Python cannot hold.
+        if position and (is_low_surrogate(document.characterAt(position))
+                         or is_low_surrogate(shadow.characterAt(position))):
+            position -= 1
+        if is_low_surrogate(shadow.characterAt(old_end)):
+            old_end += 1
+            new_end += 1
+        # In an edit block, cursors on the shadow skip laying out its text.
+        cursor = QTextCursor(shadow)
+        cursor.beginEditBlock()
+        removed = capture(shadow, position, old_end)
+        added = capture(document, position, new_end)
+        paste(cursor, position, old_end, added)
+        cursor.endEditBlock()
+        if removed.same_as(added):
+            return None
+        return position, removed, added
+
+    def record(self, position, removed, added):
+        for step in self.redo_steps:
+            self.memory_bytes -= step.size
+        self.redo_steps = []
+        now = time.monotonic()
+        top = self.undo_steps[-1] if self.undo_steps else None
+        size = top.size if isinstance(top, UndoStep) else 0
+        if (self.merging and now - self.last_edit < MERGE_INTERVAL
+                and top.serial != self.clean_serial and top.merge(position, removed, added)):
+            self.memory_bytes += top.size - size
+        else:
+            self.serial += 1
+            step = UndoStep(self.serial, position, removed, added)
+            self.undo_steps.append(step)
+            self.memory_bytes += step.size
+        self.merging = len(removed.text) + len(added.text) == 1
+        self.last_edit = now
+        self.trim()
+
+    def trim(self):
+        # The newest step always stays, and stays in memory, so the last
+        # edit can be undone however large it was.
+        while len(self.undo_steps) > max(self.max_steps, 1):
+            self.drop_oldest()
+        while self.memory_bytes > self.max_bytes and self.spilled_count < len(self.undo_steps) - 1:
+            if not (self.spill and self.spill_oldest()):
+                self.drop_oldest()
+        while self.spilled_bytes > MAX_SPILLED_BYTES and self.spilled_count:
+            self.drop_oldest()
+
+    def drop_oldest(self):
+        step = self.undo_steps.pop(0)
+        self.base_serial = step.serial
+        if isinstance(step, SpilledStep):
+            self.spilled_count -= 1
+            self.spilled_bytes -= step.length
+            if not self.spilled_count:
+                self.close()
+        else:
+            self.memory_bytes -= step.size
+
+    def spill_oldest(self):
+        # Moves the oldest step still in memory to the spill file, which
+        # holds the spilled steps in stack order.
+        step = self.undo_steps[self.spilled_count]
+        data = step.to_bytes()
+        try:
+            if self.spill_file is None:
+                self.spill_file = tempfile.TemporaryFile(prefix='undo-', dir=cache_directory('undo'))
+            self.spill_file.seek(0, os.SEEK_END)
+            offset = self.spill_file.tell()
+            self.spill_file.write(data)
+        except OSError:
+            return False
+        self.undo_steps[self.spilled_count] = SpilledStep(step.serial, offset, len(data))
+        self.spilled_count += 1
+        self.spilled_bytes += len(data)
+        self.memory_bytes -= step.size
+        return True
+
+    def load_spilled(self, spilled):
+        # Reads back the newest spilled step, which ends the spill file.
+        self.spill_file.seek(spilled.offset)
+        data = self.spill_file.read(spilled.length)
+        self.spill_file.truncate(spilled.offset)
+        self.spilled_count -= 1
+        self.spilled_bytes -= spilled.length
+        if not self.spilled_count:
+            self.close()
+        return read_step(spilled.serial, data)
+
+    def undo(self):
+        # Reverts the newest step; returns the position after the text it
+        # put back, or None if there was nothing to undo.
+        if not self.can_undo():
+            return None
+        step = self.undo_steps.pop()
+        if isinstance(step, SpilledStep):
+            try:
+                step = self.load_spilled(step)
+            except (OSError, ValueError, struct.error, zlib.error):
+                # The rest of the history is lost with the file.
+                self.base_serial = step.serial
+                self.undo_steps = []
+                self.reset_spill()
+                return None
+            self.memory_bytes += step.size
+        removed, added = step.contents()
+        self.apply(step, step.position, utf16_length(added.text), removed)
+        self.redo_steps.append(step)
+        return self.finish_step(step.position + utf16_length(removed.text))
+
+    def redo(self):
+        if not self.can_redo():
+            return None
+        step = self.redo_steps.pop()
+        removed, added = step.contents()
+        self.apply(step, step.position, utf16_length(removed.text), added)
+        self.undo_steps.append(step)
+        return self.finish_step(step.position + utf16_length(added.text))
+
+    def finish_step(self, position):
+        self.merging = False
+        modified = self.top_serial() != self.clean_serial
+        if modified != self.document.isModified():
+            self.document.setModified(modified)
+        self.trim()
+        return position
+
+    def apply(self, step, position, length, content):
+        self.applying = True
+        try:
+            if step.compressed and self.bulk_edit is not None:
+                with self.bulk_edit() as cursor:
+                    paste(cursor, position, position + length, content)
+            else:
+                cursor = QTextCursor(self.document)
+                cursor.beginEditBlock()
+                paste(cursor, position, position + length, content)
+                cursor.endEditBlock()
+        finally:
+            self.applying = False
+        # The shadow takes the same edit rather than reading it back.
+        cursor = QTextCursor(self.shadow)
+        cursor.beginEditBlock()
+        paste(cursor, position, position + length, content)
+        cursor.endEditBlock()
+        self.measure_shadow()
+
+    def reset_spill(self):
+        self.spilled_count = 0
+        self.spilled_bytes = 0
+        self.close()
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
@@ -0,0 +1,25 @@
+# utils/word_stats.py
+
+from PySide6.QtCore import Signal
+from utils.block_index import BlockIndex
+from utils.helpers import count_words
+
+
+class WordStatistics(BlockIndex):
+    # Keeps one word count per QTextBlock so totals are read in O(1).
+    changed = Signal(int)
+
+    def __init__(self, document, parent=None):
+        self.word_count = 0
+        super().__init__(document, parent)
+
+    def compute(self, text):
+        return count_words(text)
+
+    def reset(self):
+        self.word_count = sum(self.values)
+        self.changed.emit(self.word_count)
+
+    def replaced(self, first_number, old_values, new_values):
+        self.word_count += sum(new_values) - sum(old_values)
+        self.changed.emit(self.word_count)
@@ -0,0 +1,90 @@
+import os
+from PySide6.QtWidgets import QStackedWidget
+from widgets.editor import Editor
+
+# Tabs beyond this many, least recently used first, are unloaded unless
+# modified: their editor is dropped and the text is read again when the tab
+# is shown.
+MAX_LOADED_DOCUMENTS = 4
+
+class DocumentTab(QStackedWidget):
+    # One open document: its editor (or large-file view) and the state that
+    # has to outlive the editor while the tab is unloaded.
+    def __init__(self, parent=None, file_path=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.editor = None
+        self.large_file_view = None
+        self.journal = None
+        self.load_worker = None
+        self.index_worker = None
+        # (line, start, end, line_text) to select once the file is open.
+        self.pending_location = None
+
+        # Kept while unloaded. A modified document restored from the last
+        # session waits in its journal; an unmodified one is simply read
+        # again.
+        self.unloaded_journal = None
+        self.encoding = 'utf-8'
+        self.line_ending = '\n'
+        self.cursor_position = None
+        self.scroll_value = 0
+
+    def title(self):
+        name = os.path.basename(self.file_path) if self.file_path else "Untitled"
+        return f"{name}*" if self.is_modified() else name
+
+    def is_modified(self):
+        if self.editor is None:
+            return self.unloaded_journal is not None
+        return self.editor.document().isModified()
+
+    def is_blank(self):
+        # An untouched new document, which Open reuses instead of adding a tab.
+        return (self.editor is not None and self.file_path is None and self.large_file_view is None
+                and self.load_worker is None and self.editor.document().isEmpty()
+                and not self.editor.document().isModified())
+
+    def is_busy(self):
+        return self.load_worker is not None or self.index_worker is not None
+
+    def create_editor(self):
+        self.editor = Editor(self)
+        self.editor.encoding = self.encoding
+        self.editor.line_ending = self.line_ending
+        self.insertWidget(0, self.editor)
+        if self.large_file_view is None:
+            self.setCurrentWidget(self.editor)
+        return self.editor
+
+    def release_editor(self):
+        editor = self.editor
+        self.cursor_position = editor.textCursor().position()
+        self.scroll_value = editor.verticalScrollBar().value()
+        self.encoding = editor.encoding
+        self.line_ending = editor.line_ending
+        editor.history.close()
+        self.removeWidget(editor)
+        editor.deleteLater()
+        self.editor = None
+
+    def restore_position(self):
+        if self.cursor_position is None:
+            return
+        cursor = self.editor.textCursor()
+        cursor.setPosition(min(self.cursor_position, self.editor.document().characterCount() - 1))
+        self.editor.setTextCursor(cursor)
+        self.editor.verticalScrollBar().setValue(self.scroll_value)
+        self.cursor_position = None
+
+    def suspend(self):
+        # Background tabs stop idle spell checking and drop their match
+        # highlights.
+        if self.editor is None:
+            return
+        self.editor.setExtraSelections([])
+        self.editor.highlighter.suspend()
+
+    def resume(self):
+        if self.editor is not None:
+            self.editor.highlighter.resume()
@@ -1,43 +1,531 @@
-from PySide6.QtWidgets import QTextEdit
-from PySide6.QtGui import QFont, QTextCharFormat, QColor, QSyntaxHighlighter, QTextCursor
-from utils.helpers import count_words
-import enchant
+from contextlib import contextmanager
+from PySide6.QtWidgets import QTextEdit, QMenu
+from PySide6.QtGui import QFont, QTextCharFormat, QColor, QSyntaxHighlighter, QTextCursor, QTextLayout, QAction, QKeySequence
+from PySide6.QtCore import QTimer, QPoint, Signal
+from utils.word_stats import WordStatistics
+from utils.change_bus import ChangeBus
+from utils.spelling import get_spell_checker, tokenize
+from utils.workers import Worker
+from utils.undo_history import UndoHistory
+from utils import instrumentation
+
+# Block states used by the highlighter when checking the viewport first.
+DEFERRED = 0
+CHECKED = 1
+VIEWPORT_MARGIN = 20
+IDLE_BATCH_SIZE = 500
+VISIBLE_PRIORITY = 1
+IDLE_PRIORITY = 0
+DICTIONARY_LOAD_DELAY = 200
+MAX_HIGHLIGHTS = 5000
 
 class SpellCheckHighlighter(QSyntaxHighlighter):
+    progress = Signal(int, int)
+    finished = Signal(bool, int)
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        try:
-            self.dictionary = enchant.Dict("en_US")
-        except enchant.errors.DictNotFoundError:
-            self.dictionary = None
+        self.checker = get_spell_checker()
         self.format = QTextCharFormat()
         self.format.setUnderlineStyle(QTextCharFormat.SpellCheckUnderline)
         self.format.setUnderlineColor(QColor("red"))
 
+        # Blocks with words enchant has not seen yet, keyed by block number.
+        self.pending = {}
+        self.workers = set()
+        self.document_worker = None
+        self.misspelled_count = 0
+
+        # Blocks near the viewport are checked first; the rest are deferred
+        # and checked in idle time or when they are scrolled into view.
+        self.viewport_first = True
+        self.visible_range = (0, 0)
+        self.idle_block = 0
+        self.idle_worker = None
+        # Set while the editor's tab is in the background.
+        self.suspended = False
+        # Set during a bulk edit; the range it changed is checked after it.
+        self.in_bulk_edit = False
+        self.bulk_range = None
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(50)
+        self.flush_timer.timeout.connect(self.flush_pending)
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(0)
+        self.idle_timer.timeout.connect(self.check_idle_batch)
+
+        if self.document() is not None:
+            self.document().contentsChange.connect(self.on_contents_change)
+
+        # The dictionary is loaded on the checker's thread shortly after
+        # startup instead of before the first paint.
+        self.checker.ready.connect(self.on_dictionary_ready)
+        if self.checker.loaded:
+            QTimer.singleShot(0, self.on_dictionary_ready)
+        else:
+            QTimer.singleShot(DICTIONARY_LOAD_DELAY, lambda: self.checker.load())
+
+    @instrumentation.timed("highlightBlock")
     def highlightBlock(self, text):
-        if not self.dictionary:
-            return
-        words = text.split()
-        index = 0
-        for word in words:
-            if not self.dictionary.check(word) and word != "":
-                start = text.find(word, index)
-                if start != -1:
-                    self.setFormat(start, len(word), self.format)
-                    index = start + len(word)
-            else:
-                index += len(word) + 1  # +1 for the space 
+        if not self.checker.dictionary or self.in_bulk_edit:
+            return
+        block = self.currentBlock()
+        if (self.viewport_first and self.currentBlockState() != CHECKED
+                and not self.is_near_viewport(block.blockNumber())):
+            self.setCurrentBlockState(DEFERRED)
+            return
+        for start, length in self.cached_spans(block, text):
+            self.setFormat(start, length, self.format)
+        self.setCurrentBlockState(CHECKED)
+
+    def cached_spans(self, block, text):
+        # Only cached verdicts are used here; unknown words go to the worker.
+        spans, complete = self.checker.cached_misspelled(text)
+        if not complete:
+            self.pending[block.blockNumber()] = text
+            self.flush_timer.start()
+        return spans
+
+    def apply_spans(self, block, spans):
+        # Sets the formats of a block directly. Unlike rehighlightBlock this
+        # does not relayout the document, so callers mark a whole batch dirty
+        # once with mark_dirty.
+        ranges = []
+        for start, length in spans:
+            format_range = QTextLayout.FormatRange()
+            format_range.start = start
+            format_range.length = length
+            format_range.format = self.format
+            ranges.append(format_range)
+        block.layout().setFormats(ranges)
+        block.setUserState(CHECKED)
+
+    def mark_dirty(self, first, last):
+        if first is not None:
+            end = last.position() + last.length()
+            self.document().markContentsDirty(first.position(), end - first.position())
+
+    def on_dictionary_ready(self):
+        self.idle_block = 0
+        if not self.checker.dictionary:
+            # Clears the underlines of a previous language.
+            self.rehighlight()
+            return
+        self.highlight_range(*self.visible_range)
+
+    def set_checker(self, checker):
+        # Switches language. Checks still running for the old language are
+        # ignored, and every block is checked again, visible ones first.
+        if checker is self.checker:
+            return
+        self.cancel_check()
+        self.checker.ready.disconnect(self.on_dictionary_ready)
+        self.checker = checker
+        self.checker.ready.connect(self.on_dictionary_ready)
+        self.recheck()
+        if not checker.loaded:
+            checker.load()
+
+    def recheck(self):
+        # Verdicts changed: marks every block unchecked, so blocks are
+        # formatted again once visible.
+        document = self.document()
+        if document is None:
+            return
+        self.pending = {}
+        block = document.begin()
+        while block.isValid():
+            block.setUserState(DEFERRED)
+            block = block.next()
+        if self.checker.loaded:
+            self.on_dictionary_ready()
+
+    def begin_bulk_edit(self):
+        self.in_bulk_edit = True
+        self.bulk_range = None
+
+    def end_bulk_edit(self):
+        # The changed blocks lost their underlines; they are checked again,
+        # visible ones now and the rest in idle time.
+        self.in_bulk_edit = False
+        document = self.document()
+        if self.bulk_range is None or document is None:
+            return
+        start, end = self.bulk_range
+        self.bulk_range = None
+        block = document.findBlock(start)
+        last = document.findBlock(min(end, document.characterCount() - 1)).blockNumber()
+        while block.isValid() and block.blockNumber() <= last:
+            block.setUserState(DEFERRED)
+            block = block.next()
+        self.idle_block = min(self.idle_block, document.findBlock(start).blockNumber())
+        self.highlight_range(*self.visible_range)
+
+    def suspend(self):
+        self.suspended = True
+        self.idle_timer.stop()
+
+    def resume(self):
+        self.suspended = False
+        self.highlight_range(*self.visible_range)
+
+    def is_near_viewport(self, block_number):
+        first, last = self.visible_range
+        return first - VIEWPORT_MARGIN <= block_number <= last + VIEWPORT_MARGIN
+
+    def highlight_range(self, first, last):
+        self.visible_range = (first, last)
+        document = self.document()
+        if not self.viewport_first or document is None or not self.checker.dictionary:
+            return
+        dirty_first = dirty_last = None
+        block = document.findBlockByNumber(max(0, first - VIEWPORT_MARGIN))
+        while block.isValid() and block.blockNumber() <= last + VIEWPORT_MARGIN:
+            if block.userState() != CHECKED:
+                self.apply_spans(block, self.cached_spans(block, block.text()))
+                dirty_first = dirty_first or block
+                dirty_last = block
+            block = block.next()
+        self.mark_dirty(dirty_first, dirty_last)
+        self.idle_timer.start()
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        if self.in_bulk_edit:
+            start, end = self.bulk_range or (position, position + chars_added)
+            self.bulk_range = (min(start, position), max(end, position + chars_added))
+            return
+        document = self.document()
+        first = document.findBlock(position)
+        if first.blockNumber() != document.findBlock(position + chars_added).blockNumber():
+            # Multi-block edits (loads, pastes) may leave deferred blocks behind.
+            self.idle_block = min(self.idle_block, first.blockNumber())
+            self.idle_timer.start()
+
+    def check_idle_batch(self):
+        document = self.document()
+        if not self.viewport_first or document is None or self.idle_worker is not None or self.suspended:
+            return
+        if not self.checker.dictionary:
+            return
+        block = document.findBlockByNumber(self.idle_block)
+        jobs = []
+        for _ in range(IDLE_BATCH_SIZE):
+            if not block.isValid():
+                break
+            if block.userState() != CHECKED:
+                jobs.append((block.blockNumber(), block.text()))
+            block = block.next()
+        self.idle_block = block.blockNumber() if block.isValid() else document.blockCount()
+
+        if jobs:
+            self.idle_worker = self.create_worker(jobs)
+            self.idle_worker.signals.finished.connect(self.on_idle_batch_done)
+            self.checker.pool.start(self.idle_worker, IDLE_PRIORITY)
+        elif block.isValid():
+            self.idle_timer.start()
+
+    def on_idle_batch_done(self):
+        self.idle_worker = None
+        document = self.document()
+        if document is not None and self.idle_block < document.blockCount():
+            self.idle_timer.start()
+
+    def flush_pending(self):
+        jobs = list(self.pending.items())
+        self.pending = {}
+        if jobs:
+            self.checker.pool.start(self.create_worker(jobs), VISIBLE_PRIORITY)
+
+    def create_worker(self, jobs):
+        checker = self.checker
+        worker = Worker(checker.check_blocks, jobs)
+        worker.signals.partial.connect(lambda results: self.apply_results(results) if checker is self.checker else None)
+        worker.signals.finished.connect(lambda: self.workers.discard(worker))
+        self.workers.add(worker)
+        return worker
+
+    def apply_results(self, results):
+        document = self.document()
+        if document is None:
+            return
+        dirty_first = dirty_last = None
+        for block_number, text, spans in results:
+            block = document.findBlockByNumber(block_number)
+            # Drop results for blocks that were edited or moved since the
+            # snapshot. Revisions cannot tell: blocks made in one edit share
+            # theirs, and a line inserted above renumbers the rest.
+            if not block.isValid() or block.text() != text:
+                continue
+            if self.viewport_first and not self.is_near_viewport(block_number):
+                # Off-screen results only warm the verdict cache; the block
+                # stays deferred and is formatted cheaply once it is visible.
+                continue
+            if not spans and not block.layout().formats():
+                block.setUserState(CHECKED)
+                continue
+            self.apply_spans(block, spans)
+            if dirty_first is None or block_number < dirty_first.blockNumber():
+                dirty_first = block
+            if dirty_last is None or block_number > dirty_last.blockNumber():
+                dirty_last = block
+        self.mark_dirty(dirty_first, dirty_last)
+
+    def check_document(self):
+        # A run being replaced does not report; the new one does.
+        self.cancel_check(notify=False)
+        document = self.document()
+        jobs = []
+        block = document.begin()
+        while block.isValid():
+            jobs.append((block.blockNumber(), block.text()))
+            block = block.next()
+
+        self.misspelled_count = 0
+        worker = self.create_worker(jobs)
+        worker.signals.partial.connect(self.count_misspelled)
+        worker.signals.progress.connect(self.progress)
+        worker.signals.result.connect(lambda completed: self.on_document_checked(worker, completed))
+        self.document_worker = worker
+        self.checker.pool.start(worker, IDLE_PRIORITY)
+
+    def count_misspelled(self, results):
+        self.misspelled_count += sum(len(spans) for _, _, spans in results)
+
+    def cancel_check(self, notify=True):
+        if self.document_worker is not None:
+            self.document_worker.cancel()
+            self.document_worker = None
+            if notify:
+                self.finished.emit(False, self.misspelled_count)
+
+    def on_document_checked(self, worker, completed):
+        if worker is self.document_worker:
+            self.document_worker = None
+            self.finished.emit(completed, self.misspelled_count)
 
 class Editor(QTextEdit):
+    # From the spelling context menu; handled by the main window.
+    fix_all_requested = Signal(str, str)
+    add_word_requested = Signal(str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFont(QFont("Segoe UI", 12))
-        self.textChanged.connect(self.on_text_changed)
         self.word_count = 0
+        self.encoding = 'utf-8'
+        self.line_ending = '\n'
+        # Bumped on every content change; lets async jobs tell if a snapshot is stale.
+        self.edit_revision = 0
+        self.document().contentsChange.connect(self.on_contents_change)
+        self.stats = WordStatistics(self.document(), self)
+        self.match_format = QTextCharFormat()
+        self.match_format.setBackground(QColor("#fff59d"))
+        self.current_match_format = QTextCharFormat()
+        self.current_match_format.setBackground(QColor("#ffb74d"))
         self.highlighter = SpellCheckHighlighter(self.document())
+        # Replaces the document's own unbounded undo stack.
+        self.history = UndoHistory(self.document(), self.bulk_edit, self)
+
+        # Consumers that do more than constant work per edit listen to the
+        # batched change bus rather than to textChanged.
+        self.changes = ChangeBus(self.document(), parent=self)
+        self.changes.dirty.connect(self.on_text_changed)
+        self.changes.dirty.connect(self.refresh_viewport)
+
+        self.viewport_timer = QTimer(self)
+        self.viewport_timer.setSingleShot(True)
+        self.viewport_timer.setInterval(30)
+        self.viewport_timer.timeout.connect(self.refresh_viewport)
+        self.verticalScrollBar().valueChanged.connect(lambda value: self.viewport_timer.start())
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        self.edit_revision += 1
+
+    def visible_block_range(self):
+        first = self.cursorForPosition(QPoint(0, 0)).blockNumber()
+        last = self.cursorForPosition(QPoint(0, self.viewport().height() - 1)).blockNumber()
+        return first, last
+
+    @instrumentation.timed("refresh_viewport")
+    def refresh_viewport(self, ranges=None):
+        first, last = self.visible_block_range()
+        self.highlighter.highlight_range(first, last)
+
+    def snapshot_text(self):
+        # Unlike toPlainText this keeps non-breaking spaces and line
+        # separators, so offsets and block numbers match the document.
+        return self.document().toRawText().replace('\u2029', '\n')
+
+    @contextmanager
+    def bulk_edit(self, changed_blocks=None):
+        # Yields a cursor for one large edit made as a single undo step. The
+        # word statistics and the spell checker skip the edit and catch up
+        # once it is done.
+        self.stats.suspend()
+        self.highlighter.begin_bulk_edit()
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        try:
+            yield cursor
+        finally:
+            cursor.endEditBlock()
+            self.highlighter.end_bulk_edit()
+            self.stats.resume(changed_blocks)
+
+    def set_undo_enabled(self, enabled):
+        self.history.set_enabled(enabled)
+
+    def undo(self):
+        if not self.isReadOnly():
+            self.move_cursor_to(self.history.undo())
+
+    def redo(self):
+        if not self.isReadOnly():
+            self.move_cursor_to(self.history.redo())
+
+    def move_cursor_to(self, position):
+        if position is None:
+            return
+        cursor = self.textCursor()
+        cursor.setPosition(min(position, self.document().characterCount() - 1))
+        self.setTextCursor(cursor)
+
+    def setPlainText(self, text):
+        # Starts a new history, as QTextEdit does.
+        enabled = self.history.enabled
+        self.history.set_enabled(False)
+        super().setPlainText(text)
+        self.history.set_enabled(enabled)
+
+    def clear(self):
+        enabled = self.history.enabled
+        self.history.set_enabled(False)
+        super().clear()
+        self.history.set_enabled(enabled)
+
+    def keyPressEvent(self, event):
+        # QTextEdit would undo on the document's disabled stack.
+        if event.matches(QKeySequence.Undo):
+            self.undo()
+        elif event.matches(QKeySequence.Redo):
+            self.redo()
+        else:
+            super().keyPressEvent(event)
+
+    def append_text(self, text):
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewport_timer.start()
+
+    def highlight_matches(self, matches, current=None):
+        selections = []
+        for index, (position, length) in enumerate(matches[:MAX_HIGHLIGHTS]):
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = QTextCursor(self.document())
+            selection.cursor.setPosition(position)
+            selection.cursor.setPosition(position + length, QTextCursor.KeepAnchor)
+            selection.format = self.current_match_format if index == current else self.match_format
+            selections.append(selection)
+        self.setExtraSelections(selections)
+
+    def word_at(self, cursor):
+        # (start, end, word) of the word at the cursor, or None.
+        block = cursor.block()
+        position = cursor.positionInBlock()
+        for start, length, word in tokenize(block.text()):
+            if start <= position <= start + length:
+                return block.position() + start, block.position() + start + length, word
+        return None
+
+    def misspelled_word_at(self, cursor):
+        # Like word_at, for an underlined word. Uses the verdicts the
+        # highlighter already has.
+        checker = self.highlighter.checker
+        if not checker.dictionary:
+            return None
+        found = self.word_at(cursor)
+        if found is not None and checker.cache.get(found[2]) is False:
+            return found
+        return None
+
+    def contextMenuEvent(self, event):
+        menu = self.createStandardContextMenu(event.pos())
+        self.replace_history_actions(menu)
+        misspelled = self.misspelled_word_at(self.cursorForPosition(event.pos()))
+        if misspelled is not None:
+            self.add_spelling_actions(menu, *misspelled)
+        menu.exec(event.globalPos())
+        menu.deleteLater()
+
+    def replace_history_actions(self, menu):
+        for action in menu.actions():
+            if action.objectName() == 'edit-undo':
+                replacement = QAction(action.text(), menu)
+                replacement.setEnabled(self.history.can_undo() and not self.isReadOnly())
+                replacement.triggered.connect(lambda checked=False: self.undo())
+            elif action.objectName() == 'edit-redo':
+                replacement = QAction(action.text(), menu)
+                replacement.setEnabled(self.history.can_redo() and not self.isReadOnly())
+                replacement.triggered.connect(lambda checked=False: self.redo())
+            else:
+                continue
+            menu.insertAction(action, replacement)
+            menu.removeAction(action)
+
+    def add_spelling_actions(self, menu, start, end, word):
+        checker = self.highlighter.checker
+        suggestions = checker.suggest(word)
+        actions = []
+        for suggestion in suggestions:
+            action = QAction(suggestion, menu)
+            action.triggered.connect(lambda checked=False, suggestion=suggestion: self.replace_range(start, end, suggestion))
+            actions.append(action)
+        if suggestions:
+            fix_all_menu = QMenu("Fix All Occurrences", menu)
+            for suggestion in suggestions:
+                fix_all_menu.addAction(suggestion).triggered.connect(
+                    lambda checked=False, suggestion=suggestion: self.fix_all_requested.emit(word, suggestion))
+            actions.append(fix_all_menu.menuAction())
+        else:
+            if checker.suggestions is not None:
+                label = "No Suggestions"
+            elif checker.suggestions_error is not None:
+                label = "Suggestions Unavailable"
+            else:
+                label = "Preparing Suggestions..."
+            action = QAction(label, menu)
+            action.setEnabled(False)
+            actions.append(action)
+        add_action = QAction(f"Add '{word}' to Dictionary", menu)
+        add_action.triggered.connect(lambda checked=False: self.add_word_requested.emit(word))
+        actions.append(add_action)
+
+        first = menu.actions()[0] if menu.actions() else None
+        menu.insertActions(first, actions)
+        menu.insertSeparator(first)
+
+    def replace_range(self, start, end, text):
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.insertText(text)
+
+    @instrumentation.timed("on_text_changed")
+    def on_text_changed(self, ranges=None):
+        self.word_count = self.stats.word_count
+        # Editors of background tabs are hidden and leave the status bar alone.
+        if self.isVisible() and hasattr(self.window(), 'status_bar'):
+            self.window().status_bar.update_word_count(self.word_count)
+            self.show_undo_usage()
 
-    def on_text_changed(self):
-        text = self.toPlainText()
-        self.word_count = count_words(text)
-        if self.parent() and hasattr(self.parent(), 'status_bar'):
-            self.parent().status_bar.update_word_count(self.word_count)
+    def show_undo_usage(self):
+        history = self.history
+        self.window().status_bar.update_undo_usage(len(history.undo_steps), history.memory_bytes, history.spilled_bytes)
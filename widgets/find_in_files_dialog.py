@@ -0,0 +1,143 @@
+import os
+from PySide6.QtWidgets import (
+    QDialog,
+    QLabel,
+    QLineEdit,
+    QPushButton,
+    QHBoxLayout,
+    QVBoxLayout,
+    QGridLayout,
+    QMessageBox,
+    QCheckBox,
+    QListWidget,
+    QListWidgetItem,
+    QFileDialog
+)
+from PySide6.QtCore import Qt
+from utils.find_in_files import DEFAULT_INCLUDE, DEFAULT_EXCLUDE
+
+MAX_LISTED_RESULTS = 10000
+
+class FindInFilesDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Find in Files")
+        self.resize(700, 500)
+        self.setup_ui()
+        self.parent = parent
+
+    def setup_ui(self):
+        # Labels and LineEdits
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Enter text to find")
+
+        self.folder_input = QLineEdit(os.getenv('HOME') or "")
+        self.browse_button = QPushButton("Browse...")
+
+        self.include_input = QLineEdit(DEFAULT_INCLUDE)
+        self.include_input.setPlaceholderText("e.g. *.txt;*.md (empty for all files)")
+        self.exclude_input = QLineEdit(DEFAULT_EXCLUDE)
+
+        form_layout = QGridLayout()
+        form_layout.addWidget(QLabel("Find:"), 0, 0)
+        form_layout.addWidget(self.find_input, 0, 1, 1, 2)
+        form_layout.addWidget(QLabel("Folder:"), 1, 0)
+        form_layout.addWidget(self.folder_input, 1, 1)
+        form_layout.addWidget(self.browse_button, 1, 2)
+        form_layout.addWidget(QLabel("Include:"), 2, 0)
+        form_layout.addWidget(self.include_input, 2, 1, 1, 2)
+        form_layout.addWidget(QLabel("Exclude:"), 3, 0)
+        form_layout.addWidget(self.exclude_input, 3, 1, 1, 2)
+
+        # Search options
+        self.regex_check = QCheckBox("Regular expression")
+        self.case_check = QCheckBox("Match case")
+        self.word_check = QCheckBox("Whole word")
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(self.regex_check)
+        options_layout.addWidget(self.case_check)
+        options_layout.addWidget(self.word_check)
+
+        # Buttons
+        self.search_button = QPushButton("Search")
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.close_button = QPushButton("Close")
+        self.summary_label = QLabel("")
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(self.summary_label, 1)
+        buttons_layout.addWidget(self.search_button)
+        buttons_layout.addWidget(self.cancel_button)
+        buttons_layout.addWidget(self.close_button)
+
+        # Results
+        self.results_list = QListWidget()
+
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(form_layout)
+        main_layout.addLayout(options_layout)
+        main_layout.addLayout(buttons_layout)
+        main_layout.addWidget(self.results_list)
+
+        self.setLayout(main_layout)
+
+        # Connect buttons
+        self.browse_button.clicked.connect(self.browse)
+        self.search_button.clicked.connect(self.search)
+        self.find_input.returnPressed.connect(self.search)
+        self.cancel_button.clicked.connect(lambda: self.parent.cancel_find_in_files())
+        self.close_button.clicked.connect(self.close)
+        self.results_list.itemActivated.connect(self.open_result)
+
+    def browse(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder", self.folder_input.text())
+        if folder:
+            self.folder_input.setText(folder)
+
+    def search_options(self):
+        return {
+            'regex': self.regex_check.isChecked(),
+            'case_sensitive': self.case_check.isChecked(),
+            'whole_word': self.word_check.isChecked(),
+        }
+
+    def search(self):
+        text = self.find_input.text()
+        folder = self.folder_input.text()
+        if not text:
+            QMessageBox.warning(self, "Input Required", "Please enter text to find.")
+            return
+        if not os.path.isdir(folder):
+            QMessageBox.warning(self, "Find in Files", f"'{folder}' is not a folder.")
+            return
+        self.parent.find_in_files(text, folder, self.include_input.text(), self.exclude_input.text())
+
+    def set_running(self, running):
+        self.search_button.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def clear_results(self):
+        self.results_list.clear()
+        self.summary_label.setText("Searching...")
+
+    def add_results(self, results):
+        # Only the first MAX_LISTED_RESULTS are listed; the summary has the
+        # full count.
+        root = self.folder_input.text()
+        results = results[:MAX_LISTED_RESULTS - self.results_list.count()]
+        for file_path, line, start, end, text in results:
+            item = QListWidgetItem(f"{os.path.relpath(file_path, root)}:{line + 1}: {text.strip()[:200]}")
+            item.setData(Qt.UserRole, (file_path, line, start, end, text))
+            self.results_list.addItem(item)
+
+    def set_summary(self, text):
+        self.summary_label.setText(text)
+
+    def open_result(self, item):
+        self.parent.open_file_at(*item.data(Qt.UserRole))
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.parent.cancel_find_in_files()
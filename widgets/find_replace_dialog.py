@@ -5,9 +5,12 @@ from PySide6.QtWidgets import (
     QPushButton,
     QHBoxLayout,
     QVBoxLayout,
-    QMessageBox
+    QMessageBox,
+    QCheckBox,
+    QListWidget,
+    QListWidgetItem
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 
 class FindReplaceDialog(QDialog):
     def __init__(self, parent=None):
@@ -22,13 +25,20 @@ class FindReplaceDialog(QDialog):
         find_label = QLabel("Find:")
         self.find_input = QLineEdit()
         self.find_input.setPlaceholderText("Enter text to find")  
+        self.match_label = QLabel("")
 
         replace_label = QLabel("Replace:")
         self.replace_input = QLineEdit()
         self.replace_input.setPlaceholderText("Enter replacement text")  
 
+        # Search options
+        self.regex_check = QCheckBox("Regular expression")
+        self.case_check = QCheckBox("Match case")
+        self.word_check = QCheckBox("Whole word")
+
         # Buttons
         self.find_button = QPushButton("Find Next")
+        self.find_all_button = QPushButton("Find All")
         self.replace_button = QPushButton("Replace")
         self.replace_all_button = QPushButton("Replace All")
         self.close_button = QPushButton("Close")
@@ -37,13 +47,20 @@ class FindReplaceDialog(QDialog):
         find_layout = QHBoxLayout()
         find_layout.addWidget(find_label)
         find_layout.addWidget(self.find_input)
+        find_layout.addWidget(self.match_label)
 
         replace_layout = QHBoxLayout()
         replace_layout.addWidget(replace_label)
         replace_layout.addWidget(self.replace_input)
 
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(self.regex_check)
+        options_layout.addWidget(self.case_check)
+        options_layout.addWidget(self.word_check)
+
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(self.find_button)
+        buttons_layout.addWidget(self.find_all_button)
         buttons_layout.addWidget(self.replace_button)
         buttons_layout.addWidget(self.replace_all_button)
         buttons_layout.addWidget(self.close_button)
@@ -51,16 +68,77 @@ class FindReplaceDialog(QDialog):
         main_layout = QVBoxLayout()
         main_layout.addLayout(find_layout)
         main_layout.addLayout(replace_layout)
+        main_layout.addLayout(options_layout)
         main_layout.addLayout(buttons_layout)
 
+        # Find All results
+        self.results_list = QListWidget()
+        self.results_list.hide()
+        main_layout.addWidget(self.results_list)
+
         self.setLayout(main_layout)
 
         # Connect buttons
         self.find_button.clicked.connect(self.find_next)
+        self.find_all_button.clicked.connect(self.find_all)
+        self.results_list.itemActivated.connect(self.go_to_result)
         self.replace_button.clicked.connect(self.replace)
         self.replace_all_button.clicked.connect(self.replace_all)
         self.close_button.clicked.connect(self.close)
 
+        # Update the match count and highlights while typing
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.update_matches)
+        self.find_input.textChanged.connect(lambda text: self.search_timer.start())
+        for check in (self.regex_check, self.case_check, self.word_check):
+            check.toggled.connect(lambda checked: self.search_timer.start())
+
+    def search_options(self):
+        return {
+            'regex': self.regex_check.isChecked(),
+            'case_sensitive': self.case_check.isChecked(),
+            'whole_word': self.word_check.isChecked(),
+        }
+
+    def update_matches(self):
+        self.parent.update_matches(self.find_input.text())
+
+    def set_match_status(self, current, total, complete=True):
+        self.match_label.setToolTip("")
+        if current is None:
+            self.match_label.setText("")
+        elif total == 0 and complete:
+            self.match_label.setText("No results")
+        else:
+            total = total if complete else f"{total}+"
+            if current == 0:
+                self.match_label.setText(f"{total} matches")
+            else:
+                self.match_label.setText(f"{current} of {total}")
+
+    def show_searching(self):
+        self.match_label.setToolTip("")
+        self.match_label.setText("Searching...")
+
+    def show_pattern_error(self, error):
+        self.match_label.setText("Invalid pattern")
+        self.match_label.setToolTip(str(error))
+
+    def clear_results(self):
+        self.results_list.clear()
+        self.results_list.show()
+
+    def add_results(self, results):
+        for line, start, end, text in results:
+            item = QListWidgetItem(f"{line + 1}: {text.strip()[:200]}")
+            item.setData(Qt.UserRole, (line, start, end, text))
+            self.results_list.addItem(item)
+
+    def go_to_result(self, item):
+        self.parent.go_to_result(*item.data(Qt.UserRole))
+
     def find_next(self):
         text = self.find_input.text()
         if not text:
@@ -68,6 +146,13 @@ class FindReplaceDialog(QDialog):
             return
         self.parent.find_text(text)  
 
+    def find_all(self):
+        text = self.find_input.text()
+        if not text:
+            QMessageBox.warning(self, "Input Required", "Please enter text to find.")
+            return
+        self.parent.find_all_text(text)
+
     def replace(self):
         find_text = self.find_input.text()
         replace_text = self.replace_input.text()
@@ -87,3 +172,11 @@ class FindReplaceDialog(QDialog):
     def showEvent(self, event):
         super().showEvent(event)
         self.find_input.setFocus()  
+        if self.find_input.text():
+            self.update_matches()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.search_timer.stop()
+        self.parent.cancel_find_all()
+        self.parent.clear_matches()
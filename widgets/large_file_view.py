@@ -0,0 +1,107 @@
+# widgets/large_file_view.py
+
+from PySide6.QtWidgets import QWidget, QPlainTextEdit, QScrollBar, QHBoxLayout
+from PySide6.QtGui import QFont, QTextCursor
+from PySide6.QtCore import Qt, QEvent
+
+class LargeFileView(QWidget):
+    # Shows only the lines that fit in the viewport; the scroll bar works in
+    # line numbers of the indexed file instead of pixels of a QTextDocument.
+    def __init__(self, large_file, parent=None):
+        super().__init__(parent)
+        self.large_file = large_file
+        self.top_line = 0
+        self.search_offset = 0
+
+        self.view = QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.view.setFont(QFont("Segoe UI", 12))
+        self.view.installEventFilter(self)
+        self.view.viewport().installEventFilter(self)
+
+        self.scroll_bar = QScrollBar(Qt.Vertical)
+        self.scroll_bar.valueChanged.connect(self.set_top_line)
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.view)
+        layout.addWidget(self.scroll_bar)
+        self.setLayout(layout)
+
+        self.update_range()
+
+    def visible_line_count(self):
+        return max(1, self.view.viewport().height() // self.view.fontMetrics().lineSpacing())
+
+    def update_range(self):
+        visible = self.visible_line_count()
+        self.scroll_bar.setPageStep(visible)
+        self.scroll_bar.setRange(0, max(0, self.large_file.line_count - visible))
+        self.refresh()
+
+    def set_top_line(self, line):
+        self.top_line = line
+        self.refresh()
+
+    def refresh(self):
+        lines = self.large_file.lines(self.top_line, self.visible_line_count() + 1)
+        self.view.setPlainText('\n'.join(lines))
+
+    def go_to_line(self, line, column=0, length=0):
+        line = max(0, min(line, self.large_file.line_count - 1))
+        visible = self.visible_line_count()
+        if not self.top_line <= line < self.top_line + visible:
+            self.scroll_bar.setValue(max(0, line - visible // 2))
+        block = self.view.document().findBlockByNumber(line - self.top_line)
+        cursor = QTextCursor(block)
+        cursor.movePosition(QTextCursor.Right, QTextCursor.MoveAnchor, column)
+        cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, length)
+        self.view.setTextCursor(cursor)
+        self.view.setFocus()
+        self.search_offset = self.large_file.line_start(line)
+
+    def find_next(self, text, case_sensitive=False):
+        found = self.large_file.find(text, self.search_offset, case_sensitive)
+        if found is None:
+            return False
+        line, column, length, end_offset = found
+        self.go_to_line(line, column, length)
+        self.search_offset = end_offset
+        return True
+
+    def scroll_lines(self, lines):
+        self.scroll_bar.setValue(self.scroll_bar.value() + lines)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_range()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Wheel:
+            self.scroll_lines(-event.angleDelta().y() // 40)
+            return True
+        if event.type() == QEvent.KeyPress and obj is self.view:
+            key = event.key()
+            block_number = self.view.textCursor().blockNumber()
+            if key == Qt.Key_PageDown:
+                self.scroll_lines(self.scroll_bar.pageStep())
+                return True
+            if key == Qt.Key_PageUp:
+                self.scroll_lines(-self.scroll_bar.pageStep())
+                return True
+            if key == Qt.Key_Down and block_number >= self.visible_line_count() - 1:
+                self.scroll_lines(1)
+                return True
+            if key == Qt.Key_Up and block_number == 0:
+                self.scroll_lines(-1)
+                return True
+            if event.modifiers() & Qt.ControlModifier and key == Qt.Key_Home:
+                self.go_to_line(0)
+                return True
+            if event.modifiers() & Qt.ControlModifier and key == Qt.Key_End:
+                self.go_to_line(self.large_file.line_count - 1)
+                return True
+        return super().eventFilter(obj, event)
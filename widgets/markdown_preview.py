@@ -0,0 +1,110 @@
+# widgets/markdown_preview.py
+
+from bisect import bisect_right
+from collections import OrderedDict
+from PySide6.QtWidgets import QTextBrowser
+from PySide6.QtGui import QTextCursor, QTextFrameFormat
+from utils.markdown_preview import render_chunk
+
+# Rendered HTML is kept for this many chunk texts, least recently used
+# dropped first.
+MAX_CACHED_CHUNKS = 5000
+
+class MarkdownPreview(QTextBrowser):
+    # Shows a Markdown document as one frame per chunk (see
+    # utils.markdown_preview.split_chunks). Only the frames of chunks whose
+    # text changed are replaced, so an edit costs one chunk, not a re-layout
+    # of the whole preview.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setOpenExternalLinks(True)
+        self.frames = []
+        self.chunk_texts = []
+        self.first_lines = []
+        self.cache = OrderedDict()
+        self.frame_format = QTextFrameFormat()
+        self.frame_format.setMargin(0)
+        self.frame_format.setPadding(0)
+        self.frame_format.setBorder(0)
+
+    def missing(self, chunks):
+        # The chunk texts that still have to be rendered.
+        return list(dict.fromkeys(text for _, text in chunks if text not in self.cache))
+
+    def add_rendered(self, results):
+        for text, html in results:
+            self.cache[text] = html
+        while len(self.cache) > MAX_CACHED_CHUNKS:
+            self.cache.popitem(last=False)
+
+    def rendered(self, text):
+        html = self.cache.get(text)
+        if html is None:
+            # Evicted since it was rendered, in a document with more chunks
+            # than the cache holds.
+            html = render_chunk(text)
+            self.add_rendered([(text, html)])
+        else:
+            self.cache.move_to_end(text)
+        return html
+
+    def show_chunks(self, chunks):
+        # Replaces the frames between the unchanged chunks at either end.
+        texts = [text for _, text in chunks]
+        old = self.chunk_texts
+        prefix = 0
+        limit = min(len(old), len(texts))
+        while prefix < limit and old[prefix] == texts[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == texts[-1 - suffix]:
+            suffix += 1
+
+        changed = texts[prefix:len(texts) - suffix]
+        if changed or prefix + suffix < len(old):
+            scroll_value = self.verticalScrollBar().value()
+            cursor = QTextCursor(self.document())
+            cursor.beginEditBlock()
+            for index in reversed(range(prefix, len(old) - suffix)):
+                self.remove_frame(cursor, index)
+            for offset, text in enumerate(changed):
+                self.insert_frame(cursor, prefix + offset, self.rendered(text))
+            cursor.endEditBlock()
+            self.verticalScrollBar().setValue(scroll_value)
+        self.chunk_texts = texts
+        self.first_lines = [first for first, _ in chunks]
+
+    def insert_frame(self, cursor, index, html):
+        if index > 0:
+            cursor.setPosition(self.frames[index - 1].lastPosition() + 1)
+        else:
+            cursor.setPosition(self.document().rootFrame().firstPosition())
+        frame = cursor.insertFrame(self.frame_format)
+        cursor.insertHtml(html)
+        self.frames.insert(index, frame)
+
+    def remove_frame(self, cursor, index):
+        frame = self.frames.pop(index)
+        cursor.setPosition(frame.firstPosition() - 1)
+        cursor.setPosition(frame.lastPosition() + 1, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+    def clear_chunks(self):
+        if not self.frames:
+            return
+        self.clear()
+        self.frames = []
+        self.chunk_texts = []
+        self.first_lines = []
+
+    def scroll_to_line(self, line, fraction=0.0):
+        # Scrolls to the chunk holding this source line, proportionally
+        # within the chunk; fraction is how far into the line to go.
+        index = bisect_right(self.first_lines, line) - 1
+        if index < 0 or index >= len(self.frames):
+            return
+        first = self.first_lines[index]
+        line_count = self.chunk_texts[index].count('\n') + 1
+        position = min(1.0, (line - first + fraction) / line_count)
+        rect = self.document().documentLayout().frameBoundingRect(self.frames[index])
+        self.verticalScrollBar().setValue(int(rect.top() + position * rect.height()))
@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import QMenuBar
 from PySide6.QtGui import QKeySequence, QAction
 from PySide6.QtCore import Qt
-from widgets.find_replace_dialog import FindReplaceDialog
+from utils import instrumentation
 
 class MenuBar(QMenuBar):
     def __init__(self, parent):
@@ -40,12 +40,21 @@ class MenuBar(QMenuBar):
         save_as_action.triggered.connect(self.parent.save_file_as)
         file_menu.addAction(save_as_action)
 
+        close_tab_action = QAction("Close Tab", self)
+        close_tab_action.setShortcut(QKeySequence.Close)
+        close_tab_action.triggered.connect(lambda checked: self.parent.close_tab())
+        file_menu.addAction(close_tab_action)
+
         export_menu = file_menu.addMenu("Export")
 
         export_pdf = QAction("Export as PDF", self)
         export_pdf.triggered.connect(self.parent.export_as_pdf)
         export_menu.addAction(export_pdf)
 
+        export_files_pdf = QAction("Export Files as PDF...", self)
+        export_files_pdf.triggered.connect(self.parent.export_files_as_pdf)
+        export_menu.addAction(export_files_pdf)
+
         file_menu.addSeparator()
 
         exit_action = QAction("Exit", self)
@@ -58,24 +67,28 @@ class MenuBar(QMenuBar):
 
         undo_action = QAction("Undo", self)
         undo_action.setShortcut(QKeySequence.Undo)
-        undo_action.triggered.connect(self.parent.editor.undo)
+        undo_action.triggered.connect(lambda checked: self.parent.editor.undo())
         edit_menu.addAction(undo_action)
 
         redo_action = QAction("Redo", self)
         redo_action.setShortcut(QKeySequence.Redo)
-        redo_action.triggered.connect(self.parent.editor.redo)
+        redo_action.triggered.connect(lambda checked: self.parent.editor.redo())
         edit_menu.addAction(redo_action)
 
+        undo_limits_action = QAction("Undo History Limits...", self)
+        undo_limits_action.triggered.connect(self.parent.change_undo_limits)
+        edit_menu.addAction(undo_limits_action)
+
         edit_menu.addSeparator()
 
         cut_action = QAction("Cut", self)
         cut_action.setShortcut(QKeySequence.Cut)
-        cut_action.triggered.connect(self.parent.editor.cut)
+        cut_action.triggered.connect(lambda checked: self.parent.editor.cut())
         edit_menu.addAction(cut_action)
 
         copy_action = QAction("Copy", self)
         copy_action.setShortcut(QKeySequence.Copy)
-        copy_action.triggered.connect(self.parent.editor.copy)
+        copy_action.triggered.connect(lambda checked: self.parent.editor.copy())
         edit_menu.addAction(copy_action)
 
         paste_action = QAction("Paste", self)
@@ -85,7 +98,7 @@ class MenuBar(QMenuBar):
 
         select_all_action = QAction("Select All", self)
         select_all_action.setShortcut(QKeySequence.SelectAll)
-        select_all_action.triggered.connect(self.parent.editor.selectAll)
+        select_all_action.triggered.connect(lambda checked: self.parent.editor.selectAll())
         edit_menu.addAction(select_all_action)
 
         edit_menu.addSeparator()
@@ -93,15 +106,25 @@ class MenuBar(QMenuBar):
         # Find in Edit Menu
         find_action = QAction("Find", self)
         find_action.setShortcut(QKeySequence.Find)
-        find_action.triggered.connect(self.parent.find_replace_dialog.show) 
+        find_action.triggered.connect(self.parent.show_find_replace) 
         edit_menu.addAction(find_action)
 
         # Replace in Edit Menu
         replace_action = QAction("Replace", self)
         replace_action.setShortcut(QKeySequence.Replace)
-        replace_action.triggered.connect(self.parent.find_replace_dialog.show)  
+        replace_action.triggered.connect(self.parent.show_find_replace)  
         edit_menu.addAction(replace_action)
 
+        find_in_files_action = QAction("Find in Files", self)
+        find_in_files_action.setShortcut(QKeySequence("Ctrl+Shift+F"))
+        find_in_files_action.triggered.connect(self.parent.show_find_in_files)
+        edit_menu.addAction(find_in_files_action)
+
+        go_to_line_action = QAction("Go to Line", self)
+        go_to_line_action.setShortcut(QKeySequence("Ctrl+G"))
+        go_to_line_action.triggered.connect(self.parent.go_to_line)
+        edit_menu.addAction(go_to_line_action)
+
     def init_view_menu(self):
         view_menu = self.addMenu("&View")
 
@@ -115,6 +138,11 @@ class MenuBar(QMenuBar):
         toggle_statusbar_action.triggered.connect(self.parent.toggle_statusbar)
         view_menu.addAction(toggle_statusbar_action)
 
+        self.markdown_preview_action = QAction("Markdown Preview", self, checkable=True)
+        self.markdown_preview_action.setShortcut(QKeySequence("Ctrl+Shift+M"))
+        self.markdown_preview_action.triggered.connect(self.parent.toggle_markdown_preview)
+        view_menu.addAction(self.markdown_preview_action)
+
         view_menu.addSeparator()
 
         zoom_in_action = QAction("Zoom In", self)
@@ -133,11 +161,11 @@ class MenuBar(QMenuBar):
         view_menu.addAction(reset_zoom_action)
 
         # Add Toggle Theme Action
-        toggle_theme_action = QAction("Toggle Theme", self, checkable=True)
-        toggle_theme_action.setShortcut(QKeySequence("Ctrl+T"))
-        toggle_theme_action.setChecked(False)  # Default to light theme
-        toggle_theme_action.triggered.connect(self.parent.toggle_theme)
-        view_menu.addAction(toggle_theme_action)
+        self.toggle_theme_action = QAction("Toggle Theme", self, checkable=True)
+        self.toggle_theme_action.setShortcut(QKeySequence("Ctrl+T"))
+        self.toggle_theme_action.setChecked(False)  # Default to light theme
+        self.toggle_theme_action.triggered.connect(lambda checked: self.parent.toggle_theme())
+        view_menu.addAction(self.toggle_theme_action)
 
     def init_format_menu(self):
         format_menu = self.addMenu("F&ormat")
@@ -192,7 +220,12 @@ class MenuBar(QMenuBar):
         spell_check_action.triggered.connect(self.parent.spell_check)
         tools_menu.addAction(spell_check_action)
 
+        add_word_action = QAction("Add Word to Dictionary", self)
+        add_word_action.triggered.connect(self.parent.add_word_to_dictionary)
+        tools_menu.addAction(add_word_action)
+
         thesaurus_action = QAction("Thesaurus", self)
+        thesaurus_action.setShortcut(QKeySequence("Shift+F7"))
         thesaurus_action.triggered.connect(self.parent.open_thesaurus)
         tools_menu.addAction(thesaurus_action)
 
@@ -200,6 +233,18 @@ class MenuBar(QMenuBar):
         language_action.triggered.connect(self.parent.select_language)
         tools_menu.addAction(language_action)
 
+        if instrumentation.enabled:
+            tools_menu.addSeparator()
+
+            overlay_action = QAction("Performance Overlay", self, checkable=True)
+            overlay_action.setChecked(True)
+            overlay_action.triggered.connect(self.parent.status_bar.set_latency_visible)
+            tools_menu.addAction(overlay_action)
+
+            export_trace_action = QAction("Export Performance Trace...", self)
+            export_trace_action.triggered.connect(self.parent.export_performance_trace)
+            tools_menu.addAction(export_trace_action)
+
     def init_help_menu(self):
         help_menu = self.addMenu("&Help")
 
@@ -1,6 +1,7 @@
 # widgets/status_bar.py
 
-from PySide6.QtWidgets import QStatusBar, QLabel
+from PySide6.QtWidgets import QStatusBar, QLabel, QProgressBar, QPushButton
+from utils.helpers import format_size
 
 class StatusBar(QStatusBar):
     def __init__(self, parent):
@@ -8,7 +9,26 @@ class StatusBar(QStatusBar):
         self.parent = parent
         self.message_label = QLabel()
         self.word_count_label = QLabel("Words: 0")
+        self.latency_label = QLabel()
+        self.latency_label.setToolTip("Keystroke-to-paint latency over the last 1000 keystrokes")
+        self.undo_label = QLabel()
+        self.undo_label.setToolTip("Undo history of this document, in memory and spilled to disk")
+        self.progress_label = QLabel()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(150)
+        self.progress_bar.setTextVisible(False)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setFlat(True)
+        self.cancel_button.clicked.connect(self.cancel_progress)
+        self.cancel_callback = None
+        self.addPermanentWidget(self.progress_label)
+        self.addPermanentWidget(self.progress_bar)
+        self.addPermanentWidget(self.cancel_button)
+        self.addPermanentWidget(self.latency_label)
+        self.addPermanentWidget(self.undo_label)
         self.addPermanentWidget(self.word_count_label)
+        self.set_progress_visible(False)
+        self.set_latency_visible(False)
         self.show_message("Ready")
 
     def show_message(self, message, timeout=5000):
@@ -17,3 +37,43 @@ class StatusBar(QStatusBar):
 
     def update_word_count(self, count):
         self.word_count_label.setText(f"Words: {count}")
+
+    def update_undo_usage(self, steps, memory_bytes, spilled_bytes):
+        text = f"Undo: {steps} step{'' if steps == 1 else 's'}, {format_size(memory_bytes)}"
+        if spilled_bytes:
+            text += f" (+{format_size(spilled_bytes)} on disk)"
+        self.undo_label.setText(text)
+
+    def set_latency_visible(self, visible):
+        self.latency_label.setVisible(visible)
+
+    def update_latency(self, median_ms, p95_ms):
+        self.latency_label.setText(f"Key to paint: {median_ms:.0f} ms (p95 {p95_ms:.0f} ms)")
+
+    def set_progress_visible(self, visible):
+        self.progress_label.setVisible(visible)
+        self.progress_bar.setVisible(visible)
+        self.cancel_button.setVisible(visible and self.cancel_callback is not None)
+
+    def start_progress(self, label, cancel_callback=None):
+        self.cancel_callback = cancel_callback
+        self.progress_label.setText(label)
+        self.progress_bar.setRange(0, 0)
+        self.set_progress_visible(True)
+
+    def set_progress_label(self, label):
+        self.progress_label.setText(label)
+
+    def update_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+
+    def finish_progress(self, message=None):
+        self.cancel_callback = None
+        self.set_progress_visible(False)
+        if message:
+            self.show_message(message)
+
+    def cancel_progress(self):
+        if self.cancel_callback is not None:
+            self.cancel_callback()
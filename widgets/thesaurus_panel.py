@@ -0,0 +1,63 @@
+# widgets/thesaurus_panel.py
+
+from PySide6.QtWidgets import QWidget, QLineEdit, QLabel, QTreeWidget, QTreeWidgetItem, QVBoxLayout
+from PySide6.QtCore import Qt, Signal
+
+class ThesaurusPanel(QWidget):
+    # Synonyms of one word, grouped by meaning. Activating a synonym asks
+    # for it to replace the word in the editor.
+    lookup_requested = Signal(str)
+    replace_requested = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.word_input = QLineEdit()
+        self.word_input.setPlaceholderText("Look up a word")
+        self.word_input.returnPressed.connect(lambda: self.lookup_requested.emit(self.word_input.text().strip()))
+
+        self.message_label = QLabel()
+        self.message_label.setWordWrap(True)
+        self.message_label.setVisible(False)
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderHidden(True)
+        self.tree.itemActivated.connect(self.on_item_activated)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.word_input)
+        layout.addWidget(self.message_label)
+        layout.addWidget(self.tree)
+        self.setLayout(layout)
+        self.word = None
+
+    def show_entry(self, word, meanings):
+        self.word = word
+        self.word_input.setText(word)
+        self.tree.clear()
+        if not meanings:
+            self.show_message(f"No synonyms found for '{word}'.")
+            return
+        self.message_label.setVisible(False)
+        for part_of_speech, synonyms in meanings:
+            meaning = QTreeWidgetItem([part_of_speech])
+            meaning.setFlags(Qt.ItemIsEnabled)
+            meaning.addChildren([QTreeWidgetItem([synonym]) for synonym in synonyms])
+            self.tree.addTopLevelItem(meaning)
+            meaning.setExpanded(True)
+
+    def show_message(self, message):
+        self.message_label.setText(message)
+        self.message_label.setVisible(True)
+
+    def clear_entry(self, message=None):
+        self.word = None
+        self.tree.clear()
+        if message:
+            self.show_message(message)
+        else:
+            self.message_label.setVisible(False)
+
+    def on_item_activated(self, item, column):
+        if item.parent() is not None:
+            self.replace_requested.emit(item.text(0))
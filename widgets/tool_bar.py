@@ -1,92 +1,84 @@
 from PySide6.QtWidgets import QToolBar, QStyle
-from PySide6.QtGui import QIcon, QAction
-import os
+from PySide6.QtGui import QAction
+from utils.resources import get_resource_manager
 
 class ToolBar(QToolBar):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent = parent
+        # Icons are decoded in idle time after the first paint; until then
+        # the actions show the style's generic file icon.
+        self.placeholder_icon = self.parent.style().standardIcon(QStyle.SP_FileIcon)
+        self.deferred_icons = []
         self.init_toolbar()
 
     def init_toolbar(self):
         self.setMovable(False)
 
-        # Define the path to icons
-        icons_path = os.path.join(os.path.dirname(__file__), '..', 'resources', 'icons')
-
-        # Function to safely create QIcons
-        def create_icon(filename):
-            icon_path = os.path.join(icons_path, filename)
-            if os.path.exists(icon_path):
-                return QIcon(icon_path)
-            else:
-                # Return a default icon if the specified one doesn't exist
-                return self.parent.style().standardIcon(QStyle.SP_FileIcon)
-
         # New
-        new_icon = create_icon('new.png')
-        new_action = QAction(new_icon, "New", self)
+        new_action = QAction("New", self)
+        self.defer_icon(new_action, 'new.png')
         new_action.triggered.connect(self.parent.new_file)
         self.addAction(new_action)
 
         # Open
-        open_icon = create_icon('open.png')
-        open_action = QAction(open_icon, "Open", self)
+        open_action = QAction("Open", self)
+        self.defer_icon(open_action, 'open.png')
         open_action.triggered.connect(self.parent.open_file)
         self.addAction(open_action)
 
         # Save
-        save_icon = create_icon('save.png')
-        save_action = QAction(save_icon, "Save", self)
+        save_action = QAction("Save", self)
+        self.defer_icon(save_action, 'save.png')
         save_action.triggered.connect(self.parent.save_file)
         self.addAction(save_action)
 
         self.addSeparator()
 
         # Undo
-        undo_icon = create_icon('undo.png')
-        undo_action = QAction(undo_icon, "Undo", self)
-        undo_action.triggered.connect(self.parent.editor.undo)
+        undo_action = QAction("Undo", self)
+        self.defer_icon(undo_action, 'undo.png')
+        undo_action.triggered.connect(lambda checked: self.parent.editor.undo())
         self.addAction(undo_action)
 
         # Redo
-        redo_icon = create_icon('redo.png')
-        redo_action = QAction(redo_icon, "Redo", self)
-        redo_action.triggered.connect(self.parent.editor.redo)
+        redo_action = QAction("Redo", self)
+        self.defer_icon(redo_action, 'redo.png')
+        redo_action.triggered.connect(lambda checked: self.parent.editor.redo())
         self.addAction(redo_action)
 
         self.addSeparator()
 
         # Cut
-        cut_icon = create_icon('cut.png')
-        cut_action = QAction(cut_icon, "Cut", self)
-        cut_action.triggered.connect(self.parent.editor.cut)
+        cut_action = QAction("Cut", self)
+        self.defer_icon(cut_action, 'cut.png')
+        cut_action.triggered.connect(lambda checked: self.parent.editor.cut())
         self.addAction(cut_action)
 
         # Copy
-        copy_icon = create_icon('copy.png')
-        copy_action = QAction(copy_icon, "Copy", self)
-        copy_action.triggered.connect(self.parent.editor.copy)
+        copy_action = QAction("Copy", self)
+        self.defer_icon(copy_action, 'copy.png')
+        copy_action.triggered.connect(lambda checked: self.parent.editor.copy())
         self.addAction(copy_action)
 
         # Paste
-        paste_icon = create_icon('paste.png')
-        paste_action = QAction(paste_icon, "Paste", self)
+        paste_action = QAction("Paste", self)
+        self.defer_icon(paste_action, 'paste.png')
         paste_action.triggered.connect(lambda checked: self.parent.editor.paste())
         self.addAction(paste_action)
 
         self.addSeparator()
 
         # Search (Find)
-        search_icon = create_icon('search.png')
-        search_action = QAction(search_icon, "Find", self)  # Properly define search_action
-        search_action.triggered.connect(self.parent.find_replace_dialog.show)  # Show the find/replace dialog
+        search_action = QAction("Find", self)  # Properly define search_action
+        self.defer_icon(search_action, 'search.png')
+        search_action.triggered.connect(self.parent.show_find_replace)  # Show the find/replace dialog
         self.addAction(search_action)
 
         # Replace
-        replace_icon = create_icon('replace.png')
-        replace_action = QAction(replace_icon, "Replace", self)  # Properly define replace_action
-        replace_action.triggered.connect(self.parent.find_replace_dialog.show)  # Show the find/replace dialog
+        replace_action = QAction("Replace", self)  # Properly define replace_action
+        self.defer_icon(replace_action, 'replace.png')
+        replace_action.triggered.connect(self.parent.show_find_replace)  # Show the find/replace dialog
         self.addAction(replace_action)
 
         self.addSeparator()
@@ -96,3 +88,15 @@ class ToolBar(QToolBar):
         theme_action = QAction(theme_icon, "Toggle Theme", self)
         theme_action.triggered.connect(lambda checked: self.parent.toggle_theme())
         self.addAction(theme_action)
+
+    def defer_icon(self, action, filename):
+        action.setIcon(self.placeholder_icon)
+        self.deferred_icons.append((action, filename))
+
+    def load_icons(self):
+        resources = get_resource_manager()
+        for action, filename in self.deferred_icons:
+            icon = resources.icon(filename)
+            if not icon.isNull():
+                action.setIcon(icon)
+        self.deferred_icons = []
@@ -0,0 +1,39 @@
+# widgets/undo_limits_dialog.py
+
+from PySide6.QtWidgets import QDialog, QCheckBox, QDialogButtonBox, QFormLayout, QSpinBox, QVBoxLayout
+
+MEGABYTE = 1024 * 1024
+
+class UndoLimitsDialog(QDialog):
+    def __init__(self, max_steps, max_bytes, spill, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Undo History Limits")
+
+        self.steps_input = QSpinBox()
+        self.steps_input.setRange(1, 1000000)
+        self.steps_input.setValue(max_steps)
+
+        self.memory_input = QSpinBox()
+        self.memory_input.setRange(1, 4096)
+        self.memory_input.setSuffix(" MB")
+        self.memory_input.setValue(max(1, max_bytes // MEGABYTE))
+
+        self.spill_check = QCheckBox("Keep older steps in a file on disk")
+        self.spill_check.setChecked(spill)
+
+        form_layout = QFormLayout()
+        form_layout.addRow("Steps per document:", self.steps_input)
+        form_layout.addRow("Memory per document:", self.memory_input)
+        form_layout.addRow(self.spill_check)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addLayout(form_layout)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def limits(self):
+        return self.steps_input.value(), self.memory_input.value() * MEGABYTE, self.spill_check.isChecked()